@@ -1,14 +1,21 @@
 # app.py
-from flask import Flask, request, abort, render_template, jsonify
+import time
+BOOT_STARTED = time.perf_counter()
+
+from flask import Flask, request, abort, render_template, jsonify, Response
 from linebot import LineBotApi, WebhookHandler
-from linebot.exceptions import InvalidSignatureError
+from linebot.exceptions import InvalidSignatureError, LineBotApiError
 from linebot.models import MessageEvent, TextMessage, TextSendMessage
 import os
+import threading
 
-# Import ทั้ง 2 แผนก
-from src import gemini_logic
-from src.bot_logic import get_prediction_message   # แผนกหวย
-from src.gemini_logic import get_gemini_response   # แผนกคุยเล่น (มาใหม่)
+# แผนกหวย (src.bot_logic) กับแผนกคุยเล่น (src.gemini_logic) import ตอนใช้ครั้งแรก
+# เพราะลาก pandas / google.generativeai / gspread มาด้วย (หน้า / กับ /dashboard ไม่ต้องรอ)
+from src.webhook_queue import EventDispatcher
+from src.monthly_summary import etag_for
+from src.metrics import registry, span, count
+from src.http_session import get_connection_stats
+from src.response_cache import response_cache
 
 app = Flask(__name__)
 
@@ -18,6 +25,27 @@ LINE_CHANNEL_SECRET = os.getenv('LINE_CHANNEL_SECRET')
 line_bot_api = LineBotApi(LINE_CHANNEL_ACCESS_TOKEN)
 handler = WebhookHandler(LINE_CHANNEL_SECRET)
 
+# ประมวลผลข้อความเบื้องหลัง (ตอบ LINE 200 ทันที) ปิดได้ด้วย ASYNC_WEBHOOK=0
+ASYNC_WEBHOOK = os.getenv('ASYNC_WEBHOOK', '1') == '1'
+REPLY_TOKEN_TTL = 50  # วินาที (reply token ของ LINE ใช้ได้ประมาณ 1 นาที)
+dispatcher = EventDispatcher(max_workers=int(os.getenv('WEBHOOK_WORKERS', '4'))) if ASYNC_WEBHOOK else None
+
+# โหลดโมดูลหนักๆ + ข้อมูลไว้ก่อนเบื้องหลังหลังบูต (ปิดได้ด้วย PREWARM=0)
+PREWARM = os.getenv('PREWARM', '1') == '1'
+startup = {'import_seconds': 0.0, 'prewarm_seconds': 0.0, 'prewarmed': 0}
+
+def prewarm():
+    started = time.perf_counter()
+    try:
+        from src import bot_logic, gemini_logic
+        bot_logic.get_stats()
+        bot_logic.get_significance()
+        gemini_logic.get_model_router()
+        startup['prewarmed'] = 1
+    except Exception as e:
+        print(f"Prewarm failed: {e}")
+    startup['prewarm_seconds'] = time.perf_counter() - started
+
 @app.route("/", methods=['GET'])
 def home():
     return "Super Bot is Running!", 200
@@ -27,13 +55,21 @@ def callback():
     signature = request.headers['X-Line-Signature']
     body = request.get_data(as_text=True)
     try:
-        handler.handle(body, signature)
+        with span('webhook_handle'):
+            handler.handle(body, signature)
     except InvalidSignatureError:
+        count('webhook_invalid_signature')
         abort(400)
     return 'OK'
 
 @handler.add(MessageEvent, message=TextMessage)
 def handle_message(event):
+    if dispatcher:
+        dispatcher.submit(process_message, event)
+    else:
+        process_message(event)
+
+def process_message(event, received_at=None):
     user_msg = event.message.text.strip()
 
     user_id = event.source.user_id
@@ -43,17 +79,57 @@ def handle_message(event):
     
     if any(k in user_msg for k in lottery_keywords):
         # ส่งไปแผนกหวย
-        reply_text = get_prediction_message()
+        from src.bot_logic import get_prediction_message
+        with span('bot_reply', route='lotto'):
+            reply_text = get_prediction_message(user_msg)
     else:
         # 2. ถ้าไม่ใช่เรื่องหวย ให้ส่งไปคุยกับ Gemini
         # (บอกให้ user รอแป๊บนึง เพราะ AI อาจคิดนาน)
-        reply_text = get_gemini_response(user_msg, user_id)
+        from src.gemini_logic import get_gemini_response
+        with span('bot_reply', route='gemini'):
+            reply_text = get_gemini_response(user_msg, user_id)
         
     # ส่งคำตอบกลับไป
-    line_bot_api.reply_message(
-        event.reply_token,
-        TextSendMessage(text=reply_text)
-    )
+    with span('line_send'):
+        send_reply(event, reply_text, received_at)
+
+def send_reply(event, reply_text, received_at=None):
+    """ ตอบด้วย reply token ถ้ายังทัน ไม่งั้น (หรือ token หมดอายุ) ใช้ push_message แทน """
+    message = TextSendMessage(text=reply_text)
+    expired = received_at is not None and time.monotonic() - received_at > REPLY_TOKEN_TTL
+    if not expired:
+        try:
+            line_bot_api.reply_message(event.reply_token, message)
+            count('line_reply', method='reply')
+            return
+        except LineBotApiError as e:
+            print(f"Reply failed ({e.status_code}), falling back to push")
+    source = event.source
+    target = getattr(source, 'group_id', None) or getattr(source, 'room_id', None) or source.user_id
+    line_bot_api.push_message(target, message)
+    count('line_reply', method='push')
+
+@app.route('/metrics')
+def metrics():
+    """ Prometheus text format: latency histogram ของแต่ละขั้นตอน + ตัวนับ/สถานะคิว/แคช """
+    lines = [registry.render_prometheus()]
+    gauges = {}
+    if dispatcher:
+        for k, v in dispatcher.snapshot().items():
+            gauges[f"lotto_webhook_{k}"] = v
+    for k, v in get_connection_stats().items():
+        gauges[f"lotto_http_connections_{k}"] = v
+    for k, v in response_cache.stats.items():
+        gauges[f"lotto_response_cache_{k}"] = v
+    for k, v in startup.items():
+        gauges[f"lotto_startup_{k}"] = v
+    for name, value in gauges.items():
+        lines.append(f"# TYPE {name} gauge\n{name} {value}\n")
+    return Response("".join(lines), mimetype='text/plain; version=0.0.4')
+
+@app.route('/api/webhook-stats')
+def webhook_stats_api():
+    return jsonify(dispatcher.snapshot() if dispatcher else {'async': False})
 
 @app.route('/dashboard')
 def dashboard_page():
@@ -62,8 +138,43 @@ def dashboard_page():
 # 2. API สำหรับส่งข้อมูล JSON ให้กราฟ
 @app.route('/api/summary')
 def summary_api():
-    data = gemini_logic.get_dashboard_data()
-    return jsonify(data)
+    from src import gemini_logic
+    data = gemini_logic.get_dashboard_data(request.args.get('month'))
+    return conditional_json(data)
+
+# 3. API ยอดหลายเดือนในครั้งเดียว (กราฟแนวโน้ม) เช่น /api/summary/months?months=12
+@app.route('/api/summary/months')
+def summary_months_api():
+    months = min(max(request.args.get('months', 6, type=int), 1), 60)
+    from src import gemini_logic
+    data = gemini_logic.get_dashboard_trend(months)
+    return conditional_json({"months": data})
+
+def conditional_json(data):
+    """ ใส่ ETag / Last-Modified แล้วตอบ 304 ถ้าเบราว์เซอร์มีของล่าสุดอยู่แล้ว """
+    response = jsonify(data)
+    if data:
+        response.set_etag(etag_for(data))
+        try:
+            from src import gemini_logic
+            response.last_modified = gemini_logic.get_monthly_aggregate().last_modified
+        except Exception:
+            pass
+        response.cache_control.no_cache = True
+    return response.make_conditional(request)
+
+def refresh_shared_draws():
+    # import ตอนถึงรอบแรก (หลังบูตไปแล้ว) จะได้ไม่ลาก pandas มาตอนบูต
+    from src.shared_draws import SOURCE_CHECK_INTERVAL
+    time.sleep(SOURCE_CHECK_INTERVAL)
+    from src import bot_logic
+    bot_logic.run_shared_draws_refresher()
+
+startup['import_seconds'] = time.perf_counter() - BOOT_STARTED
+if PREWARM:
+    threading.Thread(target=prewarm, name='prewarm', daemon=True).start()
+# เช็คว่าชีทมีงวดใหม่ไหมเบื้องหลัง request ของผู้ใช้จะได้ไม่ต้องรอโหลดใหม่ทั้งก้อน
+threading.Thread(target=refresh_shared_draws, name='shared-draws-refresher', daemon=True).start()
 
 if __name__ == "__main__":
     port = int(os.environ.get("PORT", 5000))
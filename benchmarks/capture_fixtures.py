@@ -0,0 +1,59 @@
+"""
+บันทึกหน้า "ตรวจหวย" ของ sanook จริงๆ ลง benchmarks/fixtures/captured/ (ใช้ทั้ง benchmark และเช็ค parser)
+
+วิธีใช้ (ต้องต่อเน็ต):
+    python benchmarks/capture_fixtures.py [--count 6]
+
+- ดึงงวดล่าสุด count งวดตามปฏิทินกลาง แล้วเก็บ HTML ตามที่เว็บส่งมา (ไม่แก้ไขอะไร)
+- เทียบทางเร็ว (regex) กับทางสำรอง (BeautifulSoup) ของ src/lotto_page.py ทุกหน้า
+exit code 1 ถ้ามีหน้าที่สองทางแกะได้ไม่ตรงกัน
+"""
+import os
+import sys
+import argparse
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CAPTURED = os.path.join(ROOT, 'benchmarks', 'fixtures', 'captured')
+sys.path.insert(0, ROOT)
+
+from src.http_session import get_with_retries
+from src.draw_calendar import get_calendar
+from src.getLotto import draw_url
+from src.lotto_page import extract_prizes_fast, extract_prizes_soup
+
+def recent_draws(count):
+    now = datetime.now()
+    dates = get_calendar().draws_between(datetime(now.year - 1, 1, 1), now)
+    return dates[-count:]
+
+def check_page(content):
+    """ (ok, fast, soup): ok ถ้าทางสำรองแกะได้และทางเร็วได้ผลเดียวกัน """
+    fast, soup = extract_prizes_fast(content), extract_prizes_soup(content)
+    return soup is not None and fast == soup, fast, soup
+
+def capture(count):
+    os.makedirs(CAPTURED, exist_ok=True)
+    failed = 0
+    for d in recent_draws(count):
+        url = draw_url(d)
+        resp = get_with_retries(url)
+        if resp.status_code != 200:
+            print(f"❌ {d:%d/%m/%Y}: HTTP {resp.status_code}")
+            failed += 1
+            continue
+        path = os.path.join(CAPTURED, f"sanook_check_{url.rstrip('/').rsplit('/', 1)[-1]}.html")
+        with open(path, 'wb') as f:
+            f.write(resp.content)
+        ok, fast, soup = check_page(resp.content)
+        print(f"{'✅' if ok else '❌'} {d:%d/%m/%Y} -> {os.path.relpath(path, ROOT)} ({len(resp.content) / 1024:.0f} KB)")
+        if not ok:
+            print(f"   fast: {fast}\n   soup: {soup}")
+            failed += 1
+    return failed
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Capture real sanook lotto pages as benchmark/parser fixtures")
+    parser.add_argument('--count', type=int, default=6)
+    args = parser.parse_args()
+    sys.exit(1 if capture(args.count) else 0)
@@ -0,0 +1,262 @@
+"""
+Benchmark แยกทีละขั้นตอน (รัน offline ได้ทั้งหมด)
+- HTML ของ sanook: หน้าที่บันทึกจริงใน benchmarks/fixtures/captured/ (สร้างด้วย capture_fixtures.py)
+  ถ้ายังไม่มี ใช้ template สังเคราะห์ benchmarks/fixtures/*.template.html (เติมเลขสุ่ม)
+- ประวัติหวยสังเคราะห์ ขนาดกำหนดได้ (--draws)
+- Google Sheets -> SQLite ชั่วคราว, Gemini / LINE -> ตัวปลอม
+
+วิธีใช้:
+    python benchmarks/run_benchmarks.py --draws 1500 --repeat 5 [--json out.json]
+"""
+import os
+import sys
+import io
+import json
+import glob
+import hmac
+import base64
+import hashlib
+import atexit
+import shutil
+import argparse
+import tempfile
+import contextlib
+import statistics
+import time
+import tracemalloc
+from types import SimpleNamespace
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FIXTURES = os.path.join(ROOT, 'benchmarks', 'fixtures')
+CAPTURED = os.path.join(FIXTURES, 'captured')
+sys.path.insert(0, ROOT)
+
+# ต้องตั้งก่อน import โมดูลของแอป
+TMP = tempfile.mkdtemp(prefix='lotto-bench-')
+atexit.register(shutil.rmtree, TMP, ignore_errors=True)
+LINE_SECRET = 'bench-secret'
+os.environ.update({
+    'STORAGE_BACKEND': 'sqlite',
+    'STORAGE_SQLITE_PATH': os.path.join(TMP, 'bench.db'),
+    'DRAW_STORE_PATH': os.path.join(TMP, 'draws'),
+    'PAGE_CACHE_PATH': os.path.join(TMP, 'page_cache'),
+    'LINE_CHANNEL_ACCESS_TOKEN': 'bench-token',
+    'LINE_CHANNEL_SECRET': LINE_SECRET,
+    'GEMINI_API_KEY': 'bench-key',
+    'ASYNC_WEBHOOK': '0',
+    'PREWARM': '0',
+    'SHARED_DRAWS_PATH': os.path.join(TMP, 'shared'),
+})
+
+import numpy as np
+import pandas as pd
+
+# --- Fixtures ---
+def make_history(n, seed=0):
+    """ ประวัติหวยสังเคราะห์ n งวด รูปแบบเดียวกับในชีท (เรียงใหม่ -> เก่า) """
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range(end=pd.Timestamp.now().normalize(), periods=n, freq='SMS')
+    pre = rng.integers(0, 1000, (n, 2))
+    suf = rng.integers(0, 1000, (n, 2))
+    df = pd.DataFrame({
+        'date': dates.strftime('%Y-%m-%d'),
+        'first_prize': [f"{x:06d}" for x in rng.integers(0, 10**6, n)],
+        'last_two_digits': [f"{x:02d}" for x in rng.integers(0, 100, n)],
+        'prize_pre_3digit': [str([f"{a:03d}", f"{b:03d}"]) for a, b in pre],
+        'prize_suf_3digit': [str([f"{a:03d}", f"{b:03d}"]) for a, b in suf],
+    })
+    return df.iloc[::-1].reset_index(drop=True)
+
+def make_csv(df):
+    """ CSV แบบไฟล์ของ GitHub (heart/Data-Set-Thai-Lotto) """
+    out = df.rename(columns={
+        'first_prize': 'prize_1st', 'last_two_digits': 'prize_2digits', 'prize_suf_3digit': 'prize_sub_3digits',
+    })
+    return out.to_csv(index=False).encode('utf-8')
+
+def load_captured_pages():
+    """ หน้า sanook ที่บันทึกมาจริง (ไม่แก้ไข) """
+    pages = []
+    for path in sorted(glob.glob(os.path.join(CAPTURED, '*.html'))):
+        with open(path, 'rb') as f:
+            pages.append(f.read())
+    return pages
+
+def make_synthetic_pages(count, seed=0):
+    """ หน้าสังเคราะห์จาก template (ใช้เมื่อยังไม่มีหน้าที่บันทึกจริง ไม่ได้ยืนยันว่าตรงกับเว็บจริง) """
+    rng = np.random.default_rng(seed)
+    pages = []
+    for path in sorted(glob.glob(os.path.join(FIXTURES, '*.template.html'))):
+        with open(path, encoding='utf-8') as f:
+            html = f.read()
+        for _ in range(count):
+            near = "".join(
+                f'<div class="lottocheck__column"><span class="default-font--reward">รางวัลที่ {k}</span>'
+                + "".join(f'<strong class="lotto__number">{x:06d}</strong>' for x in rng.integers(0, 10**6, 50))
+                + '</div>' for k in range(2, 6)
+            )
+            page = (html.replace('{{FIRST}}', f"{rng.integers(0, 10**6):06d}")
+                    .replace('{{PRE1}}', f"{rng.integers(0, 1000):03d}").replace('{{PRE2}}', f"{rng.integers(0, 1000):03d}")
+                    .replace('{{SUF1}}', f"{rng.integers(0, 1000):03d}").replace('{{SUF2}}', f"{rng.integers(0, 1000):03d}")
+                    .replace('{{TWO}}', f"{rng.integers(0, 100):02d}")
+                    .replace('{{NAV}}', "".join(f'<li><a href="/n/{i}">เมนู {i}</a></li>' for i in range(150)))
+                    .replace('{{NEAR}}', near)
+                    .replace('{{SIDEBAR}}', "".join(f'<article><h3>ข่าว {i}</h3><p>{"เนื้อหา " * 40}</p></article>' for i in range(40)))
+                    .replace('{{FOOTER}}', "<p>Sanook</p>" * 50))
+            pages.append(page.encode('utf-8'))
+    return pages
+
+def make_pages(count, seed=0):
+    """ คืน (pages, 'captured' | 'synthetic') ใช้หน้าจริงก่อนถ้ามี """
+    captured = load_captured_pages()
+    if captured:
+        return captured, 'captured'
+    print("⚠️ ไม่มีหน้าที่บันทึกจริงใน benchmarks/fixtures/captured/ -> ใช้ template สังเคราะห์"
+          " (รัน benchmarks/capture_fixtures.py เพื่อบันทึก)")
+    return make_synthetic_pages(count, seed), 'synthetic'
+
+class FakeLineApi:
+    def __init__(self):
+        self.sent = 0
+    def reply_message(self, token, message):
+        self.sent += 1
+    def push_message(self, to, message):
+        self.sent += 1
+
+class FakeRouter:
+    """ แทน Gemini: ตอบ JSON บันทึกรายจ่ายทันที """
+    def __init__(self):
+        self.calls = 0
+    def generate(self, contents):
+        self.calls += 1
+        text = '[{"action": "record", "type": "รายจ่าย", "category": "อาหาร", "amount": 50, "note": "ข้าว"}]'
+        return SimpleNamespace(text=text), 'fake-model', ''
+
+def line_body(text):
+    event = {
+        'type': 'message', 'mode': 'active', 'timestamp': int(time.time() * 1000),
+        'source': {'type': 'user', 'userId': 'Ubench'}, 'replyToken': 'bench-reply-token',
+        'webhookEventId': 'bench', 'deliveryContext': {'isRedelivery': False},
+        'message': {'id': '1', 'type': 'text', 'text': text, 'quoteToken': 'q'},
+    }
+    return json.dumps({'destination': 'Ubot', 'events': [event]})
+
+def line_signature(body):
+    digest = hmac.new(LINE_SECRET.encode('utf-8'), body.encode('utf-8'), hashlib.sha256).digest()
+    return base64.b64encode(digest).decode('utf-8')
+
+# --- Runner ---
+def measure(fn, repeat):
+    """ เวลา (ms) หลายรอบ + peak memory (KB) จากอีก 1 รอบภายใต้ tracemalloc """
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - started) * 1000)
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {'median_ms': statistics.median(times), 'min_ms': min(times), 'max_ms': max(times), 'peak_kb': peak / 1024}
+
+def quiet(fn):
+    def run():
+        with contextlib.redirect_stdout(io.StringIO()):
+            return fn()
+    return run
+
+def run(draws, repeat, pages_count):
+    from src.getLotto import parse_lotto_page
+    from src.lotto_page import extract_prizes_soup, extract_prizes_fast
+    from src import shared_draws
+    from src.getOldData import parse_old_data
+    from src.storage import get_storage
+    from src.response_cache import response_cache
+    from src import bot_logic, gemini_logic
+    import lotteryData
+    import lotteryAnalysis
+    import lotteryDayAnalysis
+    import app as web
+
+    history = make_history(draws)
+    csv_bytes = make_csv(history)
+    pages, page_kind = make_pages(pages_count)
+    # ทางเร็วต้องแกะได้ตรงกับทางสำรองทุกหน้า (โดยเฉพาะหน้าที่บันทึกจริง)
+    mismatched = [i for i, p in enumerate(pages) if extract_prizes_fast(p) != extract_prizes_soup(p)]
+    if mismatched:
+        raise SystemExit(f"❌ extract_prizes_fast ไม่ตรงกับ soup ({page_kind} pages: {mismatched})")
+    df_old = parse_old_data(csv_bytes)
+    df_new = history.head(48).copy()
+
+    get_storage().write_draws(history)
+    router = gemini_logic._router = FakeRouter()
+    web.line_bot_api = FakeLineApi()
+    client = web.app.test_client()
+    today = pd.Timestamp.now()
+
+    def parse_pages():
+        for p in pages:
+            parse_lotto_page(p, today)
+
+    def prediction_cold():
+        # เหมือน worker ใหม่: ยังไม่ได้ map ชุดข้อมูลร่วม และแคชทุกชั้นว่าง
+        shared_draws._shared = None
+        for cache in (bot_logic._stats_cache, bot_logic._three_digit_cache, bot_logic._windows_cache,
+                      bot_logic._significance_cache):
+            cache.clear()
+        response_cache.clear()
+        bot_logic.get_prediction_message('หวย')
+
+    def callback(text):
+        body = line_body(text)
+        headers = {'X-Line-Signature': line_signature(body), 'Content-Type': 'application/json'}
+        def send():
+            response_cache.clear()
+            res = client.post('/callback', data=body, headers=headers)
+            assert res.status_code == 200, res.status_code
+        return send
+
+    stages = [
+        (f'parse_lotto_page x{len(pages)} ({page_kind})', parse_pages),
+        (f'extract_prizes_soup x{len(pages)} ({page_kind})', lambda: [extract_prizes_soup(p) for p in pages]),
+        ('parse_old_data (CSV)', lambda: parse_old_data(csv_bytes)),
+        ('merge/dedupe/sort', quiet(lambda: lotteryData.merge_data(df_old.copy(), df_new.copy()))),
+        ('analyze_and_predict', quiet(lambda: lotteryAnalysis.analyze_and_predict(history.copy()))),
+        ('analyze_by_day', quiet(lambda: lotteryDayAnalysis.analyze_by_day(history.copy()))),
+        ('shared draws publish', lambda: bot_logic.refresh_shared_draws(force=True)),
+        (f'significance_report ({bot_logic.SIGNIFICANCE_SIMULATIONS} sims)', bot_logic.load_significance),
+        ('get_prediction_message (cold)', prediction_cold),
+        ('get_prediction_message (warm)', lambda: bot_logic.get_prediction_message('หวย')),
+        ('/callback lotto', callback('หวย')),
+        ('/callback record expense (local)', quiet(callback('ข้าว 50'))),
+        # ชื่อรายการที่ parser ในเครื่องไม่รู้จัก -> ไปทาง Gemini (ตัวปลอม)
+        ('/callback record expense (Gemini)', quiet(callback('ข้าวผัดกะเพราไข่ดาว 65'))),
+    ]
+    results = {}
+    for name, fn in stages:
+        calls = router.calls
+        results[name] = measure(fn, repeat)
+        if name.endswith('(Gemini)') and router.calls == calls:
+            raise SystemExit(f"❌ {name}: ข้อความไม่ได้ไปถึง Gemini (parser ในเครื่องตอบเอง)")
+    return results
+
+def print_report(results, draws):
+    print(f"\n⏱ Benchmark ({draws} draws)")
+    print(f"{'stage':<34} | {'median ms':>10} | {'min ms':>9} | {'max ms':>9} | {'peak KB':>9}")
+    print("-" * 82)
+    for name, r in results.items():
+        print(f"{name:<34} | {r['median_ms']:>10.2f} | {r['min_ms']:>9.2f} | {r['max_ms']:>9.2f} | {r['peak_kb']:>9.0f}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline benchmarks for the lottery pipeline and bot")
+    parser.add_argument('--draws', type=int, default=1500)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--pages', type=int, default=20)
+    parser.add_argument('--json', help="เขียนผลเป็นไฟล์ JSON (ไว้เทียบกับรอบก่อน)")
+    args = parser.parse_args()
+
+    results = run(args.draws, args.repeat, args.pages)
+    print_report(results, args.draws)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'draws': args.draws, 'repeat': args.repeat, 'results': results}, f, indent=2)
@@ -0,0 +1,83 @@
+"""
+วัดเวลา import ตอนบูตเว็บ (python -X importtime) แล้วเทียบกับงบที่ตั้งไว้
+
+วิธีใช้:
+    python benchmarks/startup_report.py [--budget-ms 500] [--top 15] [--json out.json]
+
+- app: สิ่งที่ gunicorn ต้องรอก่อนตอบ request แรก (ควรอยู่ในงบ)
+- โมดูลที่โหลดทีหลัง (ตอนใช้ครั้งแรก / ตอน prewarm) แสดงไว้ให้ดูเฉยๆ
+exit code 1 ถ้า app เกินงบ (ใช้ใน CI ได้)
+"""
+import os
+import sys
+import json
+import argparse
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LAZY_MODULES = ['src.bot_logic', 'src.gemini_logic', 'google.generativeai', 'cloudscraper']
+
+def import_times(statement):
+    """ รัน statement ในโปรเซสใหม่ คืน [(โมดูล, self_us, cumulative_us, ความลึก), ...] ตามลำดับที่ import """
+    env = dict(os.environ, PREWARM='0',
+               LINE_CHANNEL_ACCESS_TOKEN=os.getenv('LINE_CHANNEL_ACCESS_TOKEN', 'startup-report'),
+               LINE_CHANNEL_SECRET=os.getenv('LINE_CHANNEL_SECRET', 'startup-report'))
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', statement],
+                          cwd=ROOT, env=env, capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise SystemExit(proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else "import failed")
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cum_us, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append((name.strip(), int(self_us), int(cum_us), depth))
+    return rows
+
+def report(budget_ms, top):
+    rows = import_times('import app')
+    app_at = next(i for i, row in enumerate(rows) if row[0] == 'app')
+    total_ms = rows[app_at][2] / 1000
+    # โมดูลที่ app import ตรงๆ (ความลึก 1 ที่อยู่ก่อนแถว app) เรียงตามเวลารวม
+    children = []
+    for name, _, cum, depth in reversed(rows[:app_at]):
+        if depth == 0:
+            break
+        if depth == 1:
+            children.append((name, cum / 1000))
+    direct = sorted(children, key=lambda r: -r[1])
+
+    lazy = {}
+    for module in LAZY_MODULES:
+        loaded = import_times(f'import app, {module}')
+        lazy[module] = next((cum / 1000 for name, _, cum, _ in loaded if name == module), 0.0)
+
+    return {'budget_ms': budget_ms, 'app_ms': total_ms, 'direct': direct[:top], 'lazy_ms': lazy}
+
+def print_report(result):
+    print(f"\n🚀 import app: {result['app_ms']:.0f} ms (งบ {result['budget_ms']:.0f} ms)")
+    print(f"{'module':<40} | {'ms':>8}")
+    print("-" * 51)
+    for name, ms in result['direct']:
+        print(f"{name:<40} | {ms:>8.1f}")
+    print("\n💤 โหลดทีหลัง (ใช้ครั้งแรก / prewarm):")
+    for name, ms in result['lazy_ms'].items():
+        print(f"{name:<40} | {ms:>8.1f}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Import-time report for the web app")
+    parser.add_argument('--budget-ms', type=float, default=500)
+    parser.add_argument('--top', type=int, default=15)
+    parser.add_argument('--json', help="เขียนผลเป็นไฟล์ JSON")
+    args = parser.parse_args()
+
+    result = report(args.budget_ms, args.top)
+    print_report(result)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(result, f, indent=2)
+    if result['app_ms'] > args.budget_ms:
+        print(f"\n❌ เกินงบ {result['app_ms'] - args.budget_ms:.0f} ms")
+        sys.exit(1)
+    print("\n✅ อยู่ในงบ")
@@ -0,0 +1,11 @@
+# gunicorn.conf.py (gunicorn อ่านไฟล์นี้เองอัตโนมัติ ใช้กับ Procfile: web: gunicorn app:app)
+import sys
+import subprocess
+
+def when_ready(server):
+    """
+    โหลดผลหวยครั้งเดียวลง shared memory (src/shared_draws.py) ให้ทุก worker map ใช้ร่วมกัน
+    รันเป็นโปรเซสแยก ไม่ถ่วงการบูตของ master และ worker ที่มาถึงก่อนจะรอ lock เดียวกัน (ไม่โหลดซ้ำ)
+    """
+    server.log.info("Preloading shared draw dataset")
+    subprocess.Popen([sys.executable, '-c', 'from src.bot_logic import refresh_shared_draws; refresh_shared_draws()'])
@@ -1,6 +1,9 @@
 import pandas as pd
-import gspread
-from oauth2client.service_account import ServiceAccountCredentials
+from src.draw_store import store_exists, load_draws, DRAW_STORE_PATH
+from src.storage import create_storage
+from src.draw_stats import DrawStatsIndex, load_stats_index
+from src.draw_analytics import analyze_three_digits, top_numbers, top_pairs
+from src.draw_windows import RollingFrequency
 
 # --- Config ---
 JSON_KEY_PATH = 'core/credentials.json'
@@ -8,27 +11,26 @@ SHEET_NAME = 'LotteryData'
 
 def get_data_from_sheet():
     print("☁️ กำลังดึงข้อมูลจาก Google Sheet...")
-    scope = ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
-    creds = ServiceAccountCredentials.from_json_keyfile_name(JSON_KEY_PATH, scope)
-    client = gspread.authorize(creds)
-    sheet = client.open(SHEET_NAME).sheet1
-    data = sheet.get_all_records()
-    return pd.DataFrame(data)
+    return create_storage(credentials_path=JSON_KEY_PATH).read_draws()
 
-def analyze_and_predict(df):
-    # 1. Cleaning Data
-    df['last_two_digits'] = df['last_two_digits'].astype(str).str.zfill(2)
-    total_draws = len(df)
+def get_data():
+    """ ใช้ไฟล์ในเครื่อง (data/draws) ถ้ามี ไม่งั้นดึงจาก Google Sheet """
+    if store_exists():
+        print(f"💾 โหลดข้อมูลจากไฟล์ในเครื่อง ({DRAW_STORE_PATH})")
+        return load_draws()
+    return get_data_from_sheet()
+
+def analyze_and_predict(df, stats_index=None):
+    # 1. ใช้ดัชนีสถิติที่คำนวณไว้แล้ว (ถ้าไม่ส่งมา ก็สร้างจาก df ครั้งเดียว)
+    if stats_index is None:
+        stats_index = DrawStatsIndex.from_frame(df)
+    total_draws = stats_index.total
     
     print(f"\n📊 ฐานข้อมูล: {total_draws} งวด ({df['date'].min()} - {df['date'].max()})")
     
-    # 2. คำนวณความถี่ (Frequency)
-    stats = df['last_two_digits'].value_counts().reset_index()
-    stats.columns = ['number', 'frequency']
-    
-    # 3. คำนวณความน่าจะเป็น (%)
+    # 2. ความถี่ (Frequency) + 3. ความน่าจะเป็น (%)
     # สูตร: (จำนวนครั้งที่ออก / จำนวนงวดทั้งหมด) * 100
-    stats['probability'] = (stats['frequency'] / total_draws) * 100
+    top_5 = stats_index.top(5)
     
     # --- ส่วนทำนาย: TOP 5 ---
     print("\n" + "="*55)
@@ -37,13 +39,9 @@ def analyze_and_predict(df):
     print(f"{'อันดับ':<6} | {'เลข':<6} | {'เคยออก (ครั้ง)':<15} | {'ความน่าจะเป็น (%)'}")
     print("-" * 55)
     
-    top_5 = stats.head(5)
-    
-    for i, row in top_5.iterrows():
+    for i, (number, count) in enumerate(top_5):
         rank = i + 1
-        number = row['number']
-        count = row['frequency']
-        percent = row['probability']
+        percent = (count / total_draws) * 100
         
         # แสดงผล
         print(f"{rank:<6} | {number:<6} | {count:<15} | {percent:.2f}%")
@@ -54,12 +52,11 @@ def analyze_and_predict(df):
     # คือเลขที่ "ปกติออกบ่อย" แต่ "หายหน้าไปนาน" (ระเบิดเวลา)
     print("\n💣 เลขระเบิดเวลา (ออกบ่อย แต่หายไปนาน):")
     
-    # หาว่าเลขแต่ละตัว ออกครั้งล่าสุดเมื่อไหร่
+    # หาว่าเลขแต่ละตัว ออกครั้งล่าสุดเมื่อไหร่ (อ่านจากดัชนี last_seen)
     last_seen = []
-    for n in top_5['number']: # เช็คเฉพาะตัวท็อป 5
-        matches = df.index[df['last_two_digits'] == n].tolist()
-        if matches:
-            draws_ago = matches[0] # index 0 คือล่าสุด
+    for n, _ in top_5: # เช็คเฉพาะตัวท็อป 5
+        draws_ago = stats_index.draws_ago(n)
+        if draws_ago is not None:
             last_seen.append({'number': n, 'draws_ago': draws_ago})
             
     # เรียงลำดับตามความนานที่หายไป
@@ -68,9 +65,49 @@ def analyze_and_predict(df):
     for item in overdue_top:
         print(f"   -> เลข {item['number']} ไม่มาแล้ว {item['draws_ago']} งวด")
 
+def analyze_recent_windows(df, windows=None):
+    """ TOP 5 ย้อนหลัง 1 ปี / 5 ปี และแบบถ่วงน้ำหนัก (งวดใหม่มีน้ำหนักมากกว่า) """
+    if windows is None:
+        windows = RollingFrequency.from_frame(df)
+    
+    print("\n⏳ TOP 5 ตามช่วงเวลา:")
+    for years in (1, 5):
+        counts = windows.last_years(years)
+        picks = ", ".join(f"{num} ({count})" for num, count in windows.top(counts, 5))
+        print(f"   -> ย้อนหลัง {years} ปี ({counts.sum()} งวด): {picks}")
+    picks = ", ".join(num for num, _ in windows.top(windows.decayed(half_life=24), 5))
+    print(f"   -> ถ่วงน้ำหนัก (half-life 24 งวด): {picks}")
+    return windows
+
+def analyze_three_digit_prizes(df):
+    """ สถิติรางวัลเลขหน้า/เลขท้าย 3 ตัว (ความถี่, คู่ที่ออกพร้อมกัน, ตำแหน่งหลัก) """
+    result = analyze_three_digits(df)
+    if not result['draws']:
+        print("\nไม่พบข้อมูลรางวัล 3 ตัว")
+        return result
+    
+    print("\n" + "="*55)
+    print(f"🎯 รางวัลเลข 3 ตัว ({result['draws']} งวด)")
+    print("="*55)
+    for number, count in top_numbers(result['frequency'], 5, width=3):
+        gap = result['gaps']['current_gap'][int(number)]
+        print(f"   -> เลข {number} ออก {count} ครั้ง (ไม่มาแล้ว {gap} งวด)")
+    
+    print("\n👯 คู่ที่ออกพร้อมกันบ่อยสุด:")
+    for (a, b), count in top_pairs(result['co_occurrence'], 3):
+        print(f"   -> {a} + {b} ({count} ครั้ง)")
+    
+    print("\n🔢 เลขโดดที่ออกบ่อยสุดแต่ละหลัก:")
+    for pos, name in enumerate(['ร้อย', 'สิบ', 'หน่วย']):
+        row = result['digit_positions'][pos]
+        print(f"   -> หลัก{name}: {row.argmax()} ({row.max()} ครั้ง)")
+    return result
+
 if __name__ == "__main__":
     try:
-        df = get_data_from_sheet()
-        analyze_and_predict(df)
+        df = get_data()
+        analyze_and_predict(df, load_stats_index())
+        analyze_recent_windows(df)
+        analyze_three_digit_prizes(df)
     except Exception as e:
         print(f"❌ Error: {e}")
\ No newline at end of file
@@ -0,0 +1,25 @@
+import sys
+from src.draw_store import store_exists, load_arrays, build_arrays
+from src.backtest import run_backtest
+from lotteryAnalysis import get_data_from_sheet
+
+def print_report(results, elapsed):
+    print("\n" + "="*65)
+    print("🧪 Backtest: ทายจากข้อมูลก่อนหน้าเท่านั้น แล้วเทียบกับผลจริง")
+    print("="*65)
+    print(f"{'กลยุทธ์':<14} | {'งวดที่ทดสอบ':<11} | {'ถูก':<5} | {'Hit rate':<9} | {'สุ่ม':<6} | {'เวลา (s)'}")
+    print("-" * 65)
+    for r in results:
+        print(f"{r['strategy']:<14} | {r['tested']:<11} | {r['hits']:<5} | {r['hit_rate']*100:>7.2f}% | "
+              f"{r['baseline']*100:>4.1f}% | {r['seconds']:.2f}")
+    print("-" * 65)
+    print(f"⏱ รวม {elapsed:.2f} วินาที")
+
+if __name__ == "__main__":
+    try:
+        arrays = load_arrays() if store_exists() else build_arrays(get_data_from_sheet())
+        min_history = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+        results, elapsed = run_backtest(arrays, min_history=min_history)
+        print_report(results, elapsed)
+    except Exception as e:
+        print(f"❌ Error: {e}")
@@ -1,27 +1,44 @@
 # main.py
+import os
+import sys
+import json
+import time
 import pandas as pd
+from datetime import datetime
 # Import จาก folder services ที่เราสร้าง
 from src.getOldData import fetch_old_data
-from src.getLotto import fetch_current_year_data
-from src.gsheet_upload import upload_data
+from src.getLotto import fetch_current_year_data, fetch_dates_concurrent, load_cached_draws
+from src.gsheet_upload import upload_data, append_data, get_latest_date
+from src.draw_store import save_draws, merge_draws
+from src.draw_stats import refresh_stats_index
+from src.draw_calendar import get_calendar, refresh_calendar
+from src.storage import create_storage
+from src.metrics import registry, span
 
 # Config
 JSON_KEY_PATH = 'core/credentials.json'
 TARGET_SHEET_NAME = 'LotteryData'
+CHECKPOINT_PATH = 'core/sync_checkpoint.json'
+TIMING_PATH = 'data/pipeline_timing.json'
 
-def main():
-    print("🚀 STARTING LOTTERY PIPELINE...")
-    
-    # 1. ดึงของเก่า
-    df_old = fetch_old_data()
-    print(f"   📦 Old Data (GitHub): {len(df_old)} rows (Last: {df_old['date'].max()})")
-    
-    # 2. ดึงของใหม่ (Auto Date)
-    df_new = fetch_current_year_data()
-    print(f"   🕵️ New Data (Scraper): {len(df_new)} rows")
-    
-    # 3. รวมร่าง
-    print("\n🔄 3. Merging Data...")
+def load_checkpoint():
+    """ อ่าน (วันที่งวดล่าสุดที่ sync แล้ว, งวดก่อนหน้านั้นที่ยังดึงไม่สำเร็จ) จากไฟล์ในเครื่อง """
+    try:
+        with open(CHECKPOINT_PATH, encoding='utf-8') as f:
+            data = json.load(f)
+        pending = [pd.to_datetime(d).to_pydatetime() for d in data.get('pending_dates', [])]
+        return pd.to_datetime(data['latest_date']), pending
+    except (OSError, KeyError, ValueError):
+        return None, []
+
+def save_checkpoint(latest_date, pending_dates=()):
+    os.makedirs(os.path.dirname(CHECKPOINT_PATH), exist_ok=True)
+    with open(CHECKPOINT_PATH, 'w', encoding='utf-8') as f:
+        json.dump({'latest_date': pd.to_datetime(latest_date).strftime('%Y-%m-%d'),
+                   'pending_dates': [d.strftime('%Y-%m-%d') for d in sorted(pending_dates)]}, f)
+
+def merge_data(df_old, df_new):
+    """ รวมของเก่า + ของใหม่ ลบวันที่ซ้ำ (เก็บตัวใหม่) เรียงใหม่ -> เก่า """
     if not df_new.empty:
         # รวมกัน
         df_final = pd.concat([df_old, df_new])
@@ -37,14 +54,156 @@ def main():
         df_final['date'] = pd.to_datetime(df_final['date'])
         
     # จัดระเบียบ
-    df_final = df_final.sort_values(by='date', ascending=False)
+    return df_final.sort_values(by='date', ascending=False)
+
+def refresh_indexes():
+    """ อัปเดตดัชนีสถิติ + ปฏิทินวันหวยออก (เรียนจากข้อมูลจริง) หลังบันทึกข้อมูล """
+    refresh_stats_index()
+    _, report = refresh_calendar()
+    recent = {year: diff for year, diff in report.items() if year >= datetime.now().year - 2}
+    for year, diff in recent.items():
+        extra = ', '.join(d.strftime('%d/%m') for d in diff['missing'])
+        skipped = ', '.join(d.strftime('%d/%m') for d in diff['unexpected'])
+        print(f"   📅 {year}: ปฏิทินไม่ตรงข้อมูล (มีผลเพิ่ม: {extra or '-'} -> เพิ่มเป็นวันหวยออก"
+              f" | ยังไม่มีผล: {skipped or '-'} -> ลองดึงใหม่จนกว่าจะยืนยันว่าไม่มีงวด)")
+
+def main():
+    print("🚀 STARTING LOTTERY PIPELINE...")
+    
+    # 1. ดึงของเก่า
+    with span('pipeline_stage', stage='fetch_old_data'):
+        df_old = fetch_old_data()
+    print(f"   📦 Old Data (GitHub): {len(df_old)} rows (Last: {df_old['date'].max()})")
+    
+    # 2. ดึงของใหม่ (Auto Date)
+    with span('pipeline_stage', stage='scrape'):
+        df_new = fetch_current_year_data(concurrent=True)
+    print(f"   🕵️ New Data (Scraper): {len(df_new)} rows")
+    
+    # 3. รวมร่าง
+    print("\n🔄 3. Merging Data...")
+    with span('pipeline_stage', stage='merge'):
+        df_final = merge_data(df_old, df_new)
     print(f"   📊 Final Data: {len(df_final)} rows (Latest date: {df_final['date'].max()})") # เช็คบรรทัดนี้ว่าวันที่ล่าสุดคือ 2025 ไหม?
+    latest_date = df_final['date'].max()
     
     df_final['date'] = df_final['date'].dt.strftime('%Y-%m-%d')
     df_final = df_final.fillna('-')
+
+    # 4. บันทึกลงไฟล์ในเครื่อง (แหล่งข้อมูลหลักของงานวิเคราะห์)
+    with span('pipeline_stage', stage='save_local'):
+        save_draws(df_final)
+        refresh_indexes()
     
-    # 4. ส่งขึ้น Cloud
-    upload_data(df_final, JSON_KEY_PATH, TARGET_SHEET_NAME)
+    # 5. ส่งขึ้น storage (Google Sheets เป็น mirror)
+    with span('pipeline_stage', stage='upload'):
+        uploaded = upload_data(df_final, JSON_KEY_PATH, TARGET_SHEET_NAME, create_storage(credentials_path=JSON_KEY_PATH))
+    # บันทึก checkpoint เฉพาะเมื่อขึ้นชีทสำเร็จ ไม่งั้นรอบ incremental จะข้ามงวดที่ยังไม่ถึงชีท
+    if uploaded:
+        save_checkpoint(latest_date)
+
+def main_incremental():
+    """ โหมด Incremental: ดึงเฉพาะงวดที่ใหม่กว่าที่มีในชีท แล้วต่อท้ายทีเดียว """
+    print("🚀 STARTING LOTTERY PIPELINE (incremental)...")
+
+    # 1. หาวันที่งวดล่าสุดที่มีอยู่แล้ว (ไฟล์ checkpoint ก่อน ถ้าไม่มีค่อยถามชีท)
+    storage = create_storage(credentials_path=JSON_KEY_PATH)
+    latest, pending = load_checkpoint()
+    if latest is None:
+        with span('pipeline_stage', stage='latest_date'):
+            latest = get_latest_date(JSON_KEY_PATH, TARGET_SHEET_NAME, storage)
+    if latest is None:
+        print("⚠️ ไม่รู้ว่าข้อมูลล่าสุดคืองวดไหน -> รันแบบเต็ม")
+        return main()
+    print(f"   📌 Latest stored draw: {latest.strftime('%Y-%m-%d')}")
+
+    # 2. สร้างเฉพาะวันที่ที่ยังไม่มี + งวดที่รอบก่อนดึงไม่สำเร็จ (ลองใหม่ทุกรอบจนได้ หรือยืนยันว่าไม่มีงวด)
+    calendar = get_calendar()
+    pending = [d for d in pending if d not in calendar.no_draw]
+    if pending:
+        print(f"   🔁 Retrying {len(pending)} earlier draw(s): {', '.join(d.strftime('%d/%m/%Y') for d in pending)}")
+    target_dates = sorted(set(pending) | set(calendar.draws_between(latest + pd.Timedelta(days=1), datetime.now(), candidates=True)))
+    if not target_dates:
+        print("✅ ข้อมูลเป็นปัจจุบันแล้ว ไม่ต้องทำอะไร")
+        return
+
+    print(f"🕵️ 2. Fetching {len(target_dates)} missing draw(s) ...")
+    with span('pipeline_stage', stage='scrape'):
+        results, stats = fetch_dates_concurrent(target_dates)
+    for d in stats['failed_dates']:
+        print(f"   -> ❌ Failed: {d.strftime('%d/%m/%Y')}")
+    # งวดที่พลาด (และยังไม่ยืนยันว่าไม่มีงวด) แต่เก่ากว่า checkpoint ใหม่ ต้องจำไว้ ไม่งั้นรอบหน้าจะข้ามไปเลย
+    no_draw = get_calendar().no_draw
+    failed = [d for d in stats['failed_dates'] if d not in no_draw]
+    if not results:
+        print("⚠️ ยังไม่มีงวดใหม่")
+        save_checkpoint(latest, [d for d in failed if d < latest])
+        return
+
+    # 3. เรียงใหม่ -> เก่า ให้ตรงกับชีท แล้วแทรกทีเดียว
+    df_new = pd.DataFrame(results).sort_values(by='date', ascending=False)
+    new_latest = max(latest, df_new['date'].max())   # งวดที่ลองใหม่เก่ากว่า latest ไม่ทำให้ checkpoint ถอยหลัง
+    df_new['date'] = pd.to_datetime(df_new['date']).dt.strftime('%Y-%m-%d')
+    df_new = df_new.fillna('-')
+    with span('pipeline_stage', stage='save_local'):
+        if merge_draws(df_new, load_history=storage.read_draws):
+            refresh_indexes()
+
+    with span('pipeline_stage', stage='upload'):
+        uploaded = append_data(df_new, JSON_KEY_PATH, TARGET_SHEET_NAME, storage)
+    if uploaded:
+        save_checkpoint(new_latest, [d for d in failed if d < new_latest])
+
+def main_from_cache():
+    """ สร้างประวัติทั้งหมดใหม่จากไฟล์ดิบในแคชเท่านั้น (ไม่ยิงเว็บ ไม่เขียนชีท)
+    ใช้หลังแก้ตัวแกะ HTML หรือเมื่อรอบก่อนค้างกลางทาง """
+    print("🚀 STARTING LOTTERY PIPELINE (from cache)...")
+
+    with span('pipeline_stage', stage='fetch_old_data'):
+        df_old = fetch_old_data(offline=True)
+    print(f"   📦 Old Data (cached CSV): {len(df_old)} rows")
+
+    with span('pipeline_stage', stage='parse_cached_pages'):
+        df_pages = load_cached_draws()
+    print(f"   🗂 Cached pages: {len(df_pages)} draws")
+    if df_old.empty and df_pages.empty:
+        print("⚠️ แคชว่าง -> รันแบบปกติก่อนอย่างน้อยหนึ่งครั้ง")
+        return
+
+    with span('pipeline_stage', stage='merge'):
+        df_final = merge_data(df_old, df_pages)
+    print(f"   📊 Final Data: {len(df_final)} rows (Latest date: {df_final['date'].max()})")
+    df_final['date'] = df_final['date'].dt.strftime('%Y-%m-%d')
+    df_final = df_final.fillna('-')
+
+    with span('pipeline_stage', stage='save_local'):
+        save_draws(df_final)
+        refresh_indexes()
+
+def report_timing(mode, elapsed):
+    """ สรุปเวลาแต่ละขั้นตอนของรอบนี้ (พิมพ์ + บันทึกเป็น JSON) """
+    summary = registry.summary()
+    print("\n⏱ Timing summary")
+    for name, s in sorted(summary.items(), key=lambda kv: -kv[1]['total']):
+        print(f"   {name:<45} {s['total']:>8.2f}s  (x{s['count']})")
+    print(f"   {'total':<45} {elapsed:>8.2f}s")
+    try:
+        os.makedirs(os.path.dirname(TIMING_PATH), exist_ok=True)
+        with open(TIMING_PATH, 'w', encoding='utf-8') as f:
+            json.dump({'mode': mode, 'finished_at': datetime.now().isoformat(timespec='seconds'),
+                       'elapsed': elapsed, 'spans': summary}, f, ensure_ascii=False, indent=2)
+    except OSError as e:
+        print(f"   ⚠️ เขียนไฟล์สรุปเวลาไม่ได้: {e}")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    mode = 'incremental' if '--incremental' in sys.argv else 'from_cache' if '--from-cache' in sys.argv else 'full'
+    started = time.perf_counter()
+    try:
+        if mode == 'incremental':
+            main_incremental()
+        elif mode == 'from_cache':
+            main_from_cache()
+        else:
+            main()
+    finally:
+        report_timing(mode, time.perf_counter() - started)
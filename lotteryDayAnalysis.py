@@ -1,7 +1,10 @@
 import pandas as pd
-import gspread
-from oauth2client.service_account import ServiceAccountCredentials
-from datetime import datetime, timedelta
+from src.draw_store import store_exists, load_draws, DRAW_STORE_PATH
+from src.storage import create_storage
+from src.draw_stats import DrawStatsIndex, load_stats_index
+from src.draw_calendar import get_calendar
+from src.draw_significance import contingency_chi_square, verdict
+from datetime import datetime
 
 # --- Config ---
 JSON_KEY_PATH = 'core/credentials.json'
@@ -9,54 +12,32 @@ SHEET_NAME = 'LotteryData'
 
 def get_data_from_sheet():
     print("☁️ กำลังดึงข้อมูลจาก Google Sheet...")
-    scope = ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
-    creds = ServiceAccountCredentials.from_json_keyfile_name(JSON_KEY_PATH, scope)
-    client = gspread.authorize(creds)
-    sheet = client.open(SHEET_NAME).sheet1
-    data = sheet.get_all_records()
-    return pd.DataFrame(data)
+    return create_storage(credentials_path=JSON_KEY_PATH).read_draws()
 
-def get_next_lotto_date():
-    """ คำนวณหาวันหวยออกงวดถัดไป (1 หรือ 16) โดยอิงจากวันนี้ """
-    today = datetime.now()
-    
-    # ถ้าวันนี้เป็นวันหวยออก (1 หรือ 16) ก็ใช้วันนี้เลย
-    if today.day == 1 or today.day == 16 or (today.month == 1 and today.day == 2): # เช็คเคส 2 ม.ค.
-        return today
+def get_data():
+    """ ใช้ไฟล์ในเครื่อง (data/draws) ถ้ามี ไม่งั้นดึงจาก Google Sheet """
+    if store_exists():
+        print(f"💾 โหลดข้อมูลจากไฟล์ในเครื่อง ({DRAW_STORE_PATH})")
+        return load_draws()
+    return get_data_from_sheet()
 
-    # ถ้าไม่ใช่ ให้ลองขยับวันไปข้างหน้าเรื่อยๆ จนกว่าจะเจอวันหวยออก
-    next_date = today
-    while True:
-        next_date += timedelta(days=1)
-        # กฎปกติ: วันที่ 1 หรือ 16
-        if next_date.day == 1 or next_date.day == 16:
-            # เช็ควันครู (16 ม.ค. -> 17)
-            if next_date.month == 1 and next_date.day == 16:
-                next_date += timedelta(days=1)
-            # เช็ควันแรงงาน (1 พ.ค. -> 2)
-            elif next_date.month == 5 and next_date.day == 1:
-                next_date += timedelta(days=1)
-            return next_date
-        
-        # กฎพิเศษ: หวยปีใหม่ (2 ม.ค.)
-        if next_date.month == 1 and next_date.day == 2:
-            return next_date
+def get_next_lotto_date():
+    """ วันหวยออกงวดถัดไป (ถ้าวันนี้หวยออกก็คือวันนี้) จากปฏิทินกลาง """
+    return get_calendar().next_draw_date(datetime.now())
 
-def analyze_by_day(df):
+def analyze_by_day(df, stats_index=None):
     print("\n" + "="*65)
     print("📅 เจาะลึกสถิติ: เลขท้าย 2 ตัว ตามวันในสัปดาห์")
     print("="*65)
 
-    df['last_two_digits'] = df['last_two_digits'].astype(str).str.zfill(2)
-    df['date'] = pd.to_datetime(df['date'], errors='coerce')
-    df = df.dropna(subset=['date']).copy()
+    # ใช้ดัชนีสถิติแยกตามวัน (ถ้าไม่ส่งมา ก็สร้างจาก df ครั้งเดียว)
+    if stats_index is None:
+        stats_index = DrawStatsIndex.from_frame(df)
     
     days_map = {
         0: 'วันจันทร์ 💛', 1: 'วันอังคาร 🩷', 2: 'วันพุธ 💚', 
         3: 'วันพฤหัสบดี 🧡', 4: 'วันศุกร์ 💙', 5: 'วันเสาร์ 💜', 6: 'วันอาทิตย์ ❤️'
     }
-    df['day_of_week'] = df['date'].dt.dayofweek
-    df['day_name'] = df['day_of_week'].map(days_map)
 
     # --- ส่วนที่แก้ไข: คำนวณวันงวดหน้าอัตโนมัติ ---
     target_date = get_next_lotto_date()
@@ -71,23 +52,28 @@ def analyze_by_day(df):
     print(f"🔮 เก็งงวดหน้า ({date_str}) ตรงกับ: {target_day_name}")
     print("="*65)
     
-    if target_day_code in df['day_of_week'].unique():
-        target_subset = df[df['day_of_week'] == target_day_code]
-        total_recs = len(target_subset)
+    total_recs = stats_index.weekday_total(target_day_code)
+    if total_recs:
         print(f"สถิติย้อนหลังของ {target_day_name} (ทั้งหมด {total_recs} งวด):")
         
-        target_stats = target_subset['last_two_digits'].value_counts().head(5)
+        target_stats = stats_index.top(5, weekday=target_day_code)
         
         print(f"\n🏆 เลขที่ออกบ่อยที่สุดใน {target_day_name} คือ:")
-        for num, count in target_stats.items():
+        for num, count in target_stats:
             prob = (count / total_recs) * 100
             print(f"-> เลข {num} (ออก {count} ครั้ง | {prob:.1f}%)")
     else:
         print("ไม่พบข้อมูลสถิติของวันนี้")
 
+    # เลขที่ออกขึ้นกับวันในสัปดาห์จริงไหม (chi-square ของตาราง วัน x เลข)
+    test = contingency_chi_square(stats_index.weekday_counts)
+    print(f"\n📐 ทดสอบความเป็นอิสระของวัน: χ²={test['statistic']:.1f} (df={test['dof']}) p={test['p_value']:.3f}"
+          f" -> {verdict(test['p_value'])}")
+    print("   (ตารางมีช่องเล็กมาก ค่านี้เป็นค่าประมาณ ดู permutation test ใน lotterySignificance.py)")
+
 if __name__ == "__main__":
     try:
-        df = get_data_from_sheet()
-        analyze_by_day(df)
+        df = get_data()
+        analyze_by_day(df, load_stats_index())
     except Exception as e:
         print(f"❌ Error: {e}")
\ No newline at end of file
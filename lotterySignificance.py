@@ -0,0 +1,36 @@
+import sys
+from src.draw_store import store_exists, load_arrays, build_arrays
+from src.draw_significance import significance_report, verdict
+from lotteryAnalysis import get_data_from_sheet
+
+def print_line(name, result, extra=""):
+    print(f"{name:<32} | p={result['p_value']:.4f} | {verdict(result['p_value'])}{extra}")
+
+def print_report(report):
+    print("\n" + "="*75)
+    print(f"📐 ทดสอบความสุ่มของผลหวย ({report['draws']} งวด)")
+    print("="*75)
+    for label, key in (("เลขท้าย 2 ตัว", 'two_digit'), ("เลข 3 ตัว (หน้า + ท้าย)", 'three_digit')):
+        part = report[key]
+        print(f"\n🔢 {label}")
+        print_line("chi-square (ทุกเลขโอกาสเท่ากัน)", part['uniformity'], f" (χ²={part['uniformity']['statistic']:.1f}, df={part['uniformity']['dof']})")
+        print_line("runs test (สูง/ต่ำสลับกัน)", part['runs'], f" (runs={part['runs']['runs']}, คาด {part['runs']['expected']:.0f})")
+        print_line("serial correlation (lag 1)", part['serial'], f" (r={part['serial']['r']:+.3f})")
+        top = part['top_counts']
+        print(f"   TOP 5 เทียบ Monte Carlo {top['simulations']} รอบ:")
+        for rank, (obs, exp, p) in enumerate(zip(top['observed'], top['expected_top'], top['p_values']), 1):
+            print(f"   - อันดับ {rank}: ออก {obs} ครั้ง (สุ่มได้ราว {exp:.1f}) p={p:.4f}")
+
+    wd = report['weekday']
+    print("\n📅 เลขท้าย 2 ตัวขึ้นกับวันในสัปดาห์ไหม")
+    print_line(f"permutation ({wd['permutations']} รอบ)", wd, f" (χ²={wd['statistic']:.1f}, ค่าประมาณ p={wd['chi_square_p']:.4f})")
+    print("-" * 75)
+    print(f"⏱ {report['seconds']:.2f} วินาที")
+
+if __name__ == "__main__":
+    try:
+        arrays = load_arrays() if store_exists() else build_arrays(get_data_from_sheet())
+        n_perm = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+        print_report(significance_report(arrays, n_perm=n_perm, workers=None))
+    except Exception as e:
+        print(f"❌ Error: {e}")
@@ -0,0 +1,83 @@
+# services/backtest.py
+"""
+Backtest แบบ walk-forward ของวิธีเลือกเลขที่บอทใช้อยู่
+ทุกงวด: เลือกเลขจากข้อมูล "ก่อนหน้า" งวดนั้นเท่านั้น แล้วดูว่าถูกเลขท้าย 2 ตัวไหม
+สถิติเดินหน้าทีละงวดด้วย DrawStatsIndex.add_draw (ไม่ต้องสแกนประวัติใหม่ทุกงวด)
+"""
+import time
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from src.draw_store import two_digit_draws
+from src.draw_stats import DrawStatsIndex, weekday_of
+
+def _top(counts, n):
+    return np.argsort(-counts, kind='stable')[:n]
+
+# --- กลยุทธ์: รับ (index, weekday ของงวดที่จะทาย) คืน array ของเลขที่เลือก ---
+def strategy_top5(index, weekday):
+    """ TOP 5 สถิติรวม (analyze_and_predict / get_prediction_message) """
+    return _top(index.counts, 5)
+
+def strategy_weekday_top5(index, weekday):
+    """ TOP 5 เฉพาะวันในสัปดาห์ของงวดนั้น (analyze_by_day) """
+    return _top(index.weekday_counts[weekday], 5)
+
+def strategy_weekday_top3(index, weekday):
+    """ TOP 3 มาแรงเฉพาะวัน (get_prediction_message) """
+    return _top(index.weekday_counts[weekday], 3)
+
+def strategy_overdue(index, weekday):
+    """ ระเบิดเวลา แบบที่ analyze_and_predict แสดงจริง: TOP 5 ที่เคยออก เรียงตามหายไปนานสุด
+    การเรียงไม่เปลี่ยนชุดเลข ผลจึงเท่ากับ top5 เสมอ (ยกเว้นช่วงที่บางเลขยังไม่เคยออก) """
+    candidates = _top(index.counts, 5)
+    candidates = candidates[index.last_seen[candidates] >= 0]
+    draws_ago = index.total - 1 - index.last_seen[candidates]
+    return candidates[np.argsort(-draws_ago, kind='stable')]
+
+STRATEGIES = {
+    'top5': strategy_top5,
+    'weekday_top5': strategy_weekday_top5,
+    'weekday_top3': strategy_weekday_top3,
+    'overdue': strategy_overdue,
+}
+
+def run_strategy(name, dates, values, min_history=100):
+    """ เดินหน้าทีละงวด คืน dict ผลลัพธ์ของกลยุทธ์เดียว """
+    started = time.perf_counter()
+    strategy = STRATEGIES[name]
+    dates = np.asarray(dates).astype('datetime64[D]')
+    values = np.asarray(values).astype(np.int64)
+    weekdays = weekday_of(dates)
+
+    index = DrawStatsIndex()
+    tested = hits = picked = 0
+    for d, wd, actual in zip(dates, weekdays, values):
+        if index.total >= min_history:
+            picks = strategy(index, wd)
+            tested += 1
+            picked += len(picks)
+            hits += int(actual in picks)
+        index.add_draw(d, actual)
+
+    return {
+        'strategy': name,
+        'tested': tested,
+        'hits': hits,
+        'hit_rate': hits / tested if tested else 0.0,
+        # ถ้าสุ่มเลือก k เลขจาก 100 โอกาสถูก = k/100
+        'baseline': (picked / tested) / 100 if tested else 0.0,
+        'seconds': time.perf_counter() - started,
+    }
+
+def run_backtest(arrays, strategies=None, min_history=100, workers=None):
+    """ รันหลายกลยุทธ์พร้อมกันใน process pool (arrays เรียงเก่า -> ใหม่ แบบใน draw_store) """
+    strategies = list(strategies or STRATEGIES)
+    dates, values = two_digit_draws(arrays)
+    started = time.perf_counter()
+    if workers == 1:
+        results = [run_strategy(s, dates, values, min_history) for s in strategies]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(run_strategy, s, dates, values, min_history) for s in strategies]
+            results = [f.result() for f in futures]
+    return results, time.perf_counter() - started
@@ -1,41 +1,134 @@
 import pandas as pd
-import gspread
-from oauth2client.service_account import ServiceAccountCredentials
+import numpy as np
 import os
-import json
+import re
+import time
 from datetime import datetime
+from src.draw_store import store_exists, load_arrays, build_arrays, arrays_to_frame, DRAW_STORE_PATH
+from src.data_cache import DatasetCache
+from src.draw_stats import DrawStatsIndex
+from src.shared_draws import get_shared_draws, SOURCE_CHECK_INTERVAL
+from src.draw_analytics import THREE_DIGIT_COLUMNS, frequency, top_numbers
+from src.draw_windows import RollingFrequency
+from src.draw_significance import significance_report, verdict
+from src.response_cache import response_cache
+from src.storage import get_storage
+from src.metrics import span
 
 # --- Config ---
-SHEET_NAME = 'LotteryData'
-
-def get_google_client():
-    scope = ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
-    
-    # 1. ลองอ่านจาก Cloud (Environment Variable)
-    if os.getenv('GOOGLE_CREDENTIALS_JSON'):
-        creds_dict = json.loads(os.getenv('GOOGLE_CREDENTIALS_JSON'))
-        creds = ServiceAccountCredentials.from_json_keyfile_dict(creds_dict, scope)
-    # 2. ถ้าไม่มี ให้อ่านจากไฟล์ในเครื่อง (Local)
-    else:
-        creds = ServiceAccountCredentials.from_json_keyfile_name('core/credentials.json', scope)
-        
-    return gspread.authorize(creds)
+DATA_CACHE_TTL = int(os.getenv('DATA_CACHE_TTL', '1800'))  # วินาที (หวยออกเดือนละ 2 ครั้ง)
+SIGNIFICANCE_SIMULATIONS = int(os.getenv('SIGNIFICANCE_SIMULATIONS', '2000'))  # รอบสุ่ม Monte Carlo ต่อรุ่นข้อมูล
+
+def load_source_arrays():
+    # ใช้ไฟล์ในเครื่องก่อน (เร็วกว่าและไม่ต้อง auth) ถ้าไม่มีค่อยดึงจาก storage (ชีท / SQLite)
+    if store_exists():
+        return load_arrays(mmap=False)
+    return build_arrays(get_storage().read_draws())
+
+def get_source_version():
+    """ version ของแหล่งข้อมูล: เวลาแก้ไขไฟล์ในเครื่อง หรือ version จาก storage (lastUpdateTime ของชีท) """
+    if store_exists():
+        return os.path.getmtime(os.path.join(DRAW_STORE_PATH, 'meta.json'))
+    return get_storage().data_version()
+
+def refresh_shared_draws(force=False):
+    """ ให้ worker ตัวเดียวโหลดจากแหล่งข้อมูลแล้ว publish (ตัวอื่นแค่ map ไฟล์เดิม) """
+    try:
+        return get_shared_draws().refresh(load_source_arrays, get_source_version, force=force)
+    except Exception as e:
+        print(f"Shared draws refresh failed: {e}")
+        return False
+
+def run_shared_draws_refresher(interval=SOURCE_CHECK_INTERVAL):
+    """ วนเช็คแหล่งข้อมูลเบื้องหลังทุก interval วินาที แล้ว publish รุ่นใหม่ (รันใน thread แยก ไม่คืนค่า)
+    request ของผู้ใช้แค่อ่าน CURRENT ไม่ต้องรอชีทหรือการโหลดใหม่ """
+    while True:
+        time.sleep(interval)
+        refresh_shared_draws()
+
+def get_data_version():
+    """ รุ่นของชุดข้อมูลร่วม (อ่านไฟล์ CURRENT ในเครื่องอย่างเดียว ไม่ยิงแหล่งข้อมูล) """
+    return get_shared_draws().version()
+
+def get_arrays():
+    """ array ผลหวยทั้งหมด (memory-map ร่วมกันทุก worker ไม่ copy) """
+    shared = get_shared_draws()
+    arrays = shared.arrays()
+    if arrays is None:
+        refresh_shared_draws()
+        arrays = shared.arrays()
+    if arrays is None:
+        raise RuntimeError("ยังไม่มีข้อมูลผลหวย")
+    return arrays
 
 def get_data():
-    client = get_google_client()
-    sheet = client.open(SHEET_NAME).sheet1
-    return pd.DataFrame(sheet.get_all_records())
+    # DataFrame (ใหม่ -> เก่า) แบบเดิม สร้างจาก array ร่วม
+    return arrays_to_frame(get_arrays())
+
+def load_stats():
+    # ดัชนีสถิติถูกคำนวณครั้งเดียวตอน publish แล้วเก็บไว้คู่กับ array
+    stats = get_shared_draws().stats()
+    return stats if stats is not None else DrawStatsIndex.from_arrays(get_arrays())
+
+def on_new_draw():
+    # มีงวดใหม่ -> คำทำนายที่แคชไว้ใช้ไม่ได้แล้ว
+    response_cache.invalidate('prediction')
+
+# version มาจากไฟล์ในเครื่อง เช็คบ่อยได้ (worker อื่น publish รุ่นใหม่ก็เห็นภายในไม่กี่วินาที)
+_stats_cache = DatasetCache(load_stats, ttl=DATA_CACHE_TTL, version_fn=get_data_version, version_check_interval=5,
+                            on_change=on_new_draw)
+
+def get_stats():
+    return _stats_cache.get()
 
-def get_prediction_message():
+def load_three_digit_stats():
+    # บอทใช้แค่ความถี่ ไม่ต้องเก็บเมทริกซ์ co-occurrence ไว้ในหน่วยความจำ
+    arrays = get_arrays()
+    matrix = np.hstack([np.asarray(arrays[c]) for c in THREE_DIGIT_COLUMNS])
+    return {'draws': int((matrix >= 0).any(axis=1).sum()), 'frequency': frequency(matrix, 1000)}
+
+_three_digit_cache = DatasetCache(load_three_digit_stats, ttl=DATA_CACHE_TTL, version_fn=get_data_version, version_check_interval=5)
+
+def load_windows():
+    return RollingFrequency(get_arrays())
+
+_windows_cache = DatasetCache(load_windows, ttl=DATA_CACHE_TTL, version_fn=get_data_version, version_check_interval=5)
+
+def load_significance():
+    # คำนวณครั้งเดียวต่อรุ่นข้อมูล (ในโปรเซสเดียว ไม่เปิด process pool ใน worker ของเว็บ)
+    return significance_report(get_arrays(), n_perm=SIGNIFICANCE_SIMULATIONS, workers=1)
+
+_significance_cache = DatasetCache(load_significance, ttl=DATA_CACHE_TTL, version_fn=get_data_version, version_check_interval=5)
+
+def get_significance():
     try:
-        df = get_data()
-        
-        # Clean Data
-        df['last_two_digits'] = df['last_two_digits'].astype(str).str.zfill(2)
-        df['date'] = pd.to_datetime(df['date'], errors='coerce')
-        df = df.dropna(subset=['date'])
-        
-        total_draws = len(df)
+        return _significance_cache.get()
+    except Exception:
+        return None
+
+def get_prediction_message(user_msg=""):
+    # คำตอบเหมือนกันสำหรับทุกคนในวันเดียวกัน (จนกว่าจะมีงวดใหม่)
+    stats_index = None
+    try:
+        stats_index = get_stats()
+    except Exception:
+        pass
+    years = re.search(r'(\d+)\s*ปี', user_msg or "")
+    cache_key = ('prediction', datetime.now().date(), years.group(1) if years else None,
+                 str(stats_index.latest_date) if stats_index else None)
+    cached = response_cache.get(cache_key)
+    if cached is not None:
+        return cached
+    with span('format_response', kind='prediction'):
+        msg = build_prediction_message(user_msg)
+    if not msg.startswith("ระบบขัดข้อง"):
+        response_cache.set(cache_key, msg, tag='prediction')
+    return msg
+
+def build_prediction_message(user_msg=""):
+    try:
+        stats_index = get_stats()
+        total_draws = stats_index.total
         
         # วิเคราะห์วันปัจจุบัน (หรือวันล่าสุด)
         today = datetime.now()
@@ -43,25 +136,48 @@ def get_prediction_message():
         day_name = days_map[today.weekday()]
         
         msg = f"🤖 **AI วิเคราะห์หวย** 🤖\n"
-        msg += f"📅 ข้อมูลถึง: {df['date'].max().strftime('%d/%m/%Y')}\n"
+        msg += f"📅 ข้อมูลถึง: {pd.Timestamp(stats_index.latest_date).strftime('%d/%m/%Y')}\n"
         msg += f"🗓 วันนี้: วัน{day_name}\n\n"
         
-        # 1. Top 5 รวม
-        stats = df['last_two_digits'].value_counts().head(5)
-        msg += "🏆 **TOP 5 สถิติรวม:**\n"
-        for num, count in stats.items():
-            prob = (count/total_draws)*100
-            msg += f"- {num} (ออก {count} ครั้ง | {prob:.1f}%)\n"
+        # 1. Top 5 รวม (หรือย้อนหลัง N ปี ถ้าพิมพ์ เช่น "หวย 5 ปี")
+        years = re.search(r'(\d+)\s*ปี', user_msg or "")
+        if years and int(years.group(1)) > 0:
+            windows = _windows_cache.get()
+            counts = windows.last_years(int(years.group(1)))
+            window_draws = int(counts.sum())
+            msg += f"🏆 **TOP 5 ย้อนหลัง {years.group(1)} ปี ({window_draws} งวด):**\n"
+            for num, count in windows.top(counts, 5):
+                prob = (count/window_draws)*100
+                msg += f"- {num} (ออก {count} ครั้ง | {prob:.1f}%)\n"
+        else:
+            msg += "🏆 **TOP 5 สถิติรวม:**\n"
+            for num, count in stats_index.top(5):
+                prob = (count/total_draws)*100
+                msg += f"- {num} (ออก {count} ครั้ง | {prob:.1f}%)\n"
+            significance = get_significance()
+            if significance:
+                top = significance['two_digit']['top_counts']
+                msg += (f"📐 เทียบกับการสุ่ม: อันดับ 1 ออก {top['observed'][0]} ครั้ง "
+                        f"(สุ่มล้วนๆ ได้ราว {top['expected_top'][0]:.0f}) p={top['p_values'][0]:.2f} "
+                        f"→ {verdict(top['p_values'][0])}\n")
             
         # 2. Top 3 ประจำวัน
         day_code = today.weekday()
-        df['day_of_week'] = df['date'].dt.dayofweek
-        subset = df[df['day_of_week'] == day_code]
-        if not subset.empty:
-            day_stats = subset['last_two_digits'].value_counts().head(3)
+        if stats_index.weekday_total(day_code):
             msg += f"\n🌞 **มาแรงเฉพาะวัน{day_name}:**\n"
-            for num, count in day_stats.items():
+            for num, count in stats_index.top(3, weekday=day_code):
                 msg += f"- {num} (มา {count} ครั้ง)\n"
+            significance = get_significance()
+            if significance:
+                p = significance['weekday']['p_value']
+                msg += f"📐 เลขขึ้นกับวันไหม: p={p:.2f} → {verdict(p)}\n"
+
+        # 3. เลข 3 ตัว (เลขหน้า + เลขท้าย)
+        three = _three_digit_cache.get()
+        if three['draws']:
+            msg += "\n🎯 **เลข 3 ตัวออกบ่อย:**\n"
+            for num, count in top_numbers(three['frequency'], 3, width=3):
+                msg += f"- {num} (ออก {count} ครั้ง)\n"
         
         return msg
 
@@ -0,0 +1,119 @@
+# services/data_cache.py
+"""
+แคชชุดข้อมูลไว้ในหน่วยความจำของโปรเซส (ใช้กับบอท LINE)
+- หมดอายุตาม TTL หรือเมื่อแหล่งข้อมูลเปลี่ยน (version เช่น modifiedTime ของชีท)
+- single-flight: มีคนโหลดอยู่แล้ว คนอื่นรอผลเดียวกัน ไม่ยิงซ้ำ
+- stale-while-revalidate: หมดอายุแล้วยังตอบของเก่าไปก่อน แล้ว refresh เบื้องหลัง
+"""
+import time
+import threading
+
+_UNSET = object()
+
+class DatasetCache:
+    def __init__(self, loader, ttl=600, version_fn=None, version_check_interval=60, on_change=None):
+        self.loader = loader                    # ฟังก์ชันโหลดข้อมูลจริง
+        self.on_change = on_change              # เรียกเมื่อโหลดได้ version ใหม่ (เช่น ล้างแคชคำตอบ)
+        self.ttl = ttl
+        self.version_fn = version_fn            # คืนค่า version ปัจจุบันของแหล่งข้อมูล (หรือ None)
+        self.version_check_interval = version_check_interval
+        self._value = None
+        self._version = None
+        self._loaded_at = 0.0
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self._inflight = None                   # threading.Event ของการโหลดที่กำลังทำอยู่
+        self._error = None
+        self.stats = {'hits': 0, 'stale_hits': 0, 'loads': 0, 'errors': 0}
+
+    def _check_version(self, known_version):
+        """ ถาม version ปัจจุบันของแหล่งข้อมูล (เรียกนอก lock เพราะอาจเป็น network call) """
+        try:
+            return self.version_fn()
+        except Exception:
+            return known_version                # เช็ค version ไม่ได้ ก็ใช้ของเดิมไปก่อน
+
+    def _load(self, event, version=_UNSET):
+        try:
+            if version is _UNSET:
+                version = self.version_fn() if self.version_fn else None
+            value = self.loader()
+            with self._lock:
+                changed = self._value is not None and version != self._version
+                self._value, self._version = value, version
+                self._loaded_at = self._checked_at = time.monotonic()
+                self._error = None
+                self.stats['loads'] += 1
+            if changed and self.on_change:
+                self.on_change()
+        except Exception as e:
+            with self._lock:
+                self._error = e
+                self.stats['errors'] += 1
+        finally:
+            with self._lock:
+                self._inflight = None
+            event.set()
+
+    def _start_load(self):
+        # เรียกตอนถือ lock อยู่: ถ้ามีคนโหลดอยู่แล้วก็ใช้ event เดิม
+        if self._inflight is None:
+            self._inflight = threading.Event()
+            return self._inflight, True
+        return self._inflight, False
+
+    def get(self):
+        now = time.monotonic()
+        with self._lock:
+            fresh = self._value is not None and now - self._loaded_at <= self.ttl
+            check = fresh and self.version_fn is not None and now - self._checked_at > self.version_check_interval
+            if check:
+                self._checked_at = now          # รอบนี้มีคนเดียวที่ถาม version คนอื่นใช้ของเดิมไปเลย
+            if fresh and not check:
+                self.stats['hits'] += 1
+                return self._value
+            known_version = self._version
+
+        version = _UNSET
+        if check:
+            version = self._check_version(known_version)
+
+        with self._lock:
+            # compare-and-swap: version ไม่เปลี่ยน (หรือมีคนโหลดรุ่นนี้ไปแล้ว) ก็ใช้ของที่มี
+            if check and self._value is not None and version == self._version:
+                self.stats['hits'] += 1
+                return self._value
+            event, owner = self._start_load()
+            stale = self._value
+
+        if stale is not None:
+            # มีของเก่า: ตอบไปก่อน แล้วให้ thread เบื้องหลังโหลดใหม่
+            if owner:
+                threading.Thread(target=self._load, args=(event, version), daemon=True).start()
+            with self._lock:
+                self.stats['stale_hits'] += 1
+            return stale
+
+        if owner:
+            self._load(event, version)
+        else:
+            event.wait()
+        with self._lock:
+            if self._value is None and self._error is not None:
+                raise self._error
+            return self._value
+
+    def loaded(self):
+        return self._value is not None
+
+    def clear(self):
+        """ ทิ้งข้อมูลทั้งหมด ครั้งหน้าโหลดใหม่แบบรอผล (ไม่ตอบของเก่า) """
+        with self._lock:
+            self._value = None
+            self._version = None
+            self._loaded_at = 0.0
+
+    def invalidate(self):
+        """ บังคับให้ครั้งหน้าโหลดใหม่ (ของเก่ายังใช้ตอบระหว่างโหลด) """
+        with self._lock:
+            self._loaded_at = 0.0
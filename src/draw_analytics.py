@@ -0,0 +1,115 @@
+# services/draw_analytics.py
+"""
+วิเคราะห์รางวัลเลข 2 ตัว / 3 ตัว แบบ vectorized (numpy ล้วน ไม่มี loop ทีละแถว)
+รับ array จาก draw_store (เรียงเก่า -> ใหม่) หรือ DataFrame ก็ได้
+"""
+import numpy as np
+from src.draw_store import build_arrays
+
+THREE_DIGIT_COLUMNS = ('prize_pre_3digit', 'prize_suf_3digit')
+
+def as_arrays(data):
+    """ รับ DataFrame หรือ dict ของ array แล้วคืน dict ของ array """
+    return data if isinstance(data, dict) else build_arrays(data)
+
+def _as_matrix(values):
+    m = np.asarray(values).astype(np.int64)
+    return m.reshape(len(m), -1)
+
+def frequency(values, size):
+    """ นับความถี่ของแต่ละเลข (ข้ามช่องว่าง -1) ได้ array ยาว size """
+    flat = _as_matrix(values).ravel()
+    return np.bincount(flat[flat >= 0], minlength=size)
+
+def co_occurrence(values, size):
+    """
+    เมทริกซ์ (size x size) นับว่าเลขคู่ไหนออกพร้อมกันในงวดเดียวกันกี่ครั้ง
+    นับทุกคู่ช่องที่อยู่ในงวดเดียวกัน เก็บแบบสมมาตร (เส้นทแยง = 0)
+    """
+    m = _as_matrix(values)
+    width = m.shape[1]
+    i, j = np.triu_indices(width, k=1)
+    a, b = m[:, i].ravel(), m[:, j].ravel()
+    keep = (a >= 0) & (b >= 0) & (a != b)
+    lo, hi = np.minimum(a[keep], b[keep]), np.maximum(a[keep], b[keep])
+    counts = np.bincount(lo * size + hi, minlength=size * size).reshape(size, size)
+    return counts + counts.T
+
+def top_pairs(matrix, n=5, width=3):
+    """ [(('123', '456'), ครั้ง)] จากเมทริกซ์ co-occurrence """
+    upper = np.triu(matrix, k=1)
+    flat = upper.ravel()
+    order = np.argsort(-flat, kind='stable')[:n]
+    size = matrix.shape[0]
+    return [((f"{k // size:0{width}d}", f"{k % size:0{width}d}"), int(flat[k])) for k in order if flat[k] > 0]
+
+def digit_position_distribution(values, n_digits):
+    """ ตาราง (n_digits x 10): แถวคือหลัก (0 = หลักหน้าสุด) นับว่าแต่ละเลขโดดออกกี่ครั้ง """
+    flat = _as_matrix(values).ravel()
+    flat = flat[flat >= 0]
+    powers = 10 ** np.arange(n_digits - 1, -1, -1)
+    digits = (flat[:, None] // powers) % 10
+    offsets = np.arange(n_digits) * 10
+    return np.bincount((digits + offsets).ravel(), minlength=n_digits * 10).reshape(n_digits, 10)
+
+def gap_statistics(values, size):
+    """
+    สถิติระยะห่าง (จำนวนงวด) ระหว่างการออกซ้ำของแต่ละเลข
+    คืน dict ของ array ยาว size: count, mean_gap, max_gap, current_gap (-1 = ไม่เคยออก)
+    """
+    m = _as_matrix(values)
+    n_draws = len(m)
+    rows, cols = np.nonzero(m >= 0)
+    vals = m[rows, cols]
+    # เลขเดียวกันออกหลายช่องในงวดเดียว นับเป็นครั้งเดียว
+    keys = np.unique(vals * (n_draws + 1) + rows)
+    vals, rows = keys // (n_draws + 1), keys % (n_draws + 1)
+
+    count = np.bincount(vals, minlength=size)
+    same = vals[1:] == vals[:-1]
+    gaps = (rows[1:] - rows[:-1])[same]
+    gap_owner = vals[1:][same]
+    gap_count = np.bincount(gap_owner, minlength=size)
+    gap_sum = np.bincount(gap_owner, weights=gaps, minlength=size)
+    max_gap = np.zeros(size, dtype=np.int64)
+    np.maximum.at(max_gap, gap_owner, gaps)
+    last_seen = np.full(size, -1, dtype=np.int64)
+    np.maximum.at(last_seen, vals, rows)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean_gap = np.where(gap_count > 0, gap_sum / np.maximum(gap_count, 1), np.nan)
+    return {
+        'count': count,
+        'mean_gap': mean_gap,
+        'max_gap': max_gap,
+        'current_gap': np.where(last_seen >= 0, n_draws - 1 - last_seen, -1),
+    }
+
+def top_numbers(counts, n=5, width=2):
+    order = np.argsort(-counts, kind='stable')[:n]
+    return [(f"{i:0{width}d}", int(counts[i])) for i in order if counts[i] > 0]
+
+def analyze_two_digits(data):
+    arrays = as_arrays(data)
+    values = np.asarray(arrays['last_two_digits'])
+    values = values[values >= 0]
+    return {
+        'draws': len(values),
+        'frequency': frequency(values, 100),
+        'digit_positions': digit_position_distribution(values, 2),
+        'gaps': gap_statistics(values, 100),
+    }
+
+def analyze_three_digits(data, columns=THREE_DIGIT_COLUMNS):
+    """ วิเคราะห์รางวัลเลข 3 ตัว (รวมเลขหน้า/เลขท้ายตาม columns) """
+    arrays = as_arrays(data)
+    matrix = np.hstack([_as_matrix(arrays[c]) for c in columns])
+    has_data = (matrix >= 0).any(axis=1)
+    matrix = matrix[has_data]
+    return {
+        'draws': int(has_data.sum()),
+        'frequency': frequency(matrix, 1000),
+        'co_occurrence': co_occurrence(matrix, 1000),
+        'digit_positions': digit_position_distribution(matrix, 3),
+        'gaps': gap_statistics(matrix, 1000),
+    }
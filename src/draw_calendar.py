@@ -0,0 +1,213 @@
+# services/draw_calendar.py
+"""
+ปฏิทินวันหวยออก ใช้ร่วมกันทั้ง crawler และงานวิเคราะห์
+
+กฎพื้นฐาน: ออกวันที่ 1 และ 16 ของทุกเดือน เลื่อนตามวันหยุดที่เลื่อนทุกปี (RECURRING_SHIFTS)
+ปีที่ไม่ตรงกฎ: ใส่ในตารางยกเว้นรายปี (EXCEPTIONS) และเรียนเพิ่มจากข้อมูลจริง
+- วันที่มีผลในข้อมูลย้อนหลัง = มีงวดแน่นอน
+- วันที่ไม่มีงวด เรียนเฉพาะที่แหล่งข้อมูลยืนยันแล้ว (no_draw) ไม่ใช่แค่ "ไม่มีในข้อมูล" (อาจดึงไม่สำเร็จ)
+- วันที่บางปีมีงวดพิเศษ (CANDIDATE_DATES) crawler ลองดึงทุกปีจนกว่าจะรู้ผล
+(pipeline เขียนไว้ที่ <DRAW_STORE_PATH>/calendar.json ทุกครั้งที่อัปเดตข้อมูล)
+"""
+import os
+import json
+import bisect
+import threading
+from datetime import datetime, timedelta
+import numpy as np
+from src.draw_store import DRAW_STORE_PATH, load_arrays, store_exists
+
+CALENDAR_FILE = 'calendar.json'
+
+# (เดือน, วัน) ปกติ -> (เดือน, วัน) ที่เลื่อนไป
+RECURRING_SHIFTS = {
+    (1, 1): (1, 2),     # ปีใหม่
+    (1, 16): (1, 17),   # วันครู
+    (5, 1): (5, 2),     # วันแรงงาน
+}
+
+# (เดือน, วัน) ที่บางปีมีงวด เช่นงวดส่งท้ายปี 30 ธ.ค. (แทนงวด 1 ม.ค. ของปีถัดไป)
+# ไม่นับเป็นวันหวยออกจนกว่าจะเจอผลจริง แต่ crawler จะลองดึงให้
+CANDIDATE_DATES = [(12, 30)]
+
+# ตารางยกเว้นรายปี (นอกเหนือจากกฎด้านบน)
+EXCEPTIONS = {
+    2017: {'add': ['2017-12-30']},
+    2018: {'add': ['2018-12-30'], 'remove': ['2018-01-02']},
+    2019: {'add': ['2019-12-30'], 'remove': ['2019-01-02']},
+    # โควิด-19: งดออกรางวัล 1 เม.ย. - 2 พ.ค. แล้วกลับมาออก 16 พ.ค.
+    2020: {'add': ['2020-12-30'], 'remove': ['2020-01-02', '2020-04-01', '2020-04-16', '2020-05-02']},
+    2021: {'add': ['2021-12-30'], 'remove': ['2021-01-02']},
+    2022: {'add': ['2022-12-30'], 'remove': ['2022-01-02']},
+    2023: {'add': ['2023-12-30'], 'remove': ['2023-01-02']},
+    2024: {'add': ['2024-12-30'], 'remove': ['2024-01-02']},
+    2025: {'remove': ['2025-01-02']},
+}
+
+def _as_datetime(value):
+    """ รับ datetime / date / str / numpy datetime64 แล้วคืน datetime เที่ยงคืน """
+    if isinstance(value, np.datetime64):
+        value = str(value.astype('datetime64[D]'))
+    if isinstance(value, str):
+        return datetime.strptime(value[:10], '%Y-%m-%d')
+    return datetime(value.year, value.month, value.day)
+
+def rule_dates(year):
+    """ วันหวยออกตามกฎพื้นฐาน (ยังไม่รวมตารางยกเว้น) """
+    dates = []
+    for month in range(1, 13):
+        for day in (1, 16):
+            m, d = RECURRING_SHIFTS.get((month, day), (month, day))
+            dates.append(datetime(year, m, d))
+    return sorted(dates)
+
+class DrawCalendar:
+    def __init__(self, exceptions=None, no_draw=None):
+        # {ปี: {'add': [...], 'remove': [...]}} ค่าเป็น datetime หรือ 'YYYY-MM-DD'
+        self.exceptions = {}
+        for year, ex in (exceptions or {}).items():
+            self.exceptions[int(year)] = {
+                'add': sorted({_as_datetime(d) for d in ex.get('add', [])}),
+                'remove': sorted({_as_datetime(d) for d in ex.get('remove', [])}),
+            }
+        # วันที่แหล่งข้อมูลยืนยันแล้วว่าไม่มีงวด
+        self.no_draw = {_as_datetime(d) for d in (no_draw or [])}
+        self._years = {}
+        self._lock = threading.Lock()
+
+    def dates_for_year(self, year):
+        """ วันหวยออกทั้งหมดของปีนั้น (เรียงเก่า -> ใหม่) """
+        dates = self._years.get(year)
+        if dates is None:
+            ex = self.exceptions.get(year, {})
+            found = (set(rule_dates(year)) - set(ex.get('remove', [])) - self.no_draw) | set(ex.get('add', []))
+            dates = sorted(found)
+            with self._lock:
+                self._years[year] = dates
+        return dates
+
+    def crawl_dates(self, year):
+        """ วันที่ที่ crawler ควรลองดึง = วันหวยออก + วันที่อาจมีงวดพิเศษที่ยังไม่ถูกยืนยันว่าไม่มี """
+        candidates = {datetime(year, m, d) for m, d in CANDIDATE_DATES} - self.no_draw
+        return sorted(set(self.dates_for_year(year)) | candidates)
+
+    def confirm_no_draw(self, value):
+        """ บันทึกว่าแหล่งข้อมูลยืนยันว่าวันนี้ไม่มีงวด คืน True ถ้าเป็นข้อมูลใหม่ """
+        d = _as_datetime(value)
+        with self._lock:
+            if d in self.no_draw:
+                return False
+            self.no_draw.add(d)
+            self._years.pop(d.year, None)
+        return True
+
+    def is_draw_date(self, value):
+        d = _as_datetime(value)
+        dates = self.dates_for_year(d.year)
+        i = bisect.bisect_left(dates, d)
+        return i < len(dates) and dates[i] == d
+
+    def next_draw_date(self, value=None, inclusive=True):
+        """ งวดถัดไปนับจากวันที่ให้มา (ค่าเริ่มต้น = วันนี้ ถ้าวันนี้หวยออกก็คืนวันนี้) """
+        d = _as_datetime(value or datetime.now())
+        for year in (d.year, d.year + 1):
+            dates = self.dates_for_year(year)
+            i = bisect.bisect_left(dates, d) if inclusive else bisect.bisect_right(dates, d)
+            if i < len(dates):
+                return dates[i]
+        return None
+
+    def draws_between(self, start, end, candidates=False):
+        """ วันหวยออกทั้งหมดในช่วง start..end (รวมทั้งสองฝั่ง) candidates=True รวมวันที่ที่ควรลองดึงด้วย """
+        start, end = _as_datetime(start), _as_datetime(end)
+        out = []
+        for year in range(start.year, end.year + 1):
+            dates = self.crawl_dates(year) if candidates else self.dates_for_year(year)
+            out.extend(dates[bisect.bisect_left(dates, start):bisect.bisect_right(dates, end)])
+        return out
+
+    def validate(self, history_dates):
+        """
+        เทียบปฏิทินกับวันที่ที่มีจริงในข้อมูลย้อนหลัง (ถึงงวดล่าสุดเท่านั้น)
+        คืน {ปี: {'missing': [วันที่มีจริงแต่ปฏิทินไม่มี], 'unexpected': [ปฏิทินมีแต่ไม่มีในข้อมูล]}} เฉพาะปีที่ไม่ตรง
+        """
+        actual = sorted({_as_datetime(d) for d in history_dates})
+        if not actual:
+            return {}
+        report = {}
+        for year in range(actual[0].year, actual[-1].year + 1):
+            have = {d for d in actual if d.year == year}
+            expected = {d for d in self.dates_for_year(year) if actual[0] <= d <= actual[-1]}
+            missing, unexpected = sorted(have - expected), sorted(expected - have)
+            if missing or unexpected:
+                report[year] = {'missing': missing, 'unexpected': unexpected}
+        return report
+
+    @classmethod
+    def from_history(cls, history_dates, exceptions=EXCEPTIONS, no_draw=()):
+        """
+        ใช้ตารางยกเว้นที่ให้มา แล้วเพิ่มวันที่ที่มีผลจริงในข้อมูล (มีผล = มีงวด ชนะทุกอย่าง)
+        วันที่ไม่มีในข้อมูลไม่ถูกตัดทิ้ง (อาจแค่ดึงไม่สำเร็จ) ตัดเฉพาะที่อยู่ใน no_draw
+        """
+        actual = {_as_datetime(d) for d in history_dates}
+        base = cls(exceptions, no_draw)
+        learned = {year: {'add': list(ex['add']), 'remove': list(ex['remove'])} for year, ex in base.exceptions.items()}
+        for year, diff in base.validate(history_dates).items():
+            ex = learned.setdefault(year, {'add': [], 'remove': []})
+            ex['add'] = sorted(set(ex['add']) | set(diff['missing']))
+            ex['remove'] = sorted(set(ex['remove']) - set(diff['missing']))
+        return cls(learned, base.no_draw - actual)
+
+    def save(self, path=DRAW_STORE_PATH):
+        data = {str(year): {k: [d.strftime('%Y-%m-%d') for d in v] for k, v in ex.items()}
+                for year, ex in sorted(self.exceptions.items()) if ex['add'] or ex['remove']}
+        no_draw = [d.strftime('%Y-%m-%d') for d in sorted(self.no_draw)]
+        os.makedirs(path, exist_ok=True)
+        with _save_lock:
+            tmp = os.path.join(path, f'.{CALENDAR_FILE}.tmp')
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump({'exceptions': data, 'no_draw': no_draw}, f, indent=1)
+            os.replace(tmp, os.path.join(path, CALENDAR_FILE))
+
+    @classmethod
+    def load(cls, path=DRAW_STORE_PATH):
+        with open(os.path.join(path, CALENDAR_FILE), encoding='utf-8') as f:
+            data = json.load(f)
+        return cls(data.get('exceptions', {}), data.get('no_draw', []))
+
+_save_lock = threading.Lock()
+
+def refresh_calendar(path=DRAW_STORE_PATH):
+    """ สร้างปฏิทินจากข้อมูลใน store แล้วบันทึก (เรียกหลังอัปเดตข้อมูล) คืน (calendar, รายงานปีที่กฎไม่ตรง) """
+    dates = np.asarray(load_arrays(path)['dates'])
+    no_draw = get_calendar(path).no_draw
+    report = DrawCalendar(EXCEPTIONS, no_draw).validate(dates)
+    calendar = DrawCalendar.from_history(dates, no_draw=no_draw)
+    calendar.save(path)
+    set_calendar(calendar)
+    return calendar, report
+
+def record_no_draw(value, path=DRAW_STORE_PATH):
+    """ แหล่งข้อมูลยืนยันว่าวันนี้ไม่มีงวด -> ไม่ต้องดึงซ้ำอีก (บันทึกลง calendar.json ทันที) """
+    calendar = get_calendar(path)
+    if calendar.confirm_no_draw(value):
+        calendar.save(path)
+
+_calendar = None
+
+def get_calendar(path=DRAW_STORE_PATH):
+    """ ปฏิทินที่เรียนจากข้อมูลแล้ว (ถ้ามี) ไม่งั้นใช้กฎ + ตารางยกเว้นในโค้ด """
+    global _calendar
+    if _calendar is None:
+        calendar = None
+        if store_exists(path) and os.path.exists(os.path.join(path, CALENDAR_FILE)):
+            try:
+                calendar = DrawCalendar.load(path)
+            except (OSError, ValueError):
+                calendar = None
+        _calendar = calendar or DrawCalendar(EXCEPTIONS)
+    return _calendar
+
+def set_calendar(calendar):
+    global _calendar
+    _calendar = calendar
@@ -0,0 +1,218 @@
+# services/draw_significance.py
+"""
+ทดสอบว่า "เลขออกบ่อย" ต่างจากการสุ่มจริงไหม (เลขท้าย 2 ตัว และเลข 3 ตัว)
+- chi-square: การกระจายสม่ำเสมอ (ทุกเลขโอกาสเท่ากัน)
+- runs test / serial correlation: งวดติดกันเกี่ยวข้องกันไหม
+- weekday independence: เลขที่ออกขึ้นกับวันในสัปดาห์ไหม (ตาราง 7 x 100)
+- Monte Carlo: สุ่มหลายพันรอบด้วย NumPy ทีละ batch (แบ่งไปหลายโปรเซสได้)
+    * permutation: สลับเลขกับวัน แล้วดูว่าค่า chi-square ที่เห็นจริงสูงผิดปกติไหม
+    * top counts: ถ้าสุ่มล้วนๆ เลขอันดับ 1-5 จะออกบ่อยขนาดนี้บ่อยแค่ไหน
+
+ไม่พึ่ง scipy: p-value ของ chi-square / normal คำนวณเอง (incomplete gamma / erfc)
+"""
+import os
+import math
+import time
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from src.draw_stats import weekday_of
+from src.draw_analytics import THREE_DIGIT_COLUMNS
+
+BATCH = 1000          # จำนวนรอบสุ่มต่อ batch (คุมหน่วยความจำ)
+ALPHA = 0.05
+
+# --- p-value ---
+def chi2_sf(x, dof):
+    """ P(X >= x) ของ chi-square (regularized upper incomplete gamma Q(dof/2, x/2)) """
+    if x <= 0:
+        return 1.0
+    a, x = dof / 2.0, x / 2.0
+    if x < a + 1:
+        # อนุกรม: P(a, x) แล้วคืน 1 - P
+        term = total = 1.0 / a
+        n = a
+        for _ in range(1000):
+            n += 1
+            term *= x / n
+            total += term
+            if abs(term) < abs(total) * 1e-12:
+                break
+        return max(0.0, 1.0 - total * math.exp(-x + a * math.log(x) - math.lgamma(a)))
+    # continued fraction (Lentz) สำหรับ Q(a, x)
+    tiny = 1e-300
+    b = x + 1 - a
+    c = 1 / tiny
+    d = 1 / b
+    h = d
+    for i in range(1, 1000):
+        an = -i * (i - a)
+        b += 2
+        d = an * d + b
+        d = tiny if abs(d) < tiny else d
+        c = b + an / c
+        c = tiny if abs(c) < tiny else c
+        d = 1 / d
+        delta = d * c
+        h *= delta
+        if abs(delta - 1) < 1e-12:
+            break
+    return min(1.0, math.exp(-x + a * math.log(x) - math.lgamma(a)) * h)
+
+def normal_p_two_sided(z):
+    return math.erfc(abs(z) / math.sqrt(2))
+
+def _valid(values):
+    values = np.asarray(values).astype(np.int64).ravel()
+    return values[values >= 0]
+
+# --- การทดสอบพื้นฐาน ---
+def chi_square_uniformity(values, size):
+    """ ทุกเลข 0..size-1 โอกาสเท่ากันไหม """
+    values = _valid(values)
+    n = len(values)
+    counts = np.bincount(values, minlength=size)
+    expected = n / size
+    stat = float(((counts - expected) ** 2).sum() / expected) if n else 0.0
+    return {'statistic': stat, 'dof': size - 1, 'p_value': chi2_sf(stat, size - 1) if n else 1.0, 'n': n}
+
+def runs_test(values):
+    """ Wald-Wolfowitz runs test (สูง/ต่ำกว่า median) ลำดับงวดสุ่มไหม """
+    x = _valid(values).astype(np.float64)
+    above = x[x != np.median(x)] > np.median(x) if len(x) else np.array([], dtype=bool)
+    n1, n2 = int(above.sum()), int((~above).sum())
+    if n1 == 0 or n2 == 0:
+        return {'runs': 0, 'expected': 0.0, 'z': 0.0, 'p_value': 1.0, 'n': len(above)}
+    runs = 1 + int((above[1:] != above[:-1]).sum())
+    n = n1 + n2
+    mean = 2.0 * n1 * n2 / n + 1
+    var = 2.0 * n1 * n2 * (2.0 * n1 * n2 - n) / (n * n * (n - 1))
+    z = (runs - mean) / math.sqrt(var) if var > 0 else 0.0
+    return {'runs': runs, 'expected': mean, 'z': z, 'p_value': normal_p_two_sided(z), 'n': n}
+
+def serial_correlation(values, lag=1):
+    """ สหสัมพันธ์ระหว่างงวดที่ห่างกัน lag งวด (สุ่มจริง ~ 0) """
+    x = _valid(values).astype(np.float64)
+    if len(x) <= lag + 2 or x.std() == 0:
+        return {'lag': lag, 'r': 0.0, 'z': 0.0, 'p_value': 1.0, 'n': len(x)}
+    r = float(np.corrcoef(x[:-lag], x[lag:])[0, 1])
+    z = r * math.sqrt(len(x) - lag)
+    return {'lag': lag, 'r': r, 'z': z, 'p_value': normal_p_two_sided(z), 'n': len(x)}
+
+def contingency_chi_square(table):
+    """ chi-square ของตารางความถี่ (ตัดแถว/คอลัมน์ที่เป็นศูนย์ทิ้ง) """
+    table = np.asarray(table, dtype=np.float64)
+    table = table[table.sum(axis=1) > 0][:, table.sum(axis=0) > 0]
+    total = table.sum()
+    if total == 0 or min(table.shape) < 2:
+        return {'statistic': 0.0, 'dof': 0, 'p_value': 1.0, 'n': int(total)}
+    expected = np.outer(table.sum(axis=1), table.sum(axis=0)) / total
+    stat = float(((table - expected) ** 2 / expected).sum())
+    dof = (table.shape[0] - 1) * (table.shape[1] - 1)
+    return {'statistic': stat, 'dof': dof, 'p_value': chi2_sf(stat, dof), 'n': int(total)}
+
+# --- Monte Carlo ---
+def _permutation_batch(values, groups, n_groups, size, n_perm, seed):
+    """ chi-square ของตาราง (กลุ่ม x เลข) หลังสลับเลขแบบสุ่ม n_perm รอบ (vectorized ทั้ง batch) """
+    rng = np.random.default_rng(seed)
+    n = len(values)
+    # การสลับไม่เปลี่ยนผลรวมแถว/คอลัมน์ -> ค่าคาดหวังเท่ากันทุกรอบ
+    expected = np.outer(np.bincount(groups, minlength=n_groups), np.bincount(values, minlength=size)) / n
+    mask = expected > 0
+    out = np.empty(n_perm)
+    for start in range(0, n_perm, BATCH):
+        b = min(BATCH, n_perm - start)
+        shuffled = rng.permuted(np.tile(values, (b, 1)), axis=1)
+        codes = (np.arange(b)[:, None] * n_groups + groups[None, :]) * size + shuffled
+        tables = np.bincount(codes.ravel(), minlength=b * n_groups * size).reshape(b, n_groups, size)
+        out[start:start + b] = ((tables - expected) ** 2 / np.where(mask, expected, 1))[:, mask].sum(axis=1)
+    return out
+
+def _split(n, workers, seed):
+    """ แบ่งจำนวนรอบให้แต่ละโปรเซส พร้อม seed ที่ไม่ซ้ำกัน (workers=None = ใช้ทุก CPU แบบ run_backtest) """
+    workers = workers or os.cpu_count() or 1
+    parts = max(1, min(workers, math.ceil(n / BATCH)))
+    sizes = [n // parts + (1 if i < n % parts else 0) for i in range(parts)]
+    seeds = np.random.SeedSequence(seed).spawn(parts)
+    return list(zip(sizes, seeds))
+
+def permutation_test(values, groups, n_groups, size, n_perm=10000, workers=1, seed=0):
+    """ p-value แบบ permutation ของความเป็นอิสระระหว่างกลุ่ม (เช่น วันในสัปดาห์) กับเลขที่ออก """
+    values = np.asarray(values).astype(np.int64)
+    groups = np.asarray(groups).astype(np.int64)
+    keep = values >= 0
+    values, groups = values[keep], groups[keep]
+    table = np.bincount(groups * size + values, minlength=n_groups * size).reshape(n_groups, size)
+    observed = contingency_chi_square(table)
+    expected = np.outer(table.sum(axis=1), table.sum(axis=0)) / max(len(values), 1)
+    mask = expected > 0
+    obs_stat = float(((table - expected) ** 2 / np.where(mask, expected, 1))[mask].sum())
+
+    jobs = _split(n_perm, workers, seed)
+    if len(jobs) == 1:
+        sims = _permutation_batch(values, groups, n_groups, size, n_perm, jobs[0][1])
+    else:
+        with ProcessPoolExecutor(max_workers=len(jobs)) as pool:
+            futures = [pool.submit(_permutation_batch, values, groups, n_groups, size, k, s) for k, s in jobs]
+            sims = np.concatenate([f.result() for f in futures])
+    p = (1 + int((sims >= obs_stat - 1e-9).sum())) / (1 + len(sims))
+    return {'statistic': obs_stat, 'chi_square_p': observed['p_value'], 'p_value': p, 'permutations': len(sims)}
+
+def _top_counts_batch(n, size, top, n_sim, seed):
+    """ อันดับ 1..top ของความถี่ เมื่อสุ่มเลขแบบโอกาสเท่ากัน n ครั้ง (n_sim รอบ) """
+    rng = np.random.default_rng(seed)
+    pvals = np.full(size, 1.0 / size)
+    out = np.empty((n_sim, top), dtype=np.int64)
+    for start in range(0, n_sim, BATCH):
+        b = min(BATCH, n_sim - start)
+        counts = rng.multinomial(n, pvals, size=b)
+        out[start:start + b] = -np.sort(-counts, axis=1)[:, :top]
+    return out
+
+def top_counts_test(values, size, top=5, n_sim=10000, workers=1, seed=0):
+    """
+    เลขที่ออกบ่อยอันดับ 1..top บ่อย "เกินดวง" ไหม
+    p_values[k] = โอกาสที่การสุ่มล้วนๆ จะได้อันดับ k บ่อยเท่านี้หรือมากกว่า
+    """
+    values = _valid(values)
+    n = len(values)
+    observed = -np.sort(-np.bincount(values, minlength=size))[:top]
+    jobs = _split(n_sim, workers, seed)
+    if len(jobs) == 1:
+        sims = _top_counts_batch(n, size, top, n_sim, jobs[0][1])
+    else:
+        with ProcessPoolExecutor(max_workers=len(jobs)) as pool:
+            futures = [pool.submit(_top_counts_batch, n, size, top, k, s) for k, s in jobs]
+            sims = np.concatenate([f.result() for f in futures])
+    p_values = (1 + (sims >= observed).sum(axis=0)) / (1 + len(sims))
+    return {'observed': observed.tolist(), 'expected_top': sims.mean(axis=0).round(1).tolist(),
+            'p_values': p_values.tolist(), 'simulations': len(sims), 'n': n}
+
+# --- รายงานรวม ---
+def significance_report(arrays, n_perm=10000, workers=1, seed=0):
+    """ ทดสอบทั้งชุด (arrays เรียงเก่า -> ใหม่ แบบใน draw_store) """
+    started = time.perf_counter()
+    two = np.asarray(arrays['last_two_digits']).astype(np.int64)
+    weekdays = weekday_of(arrays['dates'])
+    three = np.hstack([np.asarray(arrays[c]) for c in THREE_DIGIT_COLUMNS]).astype(np.int64)
+
+    report = {
+        'draws': int(len(two)),
+        'two_digit': {
+            'uniformity': chi_square_uniformity(two, 100),
+            'runs': runs_test(two),
+            'serial': serial_correlation(two),
+            'top_counts': top_counts_test(two, 100, n_sim=n_perm, workers=workers, seed=seed),
+        },
+        'weekday': permutation_test(two, weekdays, 7, 100, n_perm=n_perm, workers=workers, seed=seed),
+        'three_digit': {
+            'uniformity': chi_square_uniformity(three, 1000),
+            'runs': runs_test(three),
+            'serial': serial_correlation(three),
+            'top_counts': top_counts_test(three, 1000, n_sim=n_perm, workers=workers, seed=seed),
+        },
+    }
+    report['seconds'] = time.perf_counter() - started
+    return report
+
+def verdict(p_value, alpha=ALPHA):
+    return "ต่างจากการสุ่มอย่างมีนัยสำคัญ" if p_value < alpha else "ไม่ต่างจากการสุ่ม"
@@ -0,0 +1,146 @@
+# services/draw_stats.py
+"""
+ดัชนีสถิติเลขท้าย 2 ตัว คำนวณครั้งเดียวตอนนำเข้าข้อมูล แล้วอัปเดตทีละงวด
+- ความถี่ 100 ช่อง (รวม และแยกตามวันในสัปดาห์)
+- งวดล่าสุดที่แต่ละเลขออก (ตำแหน่งงวด)
+- histogram ของระยะห่างระหว่างการออกซ้ำ (gap) ของแต่ละเลข
+"""
+import os
+import numpy as np
+from src.draw_store import DRAW_STORE_PATH, build_arrays, load_arrays, store_exists, two_digit_draws
+
+MAX_GAP = 400                     # gap ที่ยาวกว่านี้นับรวมในช่องสุดท้าย
+STATS_FILE = 'stats.npz'
+
+def weekday_of(dates):
+    """ วันในสัปดาห์ของ datetime64[D] (จันทร์ = 0 เหมือน datetime.weekday()) """
+    return ((np.asarray(dates).astype('datetime64[D]').astype(np.int64) + 3) % 7).astype(np.int8)
+
+class DrawStatsIndex:
+    def __init__(self):
+        self.total = 0
+        self.counts = np.zeros(100, dtype=np.int64)
+        self.weekday_counts = np.zeros((7, 100), dtype=np.int64)
+        self.weekday_totals = np.zeros(7, dtype=np.int64)
+        self.last_seen = np.full(100, -1, dtype=np.int64)       # ตำแหน่งงวด (0 = งวดแรกสุด)
+        self.gap_hist = np.zeros((100, MAX_GAP + 1), dtype=np.int64)
+        self.latest_date = None
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        """ สร้างจาก array ที่เรียงเก่า -> ใหม่ (แบบใน draw_store) """
+        idx = cls()
+        dates, values = two_digit_draws(arrays)
+        n = len(values)
+        if n == 0:
+            return idx
+        wd = weekday_of(dates)
+        pos = np.arange(n)
+
+        idx.total = n
+        idx.counts = np.bincount(values, minlength=100)
+        np.add.at(idx.weekday_counts, (wd, values), 1)
+        idx.weekday_totals = np.bincount(wd, minlength=7)
+        np.maximum.at(idx.last_seen, values, pos)
+
+        # gap = ระยะห่างจากการออกครั้งก่อนของเลขเดียวกัน
+        order = np.lexsort((pos, values))
+        v_sorted, p_sorted = values[order], pos[order]
+        same = v_sorted[1:] == v_sorted[:-1]
+        gaps = np.minimum(p_sorted[1:] - p_sorted[:-1], MAX_GAP)
+        np.add.at(idx.gap_hist, (v_sorted[1:][same], gaps[same]), 1)
+
+        idx.latest_date = dates[-1].astype('datetime64[D]')
+        return idx
+
+    @classmethod
+    def from_frame(cls, df):
+        return cls.from_arrays(build_arrays(df))
+
+    def add_draw(self, date, number):
+        """ เพิ่มงวดใหม่ 1 งวด (ต้องใหม่กว่างวดล่าสุด) """
+        date = np.datetime64(date, 'D')
+        if self.latest_date is not None and date <= self.latest_date:
+            return False
+        number = int(number) % 100
+        wd = int(weekday_of([date])[0])
+        pos = self.total
+        if self.last_seen[number] >= 0:
+            self.gap_hist[number, min(pos - self.last_seen[number], MAX_GAP)] += 1
+        self.counts[number] += 1
+        self.weekday_counts[wd, number] += 1
+        self.weekday_totals[wd] += 1
+        self.last_seen[number] = pos
+        self.total += 1
+        self.latest_date = date
+        return True
+
+    def extend(self, arrays):
+        """ เพิ่มเฉพาะงวดที่ใหม่กว่า latest_date """
+        added = 0
+        for d, n in zip(*two_digit_draws(arrays)):
+            added += self.add_draw(d, n)
+        return added
+
+    # --- Lookups ---
+    def top(self, n=5, weekday=None):
+        """ [(เลข 2 หลัก, จำนวนครั้ง)] เรียงจากออกบ่อยสุด """
+        counts = self.counts if weekday is None else self.weekday_counts[weekday]
+        order = np.argsort(-counts, kind='stable')[:n]
+        return [(f"{i:02d}", int(counts[i])) for i in order if counts[i] > 0]
+
+    def draws_ago(self, number):
+        """ เลขนี้ไม่ออกมาแล้วกี่งวด (None = ไม่เคยออก) """
+        seen = self.last_seen[int(number)]
+        return None if seen < 0 else int(self.total - 1 - seen)
+
+    def weekday_total(self, weekday):
+        return int(self.weekday_totals[weekday])
+
+    def gap_histogram(self, number):
+        return self.gap_hist[int(number)]
+
+    # --- Persistence ---
+    def save(self, path=DRAW_STORE_PATH):
+        tmp = os.path.join(path, '.stats.tmp.npz')
+        with open(tmp, 'wb') as f:
+            np.savez(f, total=self.total, counts=self.counts, weekday_counts=self.weekday_counts,
+                     weekday_totals=self.weekday_totals, last_seen=self.last_seen, gap_hist=self.gap_hist,
+                     latest_date=np.array([self.latest_date if self.latest_date is not None else 'NaT'], dtype='datetime64[D]'))
+        os.replace(tmp, os.path.join(path, STATS_FILE))
+
+    @classmethod
+    def load(cls, path=DRAW_STORE_PATH):
+        idx = cls()
+        with np.load(os.path.join(path, STATS_FILE)) as z:
+            idx.total = int(z['total'])
+            idx.counts, idx.weekday_counts = z['counts'], z['weekday_counts']
+            idx.weekday_totals, idx.last_seen, idx.gap_hist = z['weekday_totals'], z['last_seen'], z['gap_hist']
+            latest = z['latest_date'][0]
+            idx.latest_date = None if np.isnat(latest) else latest
+        return idx
+
+def refresh_stats_index(path=DRAW_STORE_PATH):
+    """ อัปเดตดัชนีใน store: มีของเดิมก็เพิ่มเฉพาะงวดใหม่ ไม่มีก็สร้างใหม่ทั้งหมด """
+    arrays = load_arrays(path)
+    idx = None
+    if os.path.exists(os.path.join(path, STATS_FILE)):
+        idx = DrawStatsIndex.load(path)
+        # ถ้ามีการแก้ข้อมูลย้อนหลัง (จำนวนงวดไม่ตรง) ให้สร้างใหม่
+        older = two_digit_draws(arrays)[0] <= (idx.latest_date if idx.latest_date is not None else np.datetime64('NaT'))
+        if int(older.sum()) != idx.total:
+            idx = None
+    if idx is None:
+        idx = DrawStatsIndex.from_arrays(arrays)
+    else:
+        idx.extend(arrays)
+    idx.save(path)
+    return idx
+
+def load_stats_index(path=DRAW_STORE_PATH):
+    """ โหลดดัชนีจาก store (สร้างให้ถ้ายังไม่มี) """
+    if not store_exists(path):
+        return None
+    if os.path.exists(os.path.join(path, STATS_FILE)):
+        return DrawStatsIndex.load(path)
+    return refresh_stats_index(path)
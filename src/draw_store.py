@@ -0,0 +1,126 @@
+# services/draw_store.py
+"""
+ที่เก็บผลหวยแบบไฟล์ในเครื่อง (numpy .npy ทีละคอลัมน์ เปิดแบบ memory-map ได้)
+ใช้เป็นแหล่งข้อมูลหลักของงานวิเคราะห์ ส่วน Google Sheets เป็นแค่ mirror
+
+ข้อมูลในไฟล์เรียงจาก เก่า -> ใหม่ และแปลงชนิดไว้แล้ว:
+- dates            datetime64[D]
+- last_two_digits  int8   (-1 = ไม่มีข้อมูล)
+- first_prize      int32  (-1 = ไม่มีข้อมูล)
+- prize_pre_3digit int16 (n, 4)  (-1 = ช่องว่าง)
+- prize_suf_3digit int16 (n, 4)
+"""
+import os
+import re
+import json
+import numpy as np
+import pandas as pd
+
+DRAW_STORE_PATH = os.getenv('DRAW_STORE_PATH', 'data/draws')
+PRIZE_WIDTH = 4
+COLUMNS = ['dates', 'last_two_digits', 'first_prize', 'prize_pre_3digit', 'prize_suf_3digit']
+
+def parse_prize_list(value, width=PRIZE_WIDTH):
+    """ แปลง "['123', '456']" / "123 456" / '-' เป็น list เลข int ความยาวคงที่ (เติม -1) """
+    nums = [int(n) for n in re.findall(r'\d+', str(value))] if value is not None else []
+    nums = nums[:width]
+    return nums + [-1] * (width - len(nums))
+
+def _to_int(value, default=-1):
+    digits = re.sub(r'\D', '', str(value))
+    return int(digits) if digits else default
+
+def _to_two_digits(value):
+    number = _to_int(value)
+    return number % 100 if number >= 0 else -1
+
+def two_digit_draws(arrays):
+    """ (dates, values) เฉพาะงวดที่มีเลขท้าย 2 ตัว (ข้าม -1) values เป็น int64 พร้อมใช้กับ bincount """
+    values = np.asarray(arrays['last_two_digits']).astype(np.int64)
+    keep = values >= 0
+    return np.asarray(arrays['dates'])[keep], values[keep]
+
+def build_arrays(df):
+    """ แปลง DataFrame (แบบในชีท/จาก scraper) เป็น dict ของ numpy array เรียงเก่า -> ใหม่ """
+    df = df.copy()
+    df['date'] = pd.to_datetime(df['date'], errors='coerce')
+    df = df.dropna(subset=['date']).drop_duplicates(subset=['date'], keep='last').sort_values('date')
+    n = len(df)
+
+    def prize_matrix(col):
+        if col not in df.columns:
+            return np.full((n, PRIZE_WIDTH), -1, dtype=np.int16)
+        return np.array([parse_prize_list(v) for v in df[col]], dtype=np.int16).reshape(n, PRIZE_WIDTH)
+
+    return {
+        'dates': df['date'].values.astype('datetime64[D]'),
+        'last_two_digits': np.array([_to_two_digits(v) for v in df['last_two_digits']], dtype=np.int8),
+        'first_prize': np.array([_to_int(v) for v in df.get('first_prize', pd.Series(['-'] * n))], dtype=np.int32),
+        'prize_pre_3digit': prize_matrix('prize_pre_3digit'),
+        'prize_suf_3digit': prize_matrix('prize_suf_3digit'),
+    }
+
+def save_arrays(arrays, path=DRAW_STORE_PATH):
+    """ เขียนทีละไฟล์ผ่านไฟล์ชั่วคราวแล้ว os.replace (คนอ่านจะไม่เจอไฟล์ครึ่งๆ กลางๆ) """
+    os.makedirs(path, exist_ok=True)
+    for name in COLUMNS:
+        tmp = os.path.join(path, f".{name}.tmp.npy")
+        np.save(tmp, arrays[name])
+        os.replace(tmp, os.path.join(path, f"{name}.npy"))
+    meta = {
+        'rows': int(len(arrays['dates'])),
+        'latest_date': str(arrays['dates'][-1]) if len(arrays['dates']) else None,
+    }
+    tmp = os.path.join(path, '.meta.tmp.json')
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(meta, f)
+    os.replace(tmp, os.path.join(path, 'meta.json'))
+    return meta
+
+def save_draws(df, path=DRAW_STORE_PATH):
+    meta = save_arrays(build_arrays(df), path)
+    print(f"💾 Saved {meta['rows']} draws to local store ({path})")
+    return meta
+
+def store_exists(path=DRAW_STORE_PATH):
+    return os.path.exists(os.path.join(path, 'meta.json'))
+
+def load_arrays(path=DRAW_STORE_PATH, mmap=True):
+    """ โหลด array ทุกคอลัมน์ (mmap=True จะไม่อ่านทั้งไฟล์เข้าหน่วยความจำ) """
+    mode = 'r' if mmap else None
+    return {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode=mode) for name in COLUMNS}
+
+def arrays_to_frame(arrays):
+    """ แปลงกลับเป็น DataFrame เรียง ใหม่ -> เก่า (index 0 = งวดล่าสุด เหมือนในชีท) """
+    def fmt(row):
+        return [f"{v:03d}" for v in row if v >= 0]
+
+    df = pd.DataFrame({
+        'date': pd.to_datetime(np.asarray(arrays['dates'])),
+        'first_prize': [f"{v:06d}" if v >= 0 else '-' for v in arrays['first_prize']],
+        'last_two_digits': [int(v) if v >= 0 else '-' for v in arrays['last_two_digits']],
+        'prize_pre_3digit': [fmt(r) for r in arrays['prize_pre_3digit']],
+        'prize_suf_3digit': [fmt(r) for r in arrays['prize_suf_3digit']],
+    })
+    return df.iloc[::-1].reset_index(drop=True)
+
+def load_draws(path=DRAW_STORE_PATH):
+    """ โหลดผลหวยทั้งหมดจากไฟล์ในเครื่อง ไม่ต้องใช้ credentials """
+    return arrays_to_frame(load_arrays(path))
+
+def merge_draws(df_new, path=DRAW_STORE_PATH, load_history=None):
+    """
+    รวมงวดใหม่เข้ากับของเดิมใน store แล้วบันทึก
+    ถ้ายังไม่มี store ใช้ประวัติเต็มจาก load_history() (เช่น storage.read_draws) เป็นฐานก่อน
+    ไม่มีทั้งสองอย่าง = ไม่เขียน (store ที่มีแค่งวดใหม่จะทำให้สถิติทุกตัวผิด) คืน None
+    """
+    if store_exists(path):
+        df_old = load_draws(path)
+        df_old['prize_pre_3digit'] = df_old['prize_pre_3digit'].map(str)
+        df_old['prize_suf_3digit'] = df_old['prize_suf_3digit'].map(str)
+    else:
+        df_old = load_history() if load_history else None
+        if df_old is None or df_old.empty:
+            print("⚠️ ยังไม่มี local store และไม่มีประวัติให้ตั้งต้น -> ข้ามการบันทึก (รันแบบเต็มเพื่อสร้าง store)")
+            return None
+    return save_draws(pd.concat([df_old, df_new]), path)
@@ -0,0 +1,69 @@
+# services/draw_windows.py
+"""
+ความถี่เลขท้าย 2 ตัวแบบช่วงเวลา (N งวดล่าสุด / ช่วงวันที่ / ถ่วงน้ำหนักลดลงตามเวลา)
+ใช้ prefix sum สะสมต่อเลข: ถามช่วงไหนก็แค่ลบกัน 2 แถว = O(100) ไม่ขึ้นกับจำนวนงวด
+"""
+import numpy as np
+from src.draw_store import build_arrays, two_digit_draws
+from src.draw_analytics import top_numbers
+
+class RollingFrequency:
+    def __init__(self, arrays):
+        """ arrays เรียงเก่า -> ใหม่ (แบบใน draw_store) """
+        dates, values = two_digit_draws(arrays)
+        self.dates = dates.astype('datetime64[D]')
+        self.total = len(values)
+        onehot = np.zeros((self.total + 1, 100), dtype=np.int32)
+        onehot[np.arange(1, self.total + 1), values] = 1
+        self.cum = np.cumsum(onehot, axis=0)              # cum[k] = ความถี่ใน k งวดแรก
+        self._values = values
+        self._decayed = {}                                # half_life -> prefix แบบถ่วงน้ำหนัก
+
+    @classmethod
+    def from_frame(cls, df):
+        return cls(build_arrays(df))
+
+    def _range(self, start, end):
+        """ ความถี่ของงวดตำแหน่ง [start, end) """
+        return self.cum[end] - self.cum[start]
+
+    def last_n(self, n):
+        """ ความถี่ใน n งวดล่าสุด """
+        n = max(0, min(int(n), self.total))
+        return self._range(self.total - n, self.total)
+
+    def between(self, start_date, end_date=None):
+        """ ความถี่ของงวดที่ออกระหว่าง start_date ถึง end_date (รวมทั้งสองวัน) """
+        start = np.searchsorted(self.dates, np.datetime64(start_date, 'D'), side='left')
+        end = self.total if end_date is None else np.searchsorted(self.dates, np.datetime64(end_date, 'D'), side='right')
+        return self._range(start, max(start, end))
+
+    def last_years(self, years):
+        """ ความถี่ย้อนหลัง years ปี นับจากงวดล่าสุด """
+        if not self.total:
+            return np.zeros(100, dtype=np.int64)
+        latest = self.dates[-1]
+        return self.between(latest - np.timedelta64(int(round(365.25 * years)) - 1, 'D'))
+
+    def _decayed_prefix(self, half_life):
+        # D[k] = D[k-1] * r + onehot(งวดที่ k)  สร้างครั้งเดียวต่อ half_life
+        if half_life not in self._decayed:
+            r = 0.5 ** (1.0 / half_life)
+            prefix = np.zeros((self.total + 1, 100))
+            for k, v in enumerate(self._values, start=1):
+                prefix[k] = prefix[k - 1] * r
+                prefix[k, v] += 1.0
+            self._decayed[half_life] = (r, prefix)
+        return self._decayed[half_life]
+
+    def decayed(self, half_life=24, last_n=None):
+        """
+        ความถี่ถ่วงน้ำหนักแบบ exponential: งวดที่เก่ากว่า half_life งวด มีน้ำหนักเหลือครึ่งหนึ่ง
+        (ออกเดือนละ 2 งวด -> half_life=24 ประมาณ 1 ปี)
+        """
+        r, prefix = self._decayed_prefix(half_life)
+        n = self.total if last_n is None else max(0, min(int(last_n), self.total))
+        return prefix[self.total] - (r ** n) * prefix[self.total - n]
+
+    def top(self, counts, n=5):
+        return top_numbers(counts, n, width=2)
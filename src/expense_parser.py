@@ -0,0 +1,120 @@
+# services/expense_parser.py
+"""
+แกะข้อความจดรายรับรายจ่ายง่ายๆ ในเครื่อง (ไม่ต้องถาม Gemini)
+    "ข้าว 50"                 -> [{'action': 'record', 'type': 'รายจ่าย', 'category': 'อาหาร', 'amount': 50, 'note': 'ข้าว'}]
+    "กาแฟ 65 เดินทาง 40"      -> 2 รายการ
+    "เงินเดือน 25,000 บาท"     -> รายรับ
+
+แกะได้ก็ต่อเมื่อมั่นใจ: ทุกส่วนของข้อความต้องเป็น "ชื่อรายการ + จำนวนเงิน"
+และชื่อรายการทั้งคำต้องเป็นคำในพจนานุกรม (เติมคำขยายที่อนุญาตได้ เช่น "ค่า"/"ซื้อ" ข้างหน้า "เช้า"/"เย็น" ข้างหลัง)
+แค่มีคำในพจนานุกรมปนอยู่ไม่พอ ("ยกเลิก ข้าว 50", "หนังสือ 300") มีเครื่องหมายหน้าจำนวนเงินก็ไม่เอา ("ข้าว -50")
+ไม่งั้นคืน None ให้ไปถาม Gemini ตามเดิม
+"""
+import re
+
+# หมวดหมู่เดียวกับที่บอก Gemini ใน prompt
+CATEGORIES = ['อาหาร', 'เดินทาง', 'ช้อปปิ้ง', 'ของใช้ส่วนตัว', 'ค่าบ้าน/รถ', 'บิลค่าน้ำไฟ', 'บันเทิง', 'สุขภาพ', 'เงินออม', 'รายรับ', 'อื่นๆ']
+INCOME_CATEGORY = 'รายรับ'
+
+# ชื่อรายการ (ทั้งคำ) -> หมวดหมู่
+KEYWORDS = {
+    'อาหาร': ['ข้าว', 'กับข้าว', 'อาหาร', 'มื้อ', 'กาแฟ', 'ชา', 'น้ำ', 'ชานม', 'ชาเย็น', 'ชาไทย', 'ชาเขียว', 'โกโก้', 'นม', 'น้ำดื่ม', 'น้ำเปล่า',
+              'น้ำแข็ง', 'น้ำหวาน', 'น้ำอัดลม', 'เครื่องดื่ม', 'ก๋วยเตี๋ยว', 'ส้มตำ', 'ขนม', 'ผลไม้', 'โจ๊ก', 'ไก่ทอด', 'หมูกระทะ',
+              'ชาบู', 'สุกี้', 'บุฟเฟ่ต์', 'ปิ้งย่าง', 'พิซซ่า', 'เบเกอรี่', 'ไอติม', 'ไอศกรีม', 'ผัดไทย', 'กะเพรา', 'ข้าวมันไก่',
+              'coffee', 'food', 'lunch', 'dinner', 'breakfast'],
+    'เดินทาง': ['เดินทาง', 'วิน', 'ค่ารถ', 'ค่าน้ำมัน', 'แท็กซี่', 'แทกซี่', 'taxi', 'grab', 'bolt', 'รถไฟฟ้า', 'bts', 'mrt', 'รถเมล์', 'รถตู้', 'รถทัวร์',
+               'วินมอไซค์', 'มอไซค์รับจ้าง', 'ค่าวิน', 'น้ำมัน', 'ทางด่วน', 'จอดรถ', 'ค่าเรือ', 'รถไฟ', 'เครื่องบิน', 'ปะยาง',
+               'เปลี่ยนยาง', 'ล้างรถ'],
+    'ช้อปปิ้ง': ['ช้อปปิ้ง', 'ช็อปปิ้ง', 'shopee', 'lazada', 'ซื้อของ', 'เสื้อ', 'กางเกง', 'รองเท้า', 'กระเป๋า', 'นาฬิกา', 'ของขวัญ'],
+    'ของใช้ส่วนตัว': ['ของใช้', 'สบู่', 'แชมพู', 'ยาสีฟัน', 'แปรงสีฟัน', 'ทิชชู่', 'ผงซักฟอก', 'น้ำยาซักผ้า', 'ซักผ้า', 'สกินแคร์',
+                      'ครีม', 'เครื่องสำอาง', 'ตัดผม', 'ทำเล็บ'],
+    'ค่าบ้าน/รถ': ['ค่าบ้าน', 'ค่าเช่า', 'ค่าห้อง', 'ค่าหอ', 'ค่าคอนโด', 'ผ่อนบ้าน', 'ผ่อนรถ', 'ค่างวดรถ', 'ค่าส่วนกลาง',
+                   'ประกันรถ', 'ซ่อมรถ', 'ต่อภาษีรถ'],
+    'บิลค่าน้ำไฟ': ['ค่าน้ำ', 'ค่าไฟ', 'ค่าน้ำค่าไฟ', 'ค่าเน็ต', 'เน็ตบ้าน', 'อินเทอร์เน็ต', 'ค่าโทรศัพท์', 'ค่ามือถือ', 'ค่าโทร',
+                    'เติมเงินมือถือ', 'ค่าแก๊ส', 'บิล'],
+    'บันเทิง': ['บันเทิง', 'ดูหนัง', 'ตั๋วหนัง', 'หนัง', 'netflix', 'spotify', 'youtube', 'เกม', 'คอนเสิร์ต', 'เหล้า', 'เบียร์',
+                'ปาร์ตี้', 'คาราโอเกะ', 'เที่ยว'],
+    'สุขภาพ': ['สุขภาพ', 'ยา', 'ค่ายา', 'ซื้อยา', 'ร้านยา', 'หาหมอ', 'ค่าหมอ', 'โรงพยาบาล', 'คลินิก', 'ทำฟัน', 'ฟิตเนส', 'ยิม',
+               'วิตามิน', 'นวด'],
+    'เงินออม': ['เงินออม', 'ออมเงิน', 'เก็บเงิน', 'ฝากเงิน', 'ฝากธนาคาร', 'ลงทุน', 'หุ้น', 'กองทุน', 'ซื้อทอง'],
+    'รายรับ': ['รายรับ', 'เงินเดือน', 'โบนัส', 'ได้เงิน', 'รับเงิน', 'ค่าจ้าง', 'ค่าคอม', 'ปันผล', 'ดอกเบี้ย', 'ขายของได้',
+               'ถูกหวย', 'salary'],
+    'อื่นๆ': ['ทำบุญ', 'บริจาค', 'ใส่ซอง', 'ซองงาน'],
+}
+# คำขยายที่เติมหน้า/หลังชื่อรายการได้โดยไม่เปลี่ยนความหมาย ("ค่าข้าว", "ซื้อกาแฟ", "ข้าวเช้า")
+PREFIX_MODIFIERS = ['ค่า', 'ซื้อ', 'กิน', 'จ่าย', 'จ่ายค่า']
+SUFFIX_MODIFIERS = ['เช้า', 'เที่ยง', 'กลางวัน', 'เย็น', 'มื้อเช้า', 'มื้อเที่ยง', 'มื้อกลางวัน', 'มื้อเย็น', 'วันนี้', 'เมื่อวาน']
+
+# เจอคำพวกนี้ = เป็นคำถาม / ให้ค้นหา / สั่งแก้รายการ ไม่ใช่การจดใหม่
+NOT_A_RECORD = ['?', 'ไหม', 'มั้ย', 'อะไร', 'เท่าไร', 'เท่าไหร่', 'ยังไง', 'อย่างไร', 'ทำไม', 'กี่', 'ที่ไหน',
+                'ค้นหา', 'search', 'ราคา', 'อากาศ', 'ข่าว', 'สรุป', 'ยอด', 'ยกเลิก', 'ลบ', 'ยืม', 'คืนเงิน']
+
+MAX_ITEMS = 10
+MAX_NOTE_LENGTH = 40
+MAX_AMOUNT = 10_000_000
+
+_THAI_OR_LATIN = r'[\u0E00-\u0E7Fa-zA-Z]'
+_SEGMENT_RE = re.compile(
+    r'\s*(?P<note>[^\d\n,+]+?)\s*'
+    r'฿?\s*(?P<amount>(?:\d{1,3}(?:,\d{3})+|\d+)(?:\.\d+)?)\s*'
+    r'(?P<unit>k|K|พัน|หมื่น)?\s*(?:บาท|บ\.|บ|฿)?'
+    rf'(?!{_THAI_OR_LATIN})\s*(?:[,+\n/]|และ)?'
+)
+_NOTE_RE = re.compile(rf'^(?:{_THAI_OR_LATIN}|\s)+$')
+_MULTIPLIERS = {'k': 1000, 'K': 1000, 'พัน': 1000, 'หมื่น': 10000}
+_KEYWORD_MAP = {kw.lower(): cat for cat, kws in KEYWORDS.items() for kw in kws}
+
+def categorize(note):
+    """ หาหมวดหมู่จากชื่อรายการ: ทั้งคำต้องเป็นคำในพจนานุกรม (+ คำขยายที่อนุญาต) ไม่งั้น None """
+    if not _NOTE_RE.match(note):
+        return None
+    text = re.sub(r'\s+', '', note).lower()
+    for prefix in [''] + PREFIX_MODIFIERS:
+        if not text.startswith(prefix):
+            continue
+        for suffix in [''] + SUFFIX_MODIFIERS:
+            if not text.endswith(suffix):
+                continue
+            core = text[len(prefix):len(text) - len(suffix)]
+            if core in _KEYWORD_MAP:
+                return _KEYWORD_MAP[core]
+    return None
+
+def split_segments(text):
+    """ แบ่งข้อความเป็น [(note, amount), ...] ต้องกินข้อความได้หมดทั้งข้อความ ไม่งั้นคืน None """
+    segments, pos = [], 0
+    text = text.strip()
+    while pos < len(text):
+        m = _SEGMENT_RE.match(text, pos)
+        if not m or m.end() == pos:
+            return None
+        amount = float(m.group('amount').replace(',', '')) * _MULTIPLIERS.get(m.group('unit'), 1)
+        segments.append((m.group('note').strip(), amount))
+        pos = m.end()
+    return segments
+
+def parse_expense_message(text):
+    """ คืน list รายการแบบเดียวกับที่ Gemini ตอบ หรือ None ถ้าไม่มั่นใจ """
+    text = (text or '').strip()
+    lowered = text.lower()
+    if not text or any(word in lowered for word in NOT_A_RECORD):
+        return None
+    segments = split_segments(text)
+    if not segments or len(segments) > MAX_ITEMS:
+        return None
+
+    items = []
+    for note, amount in segments:
+        if not note or len(note) > MAX_NOTE_LENGTH or not 0 < amount <= MAX_AMOUNT:
+            return None
+        category = categorize(note)
+        if category is None:
+            return None
+        items.append({
+            'action': 'record',
+            'type': 'รายรับ' if category == INCOME_CATEGORY else 'รายจ่าย',
+            'category': category,
+            'amount': int(amount) if amount.is_integer() else amount,
+            'note': note,
+        })
+    return items
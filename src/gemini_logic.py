@@ -1,38 +1,78 @@
-import google.generativeai as genai
-import gspread
-from google.oauth2.service_account import Credentials
 import os
 import json
 from datetime import datetime
 import pytz
 import re
 import uuid
-import cloudscraper
-from bs4 import BeautifulSoup
+import threading
+from src.http_session import get_with_retries
+from src.model_router import ModelRouter
+from src.response_cache import response_cache
+from src.data_cache import DatasetCache
+from src.monthly_summary import MonthlyAggregate
+from src.storage import get_storage
+from src.metrics import span, count
+from src.expense_parser import CATEGORIES, parse_expense_message
 
 # --- Config ---
 GENAI_API_KEY = os.getenv('GEMINI_API_KEY')
+SEARCH_CACHE_TTL = 300    # วินาที
+SUMMARY_CACHE_TTL = 120   # กันกรณีมีหลาย worker (worker อื่นไม่รู้ว่ามีการบันทึก)
+MONTHLY_AGGREGATE_TTL = int(os.getenv('MONTHLY_AGGREGATE_TTL', '600'))
+LOCAL_EXPENSE_PARSER = os.getenv('LOCAL_EXPENSE_PARSER', '1') != '0'   # จดรายการง่ายๆ เองโดยไม่ถาม Gemini
 
-def get_google_client():
-    scopes = ["https://www.googleapis.com/auth/spreadsheets", "https://www.googleapis.com/auth/drive"]
-    try:
-        if os.getenv('GOOGLE_CREDENTIALS_JSON'):
-            creds_dict = json.loads(os.getenv('GOOGLE_CREDENTIALS_JSON'))
-            creds = Credentials.from_service_account_info(creds_dict, scopes=scopes)
-        else:
-            creds = Credentials.from_service_account_file('core/credentials.json', scopes=scopes)
-        return gspread.authorize(creds)
-    except Exception as e:
-        raise Exception(f"Auth Error: {str(e)}")
+# รายชื่อโมเดลที่ใช้ได้จริง (เรียงจากโควต้าเยอะ -> น้อย) เป็นลำดับเริ่มต้นของ router
+MODELS_TO_TRY = [
+    'gemini-2.0-flash-lite',         # หวังผลตัวนี้สุด (Lite = ถูก/ฟรีเยอะ)
+    'gemini-2.0-flash-exp',          # ตัวทดลอง มักใจป้ำให้ใช้ฟรี
+    'gemini-2.5-flash-lite',         # Lite ตัวใหม่
+    'gemini-2.5-flash',              # ตัวนี้ใช้ได้ชัวร์ (แต่โควต้าน้อย ไว้กันตาย)
+    'gemini-flash-lite-latest'       # เผื่อฟลุ๊ค
+]
+
+# ส่วนที่ไม่เปลี่ยนตามข้อความ (เวลา/ผลค้นหา ใส่ไปกับข้อความแทน เพื่อให้ใช้ model object ซ้ำได้)
+SYSTEM_INSTRUCTION = f"""
+        คุณคือเลขาส่วนตัว 'My Assistant' เก่งบัญชี
+        หน้าที่:
+        1. อ้างอิงผลการค้นหาที่แนบมากับข้อความถ้ามี
+        2. ถ้าพิมพ์รายการเงิน ตอบ JSON Array: [{{"action": "record", "type": "รายจ่าย/รายรับ", "category": "หมวดหมู่", "amount": ตัวเลข, "note": "รายละเอียด"}}]
+           หมวดหมู่: {CATEGORIES}
+        3. คำถามทั่วไปตอบปกติ
+        """
+
+_router = None
+_router_lock = threading.Lock()
+
+def get_model_router():
+    """ configure Gemini ครั้งเดียว แล้วใช้ router ตัวเดียวทั้งโปรเซส """
+    global _router
+    if _router is None:
+        with _router_lock:
+            if _router is None:
+                import google.generativeai as genai   # โหลดช้า (~1 วินาที) import เมื่อต้องใช้โมเดลจริงเท่านั้น
+                genai.configure(api_key=GENAI_API_KEY)
+                _router = ModelRouter(genai, MODELS_TO_TRY, SYSTEM_INSTRUCTION)
+    return _router
 
 # --- Search Function ---
 def search_weather_or_info(query):
+    cached = response_cache.get(('search', query))
+    if cached is not None:
+        return cached
+    with span('search'):
+        result = fetch_search_results(query)
+    if result:
+        response_cache.set(('search', query), result, ttl=SEARCH_CACHE_TTL, tag='search')
+    return result
+
+def fetch_search_results(query):
     try:
-        scraper = cloudscraper.create_scraper()
-        url = f"https://html.duckduckgo.com/html/?q={query}"
+        url = "https://html.duckduckgo.com/html/"
         headers = {'User-Agent': 'Mozilla/5.0'}
-        res = scraper.get(url, headers=headers)
+        # ผู้ใช้รอคำตอบอยู่ พักก่อนลองใหม่สั้นๆ พอ
+        res = get_with_retries(url, retry_delay=(0.5, 1), params={'q': query}, headers=headers, timeout=10)
         if res.status_code == 200:
+            from bs4 import BeautifulSoup
             soup = BeautifulSoup(res.text, 'html.parser')
             results = [r.get_text() for r in soup.find_all('a', class_='result__a', limit=3)]
             snippets = [s.get_text() for s in soup.find_all('a', class_='result__snippet', limit=3)]
@@ -42,49 +82,63 @@ def search_weather_or_info(query):
     return ""
 
 # --- Sheet Functions ---
-def save_to_accounting_sheet(data):
-    try:
-        client = get_google_client()
-        try: spreadsheet = client.open('LotteryData')
-        except: return False, "หาไฟล์ 'LotteryData' ไม่เจอ", ""
-        try: sheet = spreadsheet.worksheet('Accounting')
-        except: return False, "ไม่พบ Tab 'Accounting'", ""
+def _accounting_row(data, now):
+    tx_id = f"tx_{str(uuid.uuid4())[:8]}"
+    row = [now.strftime("%d/%m/%Y %H:%M"), data.get('type'), data.get('category'),
+           float(data.get('amount', 0)), data.get('note'), tx_id]
+    return row, tx_id
 
+def apply_summary_changes(changes):
+    """ changes: {(Month, Type, Category): ยอดที่ต้องบวกเพิ่ม} -> storage + ยอดรายเดือนในหน่วยความจำ """
+    get_storage().add_to_summary(changes)
+    # อัปเดตยอดรายเดือนในหน่วยความจำด้วย (ถ้าโหลดไว้แล้ว)
+    if _monthly_cache.loaded():
+        _monthly_cache.get().apply(changes)
+    response_cache.invalidate('summary')
+
+# --- Batched writes (1 ข้อความ = เขียนบัญชี 1 ครั้ง + อัปเดต Summary 1 ครั้ง) ---
+def save_records(items):
+    """
+    บันทึกหลายรายการจากข้อความเดียว
+    คืน (True, "", [tx_id, ...]) หรือ (False, error, [])
+    """
+    try:
         tz = pytz.timezone('Asia/Bangkok')
         now = datetime.now(tz)
-        tx_id = f"tx_{str(uuid.uuid4())[:8]}"
-        sheet.append_row([
-            now.strftime("%d/%m/%Y %H:%M"),
-            data.get('type'), data.get('category'), float(data.get('amount', 0)), data.get('note'), tx_id
-        ])
-        return True, "", tx_id
+        month_str = now.strftime("%m/%Y")
+        rows, tx_ids, changes = [], [], {}
+        for data in items:
+            row, tx_id = _accounting_row(data, now)
+            rows.append(row)
+            tx_ids.append(tx_id)
+            key = (month_str, data.get('type'), data.get('category'))
+            changes[key] = changes.get(key, 0) + row[3]
+        get_storage().append_transactions(rows)
+        response_cache.invalidate('summary')
     except Exception as e:
-        return False, str(e), ""
+        return False, str(e), []
 
-def update_summary(data):
     try:
-        client = get_google_client()
-        sheet = client.open('LotteryData').worksheet('Summary')
-        tz = pytz.timezone('Asia/Bangkok')
-        month_str = datetime.now(tz).strftime("%m/%Y")
-        records = sheet.get_all_records()
-        found = False
-        for i, row in enumerate(records):
-            if str(row['Month']) == month_str and row['Type'] == data['type'] and row['Category'] == data['category']:
-                new_amount = float(row['Amount']) + float(data['amount'])
-                sheet.update_cell(i + 2, 4, new_amount) 
-                found = True
-                break
-        if not found:
-            sheet.append_row([month_str, data['type'], data['category'], float(data['amount'])])
+        apply_summary_changes(changes)
     except Exception as e:
         print(f"Summary Error: {e}")
+    return True, "", tx_ids
 
 def get_total_summary(mode="simple"):
+    month_str = datetime.now(pytz.timezone('Asia/Bangkok')).strftime("%m/%Y")
+    cache_key = ('summary', mode, month_str)
+    cached = response_cache.get(cache_key)
+    if cached is not None:
+        return cached
+    with span('format_response', kind='summary'):
+        msg = build_total_summary(mode)
+    if not msg.startswith("❌"):
+        response_cache.set(cache_key, msg, ttl=SUMMARY_CACHE_TTL, tag='summary')
+    return msg
+
+def build_total_summary(mode="simple"):
     try:
-        client = get_google_client()
-        sheet = client.open('LotteryData').worksheet('Summary')
-        records = sheet.get_all_records()
+        records = get_storage().read_summary()
         tz = pytz.timezone('Asia/Bangkok')
         month_str = datetime.now(tz).strftime("%m/%Y")
         total_income = 0
@@ -92,7 +146,7 @@ def get_total_summary(mode="simple"):
         categories = {}
         for r in records:
             if str(r['Month']) == month_str:
-                amt = float(r['Amount'])
+                amt = float(str(r['Amount']).replace(',', ''))
                 if r['Type'] == 'รายรับ': total_income += amt
                 else:
                     total_expense += amt
@@ -106,6 +160,45 @@ def get_total_summary(mode="simple"):
         return f"❌ ดึงข้อมูลไม่ได้จ้า: {str(e)}"
 
 # --- Main Logic with VALID MODEL LIST ---
+def extract_json_items(res_text):
+    """ ดึง JSON (array หรือ object) ออกจากคำตอบของโมเดล คืน list ของ dict หรือ None """
+    cleaned_text = re.sub(r'```json|```', '', res_text).strip()
+    start_index = -1
+    if '[' in cleaned_text and ']' in cleaned_text:
+        start_index = cleaned_text.find('[')
+        end_index = cleaned_text.rfind(']') + 1
+    elif '{' in cleaned_text and '}' in cleaned_text:
+        start_index = cleaned_text.find('{')
+        end_index = cleaned_text.rfind('}') + 1
+
+    if start_index == -1:
+        return None
+    try:
+        data = json.loads(cleaned_text[start_index:end_index])
+    except ValueError:
+        return None
+    if isinstance(data, dict): data = [data]
+    if not isinstance(data, list): return None
+    return [item for item in data if isinstance(item, dict)]
+
+def record_and_reply(records, source):
+    """ บันทึกรายการแล้วสร้างข้อความตอบกลับ (None ถ้าไม่มีอะไรบันทึกได้) """
+    recorded_items = []
+    failed_items = []
+    total_amount = 0
+    success, error_msg, tx_ids = save_records(records)
+    if success:
+        for item in records:
+            recorded_items.append(f"- {item.get('note')}: {item.get('amount')} บาท")
+            total_amount += float(item.get('amount', 0))
+    else:
+        failed_items.append(f"❌ บันทึกไม่ได้: {error_msg}")
+    if not recorded_items:
+        return None
+    msg = f"✅ จดเรียบร้อย! (Model: {source})\n" + "\n".join(recorded_items)
+    msg += f"\n\nรวม: {total_amount:,.2f} บาท"
+    if failed_items: msg += "\n\n" + "\n".join(failed_items)
+    return msg
 
 def get_gemini_response(user_text, user_id):
     if not GENAI_API_KEY: return "⚠️ Missing API Key"
@@ -115,8 +208,17 @@ def get_gemini_response(user_text, user_id):
     if "หมวดหมู่" in user_text:
         return get_total_summary(mode="detail")
 
+    # รายการง่ายๆ ("ข้าว 50", "กาแฟ 65 เดินทาง 40") จดเองได้เลย ไม่ต้องเสียโควต้าโมเดล
+    if LOCAL_EXPENSE_PARSER:
+        records = parse_expense_message(user_text)
+        count('expense_parser', result='local' if records else 'fallback')
+        if records:
+            with span('format_response', kind='local_record'):
+                msg = record_and_reply(records, 'local')
+            if msg:
+                return msg
+
     try:
-        genai.configure(api_key=GENAI_API_KEY)
         tz = pytz.timezone('Asia/Bangkok')
         current_time = datetime.now(tz).strftime("%d/%m/%Y %H:%M:%S")
         
@@ -132,77 +234,25 @@ def get_gemini_response(user_text, user_id):
                 res = search_weather_or_info(query)
                 if res: external_context = f"\n[ข้อมูลจากการค้นหา]: {res}\n"
 
-        # 2. Prompt
-        system_instruction = f"""
-        คุณคือเลขาส่วนตัว 'My Assistant' เก่งบัญชี เวลา: {current_time}
-        {external_context}
-        หน้าที่:
-        1. อ้างอิงผลการค้นหาด้านบนถ้ามี
-        2. ถ้าพิมพ์รายการเงิน ตอบ JSON Array: [{{"action": "record", "type": "รายจ่าย/รายรับ", "category": "หมวดหมู่", "amount": ตัวเลข, "note": "รายละเอียด"}}]
-           หมวดหมู่: ['อาหาร', 'เดินทาง', 'ช้อปปิ้ง', 'ของใช้ส่วนตัว', 'ค่าบ้าน/รถ', 'บิลค่าน้ำไฟ', 'บันเทิง', 'สุขภาพ', 'เงินออม', 'รายรับ', 'อื่นๆ']
-        3. คำถามทั่วไปตอบปกติ
-        """
-
-        # 3. [สำคัญ] รายชื่อโมเดลที่ใช้ได้จริง (เรียงจากโควต้าเยอะ -> น้อย)
-        # เราจะไม่เดาชื่อแล้ว เอาชื่อจากที่คุณส่งมาใส่เลย
-        models_to_try = [
-            'gemini-2.0-flash-lite',         # หวังผลตัวนี้สุด (Lite = ถูก/ฟรีเยอะ)
-            'gemini-2.0-flash-exp',          # ตัวทดลอง มักใจป้ำให้ใช้ฟรี
-            'gemini-2.5-flash-lite',         # Lite ตัวใหม่
-            'gemini-2.5-flash',              # ตัวนี้ใช้ได้ชัวร์ (แต่โควต้าน้อย ไว้กันตาย)
-            'gemini-flash-lite-latest'       # เผื่อฟลุ๊ค
-        ]
-
-        response = None
-        used_model = ""
-        last_error = ""
+        # 2. Prompt (ส่วนที่เปลี่ยนทุกครั้ง แนบไปกับข้อความ)
+        prompt = f"[เวลา: {current_time}]{external_context}\n{user_text}"
 
-        # วนลูปจนกว่าจะเจอตัวที่ยอมให้ใช้
-        for model_name in models_to_try:
-            try:
-                # print(f"Trying model: {model_name}")
-                model = genai.GenerativeModel(model_name=model_name, system_instruction=system_instruction)
-                response = model.generate_content(user_text)
-                used_model = model_name
-                break # เจอตัวที่ใช่ หยุดทันที
-            except Exception as e:
-                last_error = str(e)
-                continue 
+        # 3. ให้ router เลือกโมเดลที่น่าจะใช้ได้ (ข้ามตัวที่โควต้าหมด/โดน 429 อยู่)
+        response, used_model, last_error = get_model_router().generate(prompt)
         
         if not response:
             return f"❌ ทุกโมเดลปฏิเสธการทำงาน (Error ล่าสุด: {last_error})"
 
-        # 4. ประมวลผล
-        res_text = response.text.strip()
-        cleaned_text = re.sub(r'```json|```', '', res_text).strip()
-        start_index = -1
-        if '[' in cleaned_text and ']' in cleaned_text:
-            start_index = cleaned_text.find('[')
-            end_index = cleaned_text.rfind(']') + 1
-        elif '{' in cleaned_text and '}' in cleaned_text:
-            start_index = cleaned_text.find('{')
-            end_index = cleaned_text.rfind('}') + 1
+        # 4. ประมวลผล (แกะ JSON จากคำตอบ)
+        with span('format_response', kind='gemini'):
+            res_text = response.text.strip()
+            data = extract_json_items(res_text)
 
-        if start_index != -1 and end_index != -1:
+        if data is not None:
             try:
-                data = json.loads(cleaned_text[start_index:end_index])
-                if isinstance(data, dict): data = [data]
-                recorded_items = []
-                failed_items = []
-                total_amount = 0
-                for item in data:
-                    if item.get('action') == 'record':
-                        success, error_msg, tx_id = save_to_accounting_sheet(item)
-                        if success:
-                            update_summary(item)
-                            recorded_items.append(f"- {item.get('note')}: {item.get('amount')} บาท")
-                            total_amount += float(item.get('amount', 0))
-                        else:
-                            failed_items.append(f"❌ บันทึกไม่ได้: {error_msg}")
-                if recorded_items:
-                    msg = f"✅ จดเรียบร้อย! (Model: {used_model})\n" + "\n".join(recorded_items)
-                    msg += f"\n\nรวม: {total_amount:,.2f} บาท"
-                    if failed_items: msg += "\n\n" + "\n".join(failed_items)
+                records = [item for item in data if item.get('action') == 'record']
+                msg = record_and_reply(records, used_model) if records else None
+                if msg:
                     return msg
             except: pass
         
@@ -211,46 +261,33 @@ def get_gemini_response(user_text, user_id):
     except Exception as e:
         return f"❌ ระบบขัดข้อง: {str(e)}"
 
-def get_dashboard_data():
-    """ดึงข้อมูลสรุปยอดเดือนนี้ เพื่อส่งให้หน้าเว็บทำกราฟ"""
+# --- Monthly aggregate (ใช้กับ /api/summary และ dashboard) ---
+def load_monthly_aggregate():
+    return MonthlyAggregate.from_records(get_storage().read_summary())
+
+_monthly_cache = DatasetCache(load_monthly_aggregate, ttl=MONTHLY_AGGREGATE_TTL)
+
+def get_monthly_aggregate():
+    return _monthly_cache.get()
+
+def get_dashboard_data(month_str=None):
+    """ดึงข้อมูลสรุปยอดเดือนนี้ (จากยอดรวมในหน่วยความจำ) เพื่อส่งให้หน้าเว็บทำกราฟ"""
     try:
-        client = get_google_client()
-        sheet = client.open('LotteryData').worksheet('Summary')
-        records = sheet.get_all_records()
+        if not month_str:
+            tz = pytz.timezone('Asia/Bangkok')
+            month_str = datetime.now(tz).strftime("%m/%Y")
+        return get_monthly_aggregate().month_view(month_str)
         
+    except Exception as e:
+        print(f"Dashboard Error: {e}")
+        return {}
+
+def get_dashboard_trend(months=6):
+    """ยอดสรุปหลายเดือนในครั้งเดียว (เรียงเก่า -> ใหม่) สำหรับกราฟแนวโน้ม"""
+    try:
         tz = pytz.timezone('Asia/Bangkok')
-        month_str = datetime.now(tz).strftime("%m/%Y")
-        
-        categories = {}
-        total_income = 0
-        total_expense = 0
-        
-        for r in records:
-            # ดึงเฉพาะข้อมูลเดือนปัจจุบัน
-            if str(r['Month']) == month_str:
-                amt = float(r['Amount'])
-                if r['Type'] == 'รายรับ':
-                    total_income += amt
-                else:
-                    total_expense += amt
-                    # รวมยอดตามหมวดหมู่
-                    cat = r['Category']
-                    categories[cat] = categories.get(cat, 0) + amt
-        
-        # เตรียมข้อมูลส่งกลับเป็น JSON
-        # แปลงข้อมูลกราฟ (แยกชื่อหมวดหมู่ และ ตัวเลขออกจากกัน)
-        chart_labels = list(categories.keys())
-        chart_data = list(categories.values())
-        
-        return {
-            "month": month_str,
-            "income": total_income,
-            "expense": total_expense,
-            "balance": total_income - total_expense,
-            "chart_labels": chart_labels,
-            "chart_data": chart_data
-        }
-        
+        agg = get_monthly_aggregate()
+        return [agg.month_view(m) for m in agg.recent_months(months, until=datetime.now(tz).strftime("%m/%Y"))]
     except Exception as e:
         print(f"Dashboard Error: {e}")
-        return {}
\ No newline at end of file
+        return []
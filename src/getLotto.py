@@ -1,108 +1,168 @@
-import cloudscraper
-from bs4 import BeautifulSoup
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import threading
 import time
 import random
 import pandas as pd
+from src.http_session import get_session, backoff_delay, HTTP_RETRIES
+from src.metrics import span
+from src.lotto_page import extract_prizes, format_prizes, is_lotto_page
+from src.page_cache import get_page_cache
+from src.draw_calendar import get_calendar, record_no_draw
+
+SANOOK_HOST = "news.sanook.com"
+SANOOK_CHECK_URL = f"https://{SANOOK_HOST}/lotto/check/"
+NO_DRAW_GRACE_DAYS = 3   # หน้าของงวดที่เพิ่งผ่านมาอาจยังไม่ขึ้นผล ยังไม่ถือว่า "ไม่มีงวด"
+
+class TokenBucket:
+    """ จำกัดความถี่การยิง request (token bucket) ใช้ร่วมกันได้หลาย thread """
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)                      # token ต่อวินาที
+        self.capacity = float(capacity or max(1.0, rate))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+_host_buckets = {}
+_host_buckets_lock = threading.Lock()
+
+def get_host_limiter(host, rate=4.0, capacity=None):
+    """ คืน TokenBucket ของแต่ละ host (สร้างครั้งเดียว แล้วใช้ซ้ำ) """
+    with _host_buckets_lock:
+        if host not in _host_buckets:
+            _host_buckets[host] = TokenBucket(rate, capacity)
+        return _host_buckets[host]
 
 def generate_lotto_dates(year):
+    """ วันหวยออกของปีนั้นที่ถึงกำหนดแล้ว (จากปฏิทินกลาง src/draw_calendar.py) """
+    current_date = datetime.now()
+    return [d for d in get_calendar().crawl_dates(year) if d <= current_date]
+
+def parse_lotto_page(content, date_obj):
+    """ แกะเลขรางวัลจากหน้า sanook เป็นแถวแบบในชีท (คืน None ถ้าไม่เจอรางวัลที่ 1 / เลขท้าย 2 ตัว)
+    ถ้าต้องการเลข int ใช้ extract_prizes(content) ตรงๆ
     """
-    สร้างวันที่หวยออกโดยอัตโนมัติ (ฉบับปรับปรุงตามปฏิทิน 2568)
+    prizes = extract_prizes(content)
+    if prizes is None:
+        return None
+    return {'date': date_obj, **format_prizes(prizes)}
+
+def draw_url(date_obj):
+    """ url หน้าตรวจหวยของงวดนั้น (ปี พ.ศ.) """
+    return f"{SANOOK_CHECK_URL}{date_obj.day:02d}{date_obj.month:02d}{date_obj.year + 543}/"
+
+def date_from_url(url):
+    """ กลับกันกับ draw_url (None ถ้าไม่ใช่หน้าตรวจหวย) """
+    code = url[len(SANOOK_CHECK_URL):].strip('/') if url.startswith(SANOOK_CHECK_URL) else ''
+    if len(code) != 8 or not code.isdigit():
+        return None
+    try:
+        return datetime(int(code[4:]) - 543, int(code[2:4]), int(code[:2]))
+    except ValueError:
+        return None
+
+def get_lotto_result(date_obj, limiter=None, retry_delay=None, offline=False):
+    """ เจาะดึงเลขจากวันที่ระบุ (Sanook Scraper)
+    limiter: TokenBucket (ถ้ามี) จะรอ token ก่อนยิงทุกครั้ง
+    retry_delay: ช่วงเวลาพัก (วินาที) ก่อนลองใหม่ ค่าเริ่มต้นตาม HTTP_RETRY_BACKOFF ใน src/http_session.py
+    offline: ใช้เฉพาะหน้าที่เก็บไว้ในแคช ไม่ยิงเว็บเลย
     """
-    dates = []
-    current_date = datetime.now()
-    
-    for month in range(1, 13):
-        # กฎพื้นฐาน: ออกวันที่ 1 และ 16
-        d1 = datetime(year, month, 1)
-        d2 = datetime(year, month, 16)
-        
-        # --- กฎยกเว้น (วันหยุดสำคัญ) ---
-        
-        # 1. เดือนมกราคม: 
-        # - งวดปีใหม่: ปกติออก 1 ม.ค. ปีนี้เลื่อนเป็น 2 ม.ค.
-        # - วันครู: 16 ม.ค. เลื่อนไป 17 ม.ค.
-        if month == 1:
-            d1 = datetime(year, month, 2)  # แก้ไข: เปลี่ยนจาก None เป็นวันที่ 2
-            d2 = datetime(year, month, 17) # 16 เลื่อนไป 17
-            
-        # 2. เดือนพฤษภาคม: 
-        # - วันแรงงาน: 1 พ.ค. เลื่อนไป 2 พ.ค.
-        elif month == 5:
-            d1 = datetime(year, month, 2)
-            
-        # 3. เดือนมิถุนายน:
-        # - 1 มิ.ย. (ถ้าตรงวันสำคัญทางศาสนาอาจเลื่อน แต่ปี 2025 น่าจะปกติ หรือออก 2 มิ.ย. เผื่อไว้)
-        # * เพื่อความชัวร์ ลองเช็ควันที่ 1 ก่อน ถ้าพลาดค่อยว่ากัน *
-
-        # 4. เดือนธันวาคม:
-        # - 30 ธ.ค. (บางปีมีงวดพิเศษส่งท้าย)
-        if month == 12:
-            d3 = datetime(year, month, 30)
-            if d3 <= current_date: dates.append(d3)
-
-        # --- เพิ่มวันที่ลง List (กรองเฉพาะวันที่ถึงกำหนดแล้ว) ---
-        if d1 and d1 <= current_date: dates.append(d1)
-        if d2 and d2 <= current_date: dates.append(d2)
-    
-    # เรียงลำดับจากเก่าไปใหม่ และตัดตัวซ้ำ
-    return sorted(list(set(dates)))
-
-def get_lotto_result(date_obj):
-    """ เจาะดึงเลขจากวันที่ระบุ (Sanook Scraper) """
-    buddhist_year = date_obj.year + 543
-    date_str_url = f"{date_obj.day:02d}{date_obj.month:02d}{buddhist_year}"
-    url = f"https://news.sanook.com/lotto/check/{date_str_url}/"
+    url = draw_url(date_obj)
+    cache = get_page_cache()
+
+    # หน้าผลหวยที่ออกแล้วไม่เปลี่ยน ถ้าในแคชแกะได้ครบก็ไม่ต้องยิงเว็บ
+    cached = cache.get(url)
+    if cached is not None:
+        data = parse_lotto_page(cached, date_obj)
+        if data or offline:
+            return data
+    elif offline:
+        return None
     
-    # ตั้งค่า Scraper ให้เนียน
-    scraper = cloudscraper.create_scraper(
-        browser={'browser': 'chrome', 'platform': 'windows', 'desktop': True}
-    )
+    # ใช้ session กลาง (keep-alive / cookie ร่วมกันทุกงวด)
+    scraper = get_session()
     
-    max_retries = 3
-    for attempt in range(1, max_retries + 1):
+    for attempt in range(1, HTTP_RETRIES + 1):
         try:
-            resp = scraper.get(url, timeout=15)
-            if resp.status_code == 200:
-                soup = BeautifulSoup(resp.content, 'html.parser')
-                
-                data = {'date': date_obj}
-                
-                # 1. หาจาก Class (วิธีหลัก)
-                p1 = soup.find('strong', class_='lotto__number--first')
-                if p1: data['first_prize'] = p1.text.strip()
-                
-                # 2. หาจากกล่อง (วิธีสำรอง)
-                columns = soup.find_all('div', class_='lottocheck__column')
-                for col in columns:
-                    header = col.find('span', class_='default-font--reward')
-                    if not header: continue
-                    txt = header.text.strip()
-                    nums = [n.text.strip() for n in col.find_all('strong', class_='lotto__number')]
-                    
-                    if not nums: continue
-
-                    if "รางวัลที่ 1" in txt and 'first_prize' not in data: 
-                        data['first_prize'] = nums[0]
-                    elif "เลขท้าย 2 ตัว" in txt: 
-                        data['last_two_digits'] = nums[0]
-                    elif "เลขหน้า 3 ตัว" in txt: 
-                        data['prize_pre_3digit'] = str(nums).replace("'", "'")
-                    elif "เลขท้าย 3 ตัว" in txt: 
-                        data['prize_suf_3digit'] = str(nums).replace("'", "'")
-                
-                if 'first_prize' in data and 'last_two_digits' in data:
-                    return data 
-            
+            if limiter: limiter.acquire()
+            with span('sanook_fetch'):
+                content, source = cache.fetch(url, session=scraper, timeout=15)
+            with span('sanook_parse'):
+                data = parse_lotto_page(content, date_obj)
+            if data:
+                return data
+            # หน้าตรวจหวยจริงที่เพิ่งได้จากเว็บ (200) แต่ไม่มีผล ทั้งที่เลยวันมาหลายวันแล้ว = ไม่มีงวดนี้ ไม่ต้องลองซ้ำ
+            # (ของเก่าในแคชที่ได้มาตอนดึงไม่สำเร็จ อาจเป็นหน้าที่บันทึกไว้ก่อนผลขึ้น ใช้ยืนยันไม่ได้)
+            if source == 'network' and is_lotto_page(content) and (datetime.now() - date_obj).days >= NO_DRAW_GRACE_DAYS:
+                record_no_draw(date_obj)
+                return None
+            # หน้า challenge ของ Cloudflare / ผลของวันนี้ยังไม่ขึ้น -> ลองใหม่
+
         except Exception:
             pass 
         
         # ถ้าพลาด ให้พักแป๊บนึงแล้วลองใหม่
-        time.sleep(random.uniform(2, 4) * attempt)
+        if attempt < HTTP_RETRIES:
+            time.sleep(backoff_delay(attempt, retry_delay))
         
     return None
 
-def fetch_current_year_data():
+def load_cached_draws():
+    """ แกะทุกหน้าตรวจหวยที่อยู่ในแคช (ไม่ใช้ network) คืน DataFrame เรียงเก่า -> ใหม่ """
+    cache = get_page_cache()
+    rows = []
+    for url in cache.urls(SANOOK_CHECK_URL):
+        date_obj = date_from_url(url)
+        content = cache.get(url) if date_obj else None
+        if content is None:
+            continue
+        data = parse_lotto_page(content, date_obj)
+        if data:
+            rows.append(data)
+    return pd.DataFrame(rows).sort_values('date') if rows else pd.DataFrame()
+
+def fetch_dates_concurrent(target_dates, max_workers=8, rate_per_sec=4.0, retry_delay=(0.5, 1)):
+    """
+    ดึงผลหลายงวดพร้อมกันด้วย thread pool + จำกัดความถี่ต่อ host (ไม่ถล่ม sanook)
+    คืนค่า (results เรียงตามวันที่, stats)
+    """
+    limiter = get_host_limiter(SANOOK_HOST, rate_per_sec)
+    stats = {'requested': len(target_dates), 'ok': 0, 'failed': 0, 'failed_dates': [], 'elapsed': 0.0}
+    results = {}
+    started = time.monotonic()
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = {pool.submit(get_lotto_result, d, limiter, retry_delay): d for d in target_dates}
+        for fut in as_completed(futures):
+            d = futures[fut]
+            try:
+                res = fut.result()
+            except Exception:
+                res = None
+            if res:
+                results[d] = res
+                stats['ok'] += 1
+            else:
+                stats['failed'] += 1
+                stats['failed_dates'].append(d)
+
+    stats['failed_dates'].sort()
+    stats['elapsed'] = time.monotonic() - started
+    return [results[d] for d in sorted(results)], stats
+
+def fetch_current_year_data(concurrent=False, max_workers=8, rate_per_sec=4.0):
     current_year = datetime.now().year
     # [แก้ตรงนี้] ให้ดึงปีปัจจุบัน และ ปีก่อนหน้าด้วย (เพื่ออุดรูรั่วรอยต่อ)
     years_to_fetch = [current_year - 1, current_year] 
@@ -110,7 +170,16 @@ def fetch_current_year_data():
     print(f"🕵️ 2. Crawler Working on years: {years_to_fetch} ...")
     
     all_results = []
-    
+
+    if concurrent:
+        now = datetime.now()
+        target_dates = get_calendar().draws_between(datetime(years_to_fetch[0], 1, 1), now, candidates=True)
+        all_results, stats = fetch_dates_concurrent(target_dates, max_workers, rate_per_sec)
+        print(f"   ⚡ Concurrent: {stats['ok']} OK / {stats['failed']} Failed ({stats['elapsed']:.1f}s)")
+        for d in stats['failed_dates']:
+            print(f"   -> ❌ Failed: {d.strftime('%d/%m/%Y')}")
+        return pd.DataFrame(all_results)
+
     for year in years_to_fetch:
         print(f"   ... Generating dates for {year} ...")
         target_dates = generate_lotto_dates(year)
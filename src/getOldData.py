@@ -1,27 +1,34 @@
 # services/github_data.py
 import pandas as pd
-import requests
 import io
+from src.page_cache import get_page_cache
 
-def fetch_old_data():
+OLD_DATA_URL = "https://raw.githubusercontent.com/heart/Data-Set-Thai-Lotto/master/lotto.csv"
+
+def parse_old_data(content):
+    """ แปลงไฟล์ CSV (bytes) จาก GitHub เป็น DataFrame คอลัมน์แบบของเรา """
+    df = pd.read_csv(io.StringIO(content.decode('utf-8')))
+    
+    rename_map = {
+        'date': 'date',
+        'prize_1st': 'first_prize',
+        'prize_2digits': 'last_two_digits',
+        'prize_pre_3digit': 'prize_pre_3digit',
+        'prize_sub_3digits': 'prize_suf_3digit'
+    }
+    df = df.rename(columns=rename_map)
+    # เลือกคอลัมน์
+    df = df[[c for c in rename_map.values() if c in df.columns]]
+    df['date'] = pd.to_datetime(df['date'])
+    return df
+
+def fetch_old_data(offline=False):
+    """ ดึง CSV ผ่านแคชในเครื่อง (ถ้าไฟล์บน GitHub ไม่เปลี่ยนจะได้ 304 ไม่ต้องโหลดใหม่) """
     print("📦 1. Loading Historical Data (GitHub)...")
-    url = "https://raw.githubusercontent.com/heart/Data-Set-Thai-Lotto/master/lotto.csv"
     try:
-        content = requests.get(url).content
-        df = pd.read_csv(io.StringIO(content.decode('utf-8')))
-        
-        rename_map = {
-            'date': 'date',
-            'prize_1st': 'first_prize',
-            'prize_2digits': 'last_two_digits',
-            'prize_pre_3digit': 'prize_pre_3digit',
-            'prize_sub_3digits': 'prize_suf_3digit'
-        }
-        df = df.rename(columns=rename_map)
-        # เลือกคอลัมน์
-        df = df[[c for c in rename_map.values() if c in df.columns]]
-        df['date'] = pd.to_datetime(df['date'])
-        return df
+        content, source = get_page_cache().fetch(OLD_DATA_URL, offline=offline)
+        print(f"   📥 CSV source: {source}")
+        return parse_old_data(content)
     except Exception as e:
         print(f"   ❌ Error: {e}")
         return pd.DataFrame()
\ No newline at end of file
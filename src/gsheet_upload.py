@@ -1,17 +1,35 @@
 # services/gsheet_manager.py
-import gspread
-from oauth2client.service_account import ServiceAccountCredentials
+from src.storage import GoogleSheetsStorage
 
-def upload_data(df, json_path, sheet_name):
-    print(f"\n☁️ 4. Uploading {len(df)} rows to Google Sheets...")
+def _target(json_path, sheet_name, storage):
+    # ส่ง storage มาเองได้ (เช่น SQLite หรือ SQLite+Sheets) ไม่ส่งก็ใช้ Google Sheets
+    return storage or GoogleSheetsStorage(json_path, sheet_name)
+
+def upload_data(df, json_path, sheet_name, storage=None):
+    print(f"\n☁️ 4. Uploading {len(df)} rows to storage...")
     try:
-        scope = ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
-        creds = ServiceAccountCredentials.from_json_keyfile_name(json_path, scope)
-        client = gspread.authorize(creds)
-        sheet = client.open(sheet_name).sheet1
-        
-        sheet.clear()
-        sheet.update(range_name='A1', values=[df.columns.tolist()] + df.values.tolist())
+        _target(json_path, sheet_name, storage).write_draws(df)
         print("🎉 Upload Success!")
+        return True
+    except Exception as e:
+        print(f"❌ Upload Failed: {e}")
+        return False
+
+def get_latest_date(json_path, sheet_name, storage=None):
+    """ อ่านวันที่งวดล่าสุดในชีท (ชีทเรียงใหม่ -> เก่า แถวที่ 2 คืองวดล่าสุด) """
+    try:
+        return _target(json_path, sheet_name, storage).latest_draw_date()
+    except Exception as e:
+        print(f"   ⚠️ อ่านวันที่ล่าสุดไม่ได้: {e}")
+        return None
+
+def append_data(df, json_path, sheet_name, storage=None):
+    """ แทรกเฉพาะงวดใหม่ไว้บนสุด (ต่อจาก header) แทนการล้างแล้วเขียนใหม่ทั้งชีท """
+    print(f"\n☁️ 4. Appending {len(df)} new rows to storage...")
+    try:
+        _target(json_path, sheet_name, storage).append_draws(df)
+        print("🎉 Append Success!")
+        return True
     except Exception as e:
-        print(f"❌ Upload Failed: {e}")
\ No newline at end of file
+        print(f"❌ Append Failed: {e}")
+        return False
@@ -0,0 +1,89 @@
+# services/http_session.py
+import os
+import time
+import random
+import threading
+
+# --- Config (ปรับได้ผ่าน Environment Variable) ---
+HTTP_TIMEOUT = float(os.getenv('HTTP_TIMEOUT', '15'))
+HTTP_POOL_SIZE = int(os.getenv('HTTP_POOL_SIZE', '16'))
+# retry มีชั้นเดียว (ที่ผู้เรียก ผ่าน get_with_retries / backoff_delay) ไม่ซ้อนกับ retry ของ adapter
+HTTP_RETRIES = int(os.getenv('HTTP_RETRIES', '3'))                   # จำนวนครั้งที่ลองทั้งหมดต่อ request
+HTTP_RETRY_BACKOFF = float(os.getenv('HTTP_RETRY_BACKOFF', '2'))     # วินาที (พักราว 1-2 เท่า x ครั้งที่)
+RETRY_STATUS = frozenset([429, 500, 502, 503, 504])
+
+_session = None
+_session_lock = threading.Lock()
+
+def _resize_pool(adapter, pool_size):
+    """ ขยาย connection pool ของ adapter เดิม (ไม่ mount ใหม่ จะได้ไม่ทับ CipherSuiteAdapter ของ cloudscraper) """
+    adapter._pool_connections = adapter._pool_maxsize = pool_size
+    adapter.init_poolmanager(pool_size, pool_size, block=adapter._pool_block)
+
+def _build_session(timeout, pool_size):
+    # import ตอนสร้าง session ครั้งแรก (cloudscraper หนัก ไม่ต้องโหลดตอนบูตเว็บ)
+    import cloudscraper
+
+    # ใช้ cloudscraper ตัวเดียว (keep-alive + cookie jar ร่วมกัน ไม่ต้องผ่าน Cloudflare ใหม่ทุกครั้ง)
+    session = cloudscraper.create_scraper(
+        browser={'browser': 'chrome', 'platform': 'windows', 'desktop': True}
+    )
+    # https ใช้ CipherSuiteAdapter (TLS fingerprint แบบ browser) ต้องคงไว้ แค่ปรับขนาด pool
+    # ไม่ใส่ retry ที่ชั้น adapter: ผู้เรียกลองใหม่เองตาม HTTP_RETRIES
+    for adapter in {id(a): a for a in session.adapters.values()}.values():
+        _resize_pool(adapter, pool_size)
+
+    # ใส่ timeout ให้อัตโนมัติถ้าผู้เรียกไม่ได้ระบุ
+    original_request = session.request
+    def request_with_timeout(method, url, **kwargs):
+        kwargs.setdefault('timeout', timeout)
+        return original_request(method, url, **kwargs)
+    session.request = request_with_timeout
+    return session
+
+def get_session():
+    """ คืน HTTP session ที่ใช้ร่วมกันทั้งโปรเซส (สร้างครั้งแรกครั้งเดียว) """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = _build_session(HTTP_TIMEOUT, HTTP_POOL_SIZE)
+    return _session
+
+def backoff_delay(attempt, retry_delay=None):
+    """ เวลาพักก่อนลองครั้งถัดไป: สุ่มในช่วง retry_delay (ค่าเริ่มต้น HTTP_RETRY_BACKOFF ถึง 2 เท่า) x ครั้งที่ """
+    low, high = retry_delay or (HTTP_RETRY_BACKOFF, 2 * HTTP_RETRY_BACKOFF)
+    return random.uniform(low, high) * attempt
+
+def get_with_retries(url, session=None, attempts=None, retry_delay=None, **kwargs):
+    """ GET ผ่าน session กลาง ลองใหม่เมื่อ network error หรือ status ใน RETRY_STATUS (คืน response สุดท้าย) """
+    session = session or get_session()
+    attempts = attempts or HTTP_RETRIES
+    for attempt in range(1, attempts + 1):
+        try:
+            resp = session.get(url, **kwargs)
+            if resp.status_code not in RETRY_STATUS or attempt == attempts:
+                return resp
+        except Exception:
+            if attempt == attempts:
+                raise
+        time.sleep(backoff_delay(attempt, retry_delay))
+
+def get_connection_stats():
+    """ นับจำนวน connection ที่เปิดใหม่ เทียบกับจำนวน request (ส่วนต่างคือ connection ที่ใช้ซ้ำ) """
+    stats = {'requests': 0, 'opened': 0, 'reused': 0}
+    session = _session
+    if session is None:
+        return stats
+    seen = set()
+    for adapter in session.adapters.values():
+        if id(adapter) in seen: continue
+        seen.add(id(adapter))
+        pools = adapter.poolmanager.pools
+        for key in pools.keys():
+            pool = pools.get(key)
+            if pool is None: continue
+            stats['requests'] += pool.num_requests
+            stats['opened'] += pool.num_connections
+    stats['reused'] = max(0, stats['requests'] - stats['opened'])
+    return stats
@@ -0,0 +1,110 @@
+# services/lotto_page.py
+"""
+แกะเลขรางวัลจากหน้า "ตรวจหวย" ของ sanook
+
+ทางเร็ว: ตัดเฉพาะช่วงกล่องรางวัล (lottocheck) จาก bytes แล้วใช้ regex ไม่ต้องสร้าง DOM ทั้งหน้า
+ทางสำรอง: BeautifulSoup (lxml ถ้าติดตั้งไว้ ไม่งั้น html.parser) แยก parse เฉพาะ div.lottocheck__column
+
+ผลลัพธ์เป็น int ทั้งหมด:
+    {'first_prize': 123456, 'last_two_digits': 7,
+     'prize_pre_3digit': [12, 345], 'prize_suf_3digit': [678, 901]}
+"""
+import re
+import importlib.util
+
+SECTION_START = b'lottocheck__column'
+PAGE_MARKER = b'lottocheck'
+SECTION_ENDS = (b'lottocheck__table', b'</section>')
+
+_COLUMN_RE = re.compile(r'class="[^"]*\bdefault-font--reward\b[^"]*"[^>]*>(.*?)</span>(.*?)(?=class="[^"]*\bdefault-font--reward\b|$)', re.S)
+_NUMBER_RE = re.compile(r'<strong[^>]*class="[^"]*\blotto__number\b[^"]*"[^>]*>\s*(\d+)\s*</strong>')
+_FIRST_RE = re.compile(r'<strong[^>]*class="[^"]*\blotto__number--first\b[^"]*"[^>]*>\s*(\d+)\s*</strong>')
+
+# ชื่อกล่อง -> (คีย์, เป็น list ไหม)
+PRIZE_HEADERS = (
+    ('รางวัลที่ 1', 'first_prize', False),
+    ('เลขท้าย 2 ตัว', 'last_two_digits', False),
+    ('เลขหน้า 3 ตัว', 'prize_pre_3digit', True),
+    ('เลขท้าย 3 ตัว', 'prize_suf_3digit', True),
+)
+PRIZE_WIDTHS = {'first_prize': 6, 'last_two_digits': 2, 'prize_pre_3digit': 3, 'prize_suf_3digit': 3}
+REQUIRED = ('first_prize', 'last_two_digits')
+
+BS4_FEATURES = 'lxml' if importlib.util.find_spec('lxml') else 'html.parser'
+
+def _prize_section(content):
+    """ ตัดเฉพาะช่วง HTML ของกล่องรางวัล (ไม่เจอก็คืนทั้งหน้า) """
+    if isinstance(content, str):
+        content = content.encode('utf-8')
+    start = content.find(SECTION_START)
+    if start < 0:
+        return content.decode('utf-8', 'ignore')
+    start = content.rfind(b'<', 0, start)
+    end = len(content)
+    for marker in SECTION_ENDS:
+        pos = content.find(marker, start)
+        if pos >= 0:
+            end = min(end, pos)
+    return content[start:end].decode('utf-8', 'ignore')
+
+def is_lotto_page(content):
+    """ เป็นหน้าตรวจหวยของ sanook จริงไหม (ไม่ใช่หน้า challenge / error) แม้ยังไม่มีผลรางวัล """
+    if isinstance(content, str):
+        content = content.encode('utf-8')
+    return PAGE_MARKER in content
+
+def _assign(data, header, nums):
+    for label, key, many in PRIZE_HEADERS:
+        if label in header and key not in data:
+            data[key] = nums if many else nums[0]
+            return
+
+def _complete(data):
+    return data if all(k in data for k in REQUIRED) else None
+
+def extract_prizes_fast(content):
+    """ regex เฉพาะช่วงกล่องรางวัล คืน dict เลข int หรือ None ถ้าหาไม่ครบ """
+    section = _prize_section(content)
+    data = {}
+    first = _FIRST_RE.search(section)
+    if first:
+        data['first_prize'] = int(first.group(1))
+    for header, body in _COLUMN_RE.findall(section):
+        nums = [int(n) for n in _NUMBER_RE.findall(body)]
+        if nums:
+            _assign(data, header, nums)
+    return _complete(data)
+
+def extract_prizes_soup(content, features=None):
+    """ ทางสำรองด้วย BeautifulSoup (parse เฉพาะ div.lottocheck__column) """
+    from bs4 import BeautifulSoup, SoupStrainer
+
+    soup = BeautifulSoup(content, features or BS4_FEATURES,
+                         parse_only=SoupStrainer('div', class_='lottocheck__column'))
+    data = {}
+    p1 = soup.find('strong', class_='lotto__number--first')
+    if p1 and p1.text.strip().isdigit():
+        data['first_prize'] = int(p1.text.strip())
+    for col in soup.find_all('div', class_='lottocheck__column'):
+        header = col.find('span', class_='default-font--reward')
+        if not header:
+            continue
+        nums = [int(t) for t in (n.text.strip() for n in col.find_all('strong', class_='lotto__number')) if t.isdigit()]
+        if nums:
+            _assign(data, header.text.strip(), nums)
+    return _complete(data)
+
+def extract_prizes(content):
+    """ ลองทางเร็วก่อน ถ้าไม่ครบ (หน้าเปลี่ยนรูปแบบ) ค่อยใช้ BeautifulSoup """
+    return extract_prizes_fast(content) or extract_prizes_soup(content)
+
+def format_prizes(prizes):
+    """ แปลงเลข int กลับเป็นข้อความแบบในชีท (เติม 0 ข้างหน้า, list เป็น "['123', '456']") """
+    row = {}
+    for key, value in prizes.items():
+        width = PRIZE_WIDTHS[key]
+        if isinstance(value, list):
+            row[key] = str([f"{v:0{width}d}" for v in value])
+        else:
+            row[key] = f"{value:0{width}d}"
+    return row
@@ -0,0 +1,99 @@
+# services/metrics.py
+"""
+วัดเวลาแบบเบาๆ (span) + ตัวนับ แล้วส่งออกเป็นรูปแบบ Prometheus (/metrics)
+    with span('sheets_open'):
+        ...
+"""
+import time
+import threading
+from contextlib import contextmanager
+
+# ขอบ bucket ของ histogram (วินาที)
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+class Registry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.histograms = {}        # (name, labels) -> {'buckets': [...], 'sum': float, 'count': int}
+        self.counters = {}          # (name, labels) -> int
+
+    def observe(self, name, seconds, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            h = self.histograms.get(key)
+            if h is None:
+                h = self.histograms[key] = {'buckets': [0] * len(BUCKETS), 'sum': 0.0, 'count': 0}
+            for i, edge in enumerate(BUCKETS):
+                if seconds <= edge:
+                    h['buckets'][i] += 1
+            h['sum'] += seconds
+            h['count'] += 1
+
+    def inc(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def summary(self):
+        """ {ชื่อ span: {'count', 'total', 'avg'}} (รวมทุก label) สำหรับพิมพ์สรุป """
+        out = {}
+        with self.lock:
+            for (name, labels), h in self.histograms.items():
+                label = name + "".join(f"[{v}]" for k, v in labels if k != 'status')
+                s = out.setdefault(label, {'count': 0, 'total': 0.0})
+                s['count'] += h['count']
+                s['total'] += h['sum']
+        for s in out.values():
+            s['avg'] = s['total'] / s['count'] if s['count'] else 0.0
+        return out
+
+    def reset(self):
+        with self.lock:
+            self.histograms.clear()
+            self.counters.clear()
+
+    def render_prometheus(self, prefix='lotto'):
+        def fmt_labels(labels, extra=()):
+            items = list(labels) + list(extra)
+            if not items: return ""
+            return "{" + ",".join(f'{k}="{str(v).replace(chr(34), "")}"' for k, v in items) + "}"
+
+        lines = []
+        with self.lock:
+            names = sorted({n for n, _ in self.histograms})
+            for name in names:
+                metric = f"{prefix}_{name}_seconds"
+                lines.append(f"# TYPE {metric} histogram")
+                for (n, labels), h in sorted(self.histograms.items()):
+                    if n != name: continue
+                    for edge, count in zip(BUCKETS, h['buckets']):
+                        lines.append(f"{metric}_bucket{fmt_labels(labels, [('le', edge)])} {count}")
+                    lines.append(f"{metric}_bucket{fmt_labels(labels, [('le', '+Inf')])} {h['count']}")
+                    lines.append(f"{metric}_sum{fmt_labels(labels)} {h['sum']:.6f}")
+                    lines.append(f"{metric}_count{fmt_labels(labels)} {h['count']}")
+            names = sorted({n for n, _ in self.counters})
+            for name in names:
+                metric = f"{prefix}_{name}_total"
+                lines.append(f"# TYPE {metric} counter")
+                for (n, labels), value in sorted(self.counters.items()):
+                    if n == name:
+                        lines.append(f"{metric}{fmt_labels(labels)} {value}")
+        return "\n".join(lines) + "\n"
+
+registry = Registry()
+
+@contextmanager
+def span(name, **labels):
+    """ จับเวลาบล็อกโค้ด บันทึกเป็น histogram พร้อม status=ok/error """
+    started = time.perf_counter()
+    status = 'ok'
+    try:
+        yield
+    except Exception:
+        status = 'error'
+        raise
+    finally:
+        registry.observe(name, time.perf_counter() - started, status=status, **labels)
+
+def count(name, value=1, **labels):
+    registry.inc(name, value, **labels)
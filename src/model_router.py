@@ -0,0 +1,87 @@
+# services/model_router.py
+"""
+เลือกโมเดล Gemini อัตโนมัติ
+- สร้าง GenerativeModel ครั้งเดียวต่อโมเดล แล้วใช้ซ้ำ
+- จำว่าโมเดลไหนโดน 429 / โควต้าหมด แล้วพักไว้ (cooldown) ไม่ยิงซ้ำให้เสียเวลา
+- เรียงลำดับตามอัตราสำเร็จ และ latency ที่วัดได้จริง
+"""
+import re
+import time
+import threading
+from src.metrics import span, count
+
+DEFAULT_COOLDOWN = 60          # วินาที (429 ทั่วไป)
+DAILY_QUOTA_COOLDOWN = 3600    # โควต้ารายวันหมด
+NOT_FOUND_COOLDOWN = 6 * 3600  # ชื่อโมเดลใช้ไม่ได้
+ERROR_COOLDOWN = 10            # error อื่นๆ
+
+class ModelRouter:
+    def __init__(self, genai, model_names, system_instruction):
+        self.genai = genai
+        self.model_names = list(model_names)       # ลำดับความชอบเริ่มต้น
+        self.system_instruction = system_instruction
+        self.lock = threading.Lock()
+        self.models = {}
+        self.state = {name: {'ok': 0, 'fail': 0, 'latency': None, 'cooldown_until': 0.0, 'last_error': ''}
+                      for name in self.model_names}
+
+    def get_model(self, name):
+        with self.lock:
+            if name not in self.models:
+                self.models[name] = self.genai.GenerativeModel(model_name=name, system_instruction=self.system_instruction)
+            return self.models[name]
+
+    def _score(self, name):
+        s = self.state[name]
+        success_rate = (s['ok'] + 1) / (s['ok'] + s['fail'] + 2)
+        latency = s['latency'] if s['latency'] is not None else 0.0
+        return (-round(success_rate, 1), latency, self.model_names.index(name))
+
+    def candidates(self):
+        """ โมเดลที่พร้อมใช้ เรียงจากน่าจะสำเร็จ/เร็วที่สุด (ถ้าพักหมดทุกตัว ให้ลองตัวที่ใกล้หายพักสุด) """
+        now = time.monotonic()
+        with self.lock:
+            ready = [n for n in self.model_names if self.state[n]['cooldown_until'] <= now]
+            if ready:
+                return sorted(ready, key=self._score)
+            return sorted(self.model_names, key=lambda n: self.state[n]['cooldown_until'])
+
+    def record_success(self, name, latency):
+        with self.lock:
+            s = self.state[name]
+            s['ok'] += 1
+            s['cooldown_until'] = 0.0
+            s['latency'] = latency if s['latency'] is None else 0.7 * s['latency'] + 0.3 * latency
+
+    def record_failure(self, name, error):
+        text = str(error)
+        if '429' in text or 'quota' in text.lower() or 'exhausted' in text.lower():
+            cooldown = DAILY_QUOTA_COOLDOWN if 'PerDay' in text or 'per day' in text.lower() else DEFAULT_COOLDOWN
+            retry = re.search(r'retry(?:_delay)?[^\d]{0,20}(\d+)', text, re.IGNORECASE)
+            if retry and cooldown == DEFAULT_COOLDOWN:
+                cooldown = max(int(retry.group(1)), 1)
+        elif '404' in text or 'not found' in text.lower():
+            cooldown = NOT_FOUND_COOLDOWN
+        else:
+            cooldown = ERROR_COOLDOWN
+        with self.lock:
+            s = self.state[name]
+            s['fail'] += 1
+            s['last_error'] = text
+            s['cooldown_until'] = time.monotonic() + cooldown
+
+    def generate(self, contents):
+        """ คืน (response, ชื่อโมเดลที่ใช้, error ล่าสุด) """
+        last_error = ""
+        for name in self.candidates():
+            started = time.monotonic()
+            try:
+                with span('gemini_attempt', model=name):
+                    response = self.get_model(name).generate_content(contents)
+                self.record_success(name, time.monotonic() - started)
+                return response, name, last_error
+            except Exception as e:
+                last_error = str(e)
+                self.record_failure(name, e)
+        count('gemini_all_models_failed')
+        return None, "", last_error
@@ -0,0 +1,77 @@
+# services/monthly_summary.py
+"""
+ยอดสรุปรายเดือน (รายรับ / รายจ่าย / คงเหลือ / แยกหมวดหมู่) เก็บไว้ในหน่วยความจำ
+โหลดจาก Tab 'Summary' ครั้งแรก แล้วอัปเดตทีละรายการตอนบันทึกบัญชี
+"""
+import json
+import hashlib
+import threading
+from datetime import datetime, timezone
+
+INCOME_TYPE = 'รายรับ'
+
+def month_sort_key(month_str):
+    """ 'MM/YYYY' -> (YYYY, MM) สำหรับเรียงเดือน """
+    try:
+        m, y = str(month_str).split('/')
+        return int(y), int(m)
+    except ValueError:
+        return 0, 0
+
+class MonthlyAggregate:
+    def __init__(self):
+        self.months = {}                # 'MM/YYYY' -> {'income', 'expense', 'categories': {หมวด: ยอด}}
+        self.lock = threading.Lock()
+        self.last_modified = datetime.now(timezone.utc).replace(microsecond=0)
+
+    @classmethod
+    def from_records(cls, records):
+        """ สร้างจากผล get_all_records() ของ Tab Summary """
+        agg = cls()
+        for r in records:
+            try:
+                agg._add(str(r['Month']), r['Type'], r['Category'], float(str(r['Amount']).replace(',', '')))
+            except (KeyError, ValueError):
+                continue
+        return agg
+
+    def _add(self, month, type_, category, amount):
+        m = self.months.setdefault(month, {'income': 0.0, 'expense': 0.0, 'categories': {}})
+        if type_ == INCOME_TYPE:
+            m['income'] += amount
+        else:
+            m['expense'] += amount
+            m['categories'][category] = m['categories'].get(category, 0) + amount
+
+    def apply(self, changes):
+        """ changes: {(Month, Type, Category): ยอดที่บวกเพิ่ม} (แบบเดียวกับที่เขียนลงชีท) """
+        with self.lock:
+            for (month, type_, category), amount in changes.items():
+                self._add(month, type_, category, float(amount))
+            self.last_modified = datetime.now(timezone.utc).replace(microsecond=0)
+
+    def month_view(self, month):
+        """ ข้อมูลรูปแบบเดียวกับที่หน้า dashboard ใช้ """
+        with self.lock:
+            m = self.months.get(month, {'income': 0.0, 'expense': 0.0, 'categories': {}})
+            return {
+                "month": month,
+                "income": m['income'],
+                "expense": m['expense'],
+                "balance": m['income'] - m['expense'],
+                "chart_labels": list(m['categories'].keys()),
+                "chart_data": list(m['categories'].values()),
+            }
+
+    def recent_months(self, count, until=None):
+        """ รายชื่อเดือนล่าสุด count เดือน (เรียงเก่า -> ใหม่) ไม่เกินเดือน until """
+        with self.lock:
+            months = sorted(self.months, key=month_sort_key)
+        if until:
+            months = [m for m in months if month_sort_key(m) <= month_sort_key(until)]
+        return months[-count:] if count > 0 else []
+
+def etag_for(data):
+    """ ETag จากเนื้อหา (เหมือนกันทุก worker ถ้าข้อมูลเหมือนกัน) """
+    raw = json.dumps(data, sort_keys=True, ensure_ascii=False).encode('utf-8')
+    return hashlib.md5(raw).hexdigest()
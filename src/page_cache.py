@@ -0,0 +1,143 @@
+# services/page_cache.py
+"""
+แคชไฟล์ดิบที่ดึงจากเว็บ (CSV จาก GitHub, หน้าผลหวยของ sanook) ลงดิสก์
+
+โครงสร้าง (content-addressed: เนื้อหาเหมือนกันเก็บไฟล์เดียว)
+    <PAGE_CACHE_PATH>/objects/ab/abcdef...   เนื้อหา (ชื่อไฟล์ = sha256 ของเนื้อหา)
+    <PAGE_CACHE_PATH>/index/<sha256(url)>.json   {url, sha256, etag, last_modified, fetched_at}
+
+ดึงซ้ำจะส่ง If-None-Match / If-Modified-Since ถ้าเว็บตอบ 304 ก็ใช้ของในแคช
+"""
+import os
+import json
+import hashlib
+import threading
+from datetime import datetime
+from src.http_session import get_session
+from src.metrics import count
+
+PAGE_CACHE_PATH = os.getenv('PAGE_CACHE_PATH', 'data/page_cache')
+
+class CacheMiss(Exception):
+    """ โหมด offline แต่ไม่มีไฟล์ในแคช """
+
+def _sha256(data):
+    return hashlib.sha256(data).hexdigest()
+
+def _write_atomic(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp, 'wb') as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+class PageCache:
+    def __init__(self, path=PAGE_CACHE_PATH):
+        self.path = path
+
+    def _index_path(self, url):
+        return os.path.join(self.path, 'index', f"{_sha256(url.encode('utf-8'))}.json")
+
+    def _object_path(self, digest):
+        return os.path.join(self.path, 'objects', digest[:2], digest)
+
+    def entry(self, url):
+        """ ข้อมูลกำกับของ url (None ถ้ายังไม่เคยเก็บ) """
+        try:
+            with open(self._index_path(url), encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _read_object(self, entry):
+        try:
+            with open(self._object_path(entry['sha256']), 'rb') as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def get(self, url):
+        """ เนื้อหาที่เก็บไว้ของ url (None ถ้าไม่มี) """
+        entry = self.entry(url)
+        return self._read_object(entry) if entry else None
+
+    def put(self, url, content, headers=None):
+        headers = headers or {}
+        digest = _sha256(content)
+        obj = self._object_path(digest)
+        if not os.path.exists(obj):
+            _write_atomic(obj, content)
+        entry = {
+            'url': url,
+            'sha256': digest,
+            'etag': headers.get('ETag'),
+            'last_modified': headers.get('Last-Modified'),
+            'fetched_at': datetime.now().isoformat(timespec='seconds'),
+        }
+        _write_atomic(self._index_path(url), json.dumps(entry, ensure_ascii=False).encode('utf-8'))
+        return entry
+
+    def fetch(self, url, session=None, offline=False, **kwargs):
+        """
+        ดึง url ผ่านแคช คืน (content, source) โดย source เป็น 'cache' / 'not_modified' / 'network'
+        - offline=True: ใช้เฉพาะของในแคช (ไม่มีจะ raise CacheMiss)
+        - เว็บตอบ 304 -> ใช้ของในแคช, ตอบ 200 -> เก็บลงแคช
+        - ดึงไม่ได้ (network error / status อื่น) แต่มีของเก่า -> ใช้ของเก่า
+        """
+        entry = self.entry(url)
+        cached = self._read_object(entry) if entry else None
+        if offline:
+            if cached is None:
+                raise CacheMiss(url)
+            count('page_cache', result='hit')
+            return cached, 'cache'
+
+        headers = dict(kwargs.pop('headers', None) or {})
+        if cached is not None:
+            if entry.get('etag'): headers['If-None-Match'] = entry['etag']
+            if entry.get('last_modified'): headers['If-Modified-Since'] = entry['last_modified']
+        try:
+            resp = (session or get_session()).get(url, headers=headers, **kwargs)
+        except Exception:
+            if cached is None:
+                raise
+            count('page_cache', result='stale')
+            return cached, 'cache'
+
+        if resp.status_code == 304 and cached is not None:
+            count('page_cache', result='not_modified')
+            return cached, 'not_modified'
+        if resp.status_code == 200:
+            self.put(url, resp.content, resp.headers)
+            count('page_cache', result='miss')
+            return resp.content, 'network'
+        if cached is not None:
+            count('page_cache', result='stale')
+            return cached, 'cache'
+        resp.raise_for_status()
+        raise CacheMiss(f"{url} -> HTTP {resp.status_code}")
+
+    def urls(self, prefix=''):
+        """ url ทั้งหมดในแคชที่ขึ้นต้นด้วย prefix """
+        index_dir = os.path.join(self.path, 'index')
+        if not os.path.isdir(index_dir):
+            return []
+        out = []
+        for name in os.listdir(index_dir):
+            if not name.endswith('.json'): continue
+            try:
+                with open(os.path.join(index_dir, name), encoding='utf-8') as f:
+                    url = json.load(f)['url']
+            except (OSError, ValueError, KeyError):
+                continue
+            if url.startswith(prefix):
+                out.append(url)
+        return sorted(out)
+
+_page_cache = None
+
+def get_page_cache():
+    global _page_cache
+    if _page_cache is None:
+        _page_cache = PageCache()
+    return _page_cache
@@ -0,0 +1,52 @@
+# services/response_cache.py
+"""
+แคชคำตอบของบอท (LRU + TTL + ล้างตาม tag)
+เช่น tag 'summary' ล้างเมื่อมีการบันทึกบัญชี, 'prediction' ล้างเมื่อมีงวดใหม่
+"""
+import time
+import threading
+from collections import OrderedDict
+
+class ResponseCache:
+    def __init__(self, maxsize=256):
+        self.maxsize = maxsize
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()        # key -> (value, expires_at, tag)
+        self.stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'invalidations': 0}
+
+    def get(self, key):
+        """ คืนค่าที่แคชไว้ หรือ None ถ้าไม่มี/หมดอายุ """
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or (entry[1] is not None and entry[1] < time.monotonic()):
+                if entry is not None:
+                    del self.entries[key]
+                self.stats['misses'] += 1
+                return None
+            self.entries.move_to_end(key)
+            self.stats['hits'] += 1
+            return entry[0]
+
+    def set(self, key, value, ttl=None, tag=None):
+        with self.lock:
+            expires_at = time.monotonic() + ttl if ttl else None
+            self.entries[key] = (value, expires_at, tag)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+                self.stats['evictions'] += 1
+
+    def invalidate(self, tag):
+        """ ลบทุก entry ที่มี tag นี้ """
+        with self.lock:
+            stale = [k for k, (_, _, t) in self.entries.items() if t == tag]
+            for k in stale:
+                del self.entries[k]
+            self.stats['invalidations'] += len(stale)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+# ใช้ร่วมกันทั้งโปรเซส
+response_cache = ResponseCache()
@@ -0,0 +1,162 @@
+# services/shared_draws.py
+"""
+ชุดข้อมูลผลหวยที่ใช้ร่วมกันทุก worker ของ gunicorn (memory-map ไฟล์เดียวกัน ไม่ copy)
+
+    <SHARED_DRAWS_PATH>/v<version>/*.npy + stats.npz   ข้อมูลแต่ละรุ่น (เขียนเสร็จแล้วไม่แก้อีก)
+    <SHARED_DRAWS_PATH>/CURRENT                         ชี้ว่ารุ่นไหนใช้อยู่ (เปลี่ยนด้วย os.replace ทีเดียว)
+    <SHARED_DRAWS_PATH>/.lock                           flock: มีคนโหลด/refresh จากแหล่งข้อมูลได้ทีละคน
+
+ค่าเริ่มต้นอยู่ใน /dev/shm (tmpfs = หน่วยความจำร่วมจริงๆ) ถ้าไม่มีก็ใช้ temp dir
+worker อ่านผ่าน np.load(mmap_mode='r') ทุกตัวใช้ page เดียวกันใน page cache
+"""
+import os
+import json
+import time
+import shutil
+import tempfile
+import threading
+import numpy as np
+try:
+    import fcntl
+except ImportError:      # Windows (รันเครื่องเดียว worker เดียว ไม่ต้อง lock)
+    fcntl = None
+from src.draw_store import COLUMNS, save_arrays
+from src.draw_stats import DrawStatsIndex
+
+SHARED_DRAWS_PATH = os.getenv('SHARED_DRAWS_PATH') or os.path.join(
+    '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir(), 'lotto-shared-draws')
+SOURCE_CHECK_INTERVAL = int(os.getenv('SHARED_DRAWS_CHECK_INTERVAL', '300'))   # วินาที (ถามแหล่งข้อมูลว่าเปลี่ยนไหม)
+KEEP_VERSIONS = 3   # เก็บรุ่นเก่าไว้เผื่อ worker ที่ยังอ่านอยู่
+
+POINTER_FILE = 'CURRENT'
+LOCK_FILE = '.lock'
+
+def _write_json_atomic(path, data):
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(data, f)
+    os.replace(tmp, path)
+
+class SharedDraws:
+    def __init__(self, path=SHARED_DRAWS_PATH):
+        self.path = path
+        self._pointer = None
+        self._pointer_mtime = None
+        self._mapped = {}           # version -> (arrays, stats)
+        self._lock = threading.Lock()
+
+    # --- ฝั่งอ่าน (ทุก worker) ---
+    def pointer(self):
+        """ ข้อมูลรุ่นปัจจุบัน {'version', 'source_version', 'checked_at', ...} หรือ None ถ้ายังไม่มีใคร publish """
+        path = os.path.join(self.path, POINTER_FILE)
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            return None
+        if mtime != self._pointer_mtime:
+            try:
+                with open(path, encoding='utf-8') as f:
+                    self._pointer = json.load(f)
+                self._pointer_mtime = mtime
+            except (OSError, ValueError):
+                return self._pointer
+        return self._pointer
+
+    def version(self):
+        pointer = self.pointer()
+        return pointer['version'] if pointer else None
+
+    def _open(self, version):
+        with self._lock:
+            if version not in self._mapped:
+                vdir = os.path.join(self.path, f"v{version}")
+                arrays = {name: np.load(os.path.join(vdir, f"{name}.npy"), mmap_mode='r') for name in COLUMNS}
+                stats = DrawStatsIndex.load(vdir)
+                # เก็บแค่รุ่นล่าสุด (รุ่นเก่าปล่อยให้ GC ปิด mmap เอง)
+                self._mapped = {version: (arrays, stats)}
+            return self._mapped[version]
+
+    def current(self):
+        """ (arrays, stats) ของรุ่นปัจจุบัน หรือ None; arrays เป็น memory-map แบบอ่านอย่างเดียว """
+        version = self.version()
+        if version is None:
+            return None
+        try:
+            return self._open(version)
+        except OSError:
+            # รุ่นที่ชี้อยู่ถูกลบไปแล้ว (CURRENT เปลี่ยนระหว่างทาง) อ่าน CURRENT ใหม่อีกรอบ
+            self._pointer_mtime = None
+            return self._open(self.version())
+
+    def arrays(self):
+        current = self.current()
+        return current[0] if current else None
+
+    def stats(self):
+        current = self.current()
+        return current[1] if current else None
+
+    # --- ฝั่งเขียน (ทีละคน ผ่าน flock) ---
+    def _locked(self, blocking=True):
+        os.makedirs(self.path, exist_ok=True)
+        f = open(os.path.join(self.path, LOCK_FILE), 'w')
+        if fcntl is None:
+            return f
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+        except BlockingIOError:
+            f.close()
+            return None
+        return f
+
+    def publish(self, arrays, source_version=None):
+        """ เขียนรุ่นใหม่ให้ครบก่อน แล้วค่อยสลับ CURRENT ทีเดียว (คนอ่านเห็นรุ่นเก่าหรือรุ่นใหม่ครบๆ เท่านั้น) """
+        version = f"{time.time_ns()}-{os.getpid()}"
+        tmp = os.path.join(self.path, f".v{version}.tmp")
+        os.makedirs(tmp, exist_ok=True)
+        save_arrays(arrays, tmp)
+        DrawStatsIndex.from_arrays(arrays).save(tmp)
+        os.rename(tmp, os.path.join(self.path, f"v{version}"))
+        pointer = {'version': version, 'source_version': source_version,
+                   'rows': int(len(arrays['dates'])), 'published_at': time.time(), 'checked_at': time.time()}
+        _write_json_atomic(os.path.join(self.path, POINTER_FILE), pointer)
+        self._prune(keep=version)
+        return pointer
+
+    def _prune(self, keep):
+        versions = sorted((d for d in os.listdir(self.path) if d.startswith('v') and d != f"v{keep}"), reverse=True)
+        for d in versions[KEEP_VERSIONS - 1:]:
+            shutil.rmtree(os.path.join(self.path, d), ignore_errors=True)
+
+    def refresh(self, load_source, source_version_fn, force=False):
+        """
+        refresher ตัวเดียว: ถ้าไม่มีใครเช็คแหล่งข้อมูลมาสักพัก ให้คนที่ได้ lock เช็ค version
+        แล้วโหลด + publish ใหม่เมื่อข้อมูลเปลี่ยน (คนอื่นข้ามไปเลย ไม่รอ)
+        """
+        pointer = self.pointer()
+        if pointer and not force and time.time() - pointer.get('checked_at', 0) < SOURCE_CHECK_INTERVAL:
+            return False
+        # ยังไม่มีข้อมูลเลย: รอคนที่กำลังโหลดอยู่ (ไม่โหลดซ้ำ) / มีแล้ว: ใครได้ lock ก่อนคนนั้นเช็ค
+        lock = self._locked(blocking=pointer is None)
+        if lock is None:
+            return False
+        try:
+            pointer = self.pointer()
+            if pointer and not force and time.time() - pointer.get('checked_at', 0) < SOURCE_CHECK_INTERVAL:
+                return False
+            source_version = source_version_fn()
+            if pointer and not force and source_version == pointer.get('source_version'):
+                _write_json_atomic(os.path.join(self.path, POINTER_FILE), dict(pointer, checked_at=time.time()))
+                return False
+            self.publish(load_source(), source_version)
+            return True
+        finally:
+            lock.close()
+
+_shared = None
+
+def get_shared_draws():
+    global _shared
+    if _shared is None:
+        _shared = SharedDraws()
+    return _shared
@@ -0,0 +1,400 @@
+# services/storage.py
+"""
+ชั้นเก็บข้อมูลกลาง: ผลหวย (draws), บัญชี (Accounting) และสรุปยอด (Summary)
+- GoogleSheetsStorage: ของจริงบน Google Sheets
+- SQLiteStorage: ไฟล์ในเครื่อง (ใช้ offline / benchmark / อ่านเร็ว)
+- MirrorStorage: อ่านจากตัวหลัก เขียนลงทุกตัว
+
+เลือกด้วย STORAGE_BACKEND = sheets | sqlite | sqlite+sheets
+"""
+import os
+import re
+import json
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+import pandas as pd
+from src.metrics import span
+
+SPREADSHEET_NAME = 'LotteryData'
+DEFAULT_CREDENTIALS_PATH = 'core/credentials.json'
+SQLITE_PATH = os.getenv('STORAGE_SQLITE_PATH', 'data/lottery.db')
+
+DRAW_COLUMNS = ['date', 'first_prize', 'last_two_digits', 'prize_pre_3digit', 'prize_suf_3digit']
+SUMMARY_COLUMNS = ['Month', 'Type', 'Category', 'Amount']
+
+class StorageError(Exception):
+    pass
+
+def _to_float(value):
+    return float(str(value).replace(',', '') or 0)
+
+class Storage(ABC):
+    """ interface กลาง (ทุก backend ต้องมีเมธอดเหล่านี้) """
+    # --- ผลหวย ---
+    @abstractmethod
+    def read_draws(self):
+        """ DataFrame คอลัมน์แบบในชีท เรียงใหม่ -> เก่า """
+
+    @abstractmethod
+    def latest_draw_date(self):
+        """ วันที่งวดล่าสุด (None ถ้ายังไม่มีข้อมูล) """
+
+    @abstractmethod
+    def write_draws(self, df):
+        """ เขียนทับทั้งหมด """
+
+    @abstractmethod
+    def append_draws(self, df):
+        """ เพิ่มเฉพาะงวดใหม่ """
+
+    # --- บัญชี ---
+    @abstractmethod
+    def append_transactions(self, rows):
+        """ rows: [[วันเวลา, type, category, amount, note, tx_id], ...] """
+
+    @abstractmethod
+    def read_summary(self):
+        """ list ของ dict {'Month', 'Type', 'Category', 'Amount'} """
+
+    @abstractmethod
+    def add_to_summary(self, changes):
+        """ changes: {(Month, Type, Category): ยอดที่บวกเพิ่ม} """
+
+    @abstractmethod
+    def data_version(self):
+        """ ค่าที่เปลี่ยนเมื่อข้อมูลผลหวยเปลี่ยน (ใช้กับแคช) """
+
+# --- Google Sheets ---
+SPREADSHEET_ID = os.getenv('SPREADSHEET_ID')      # ถ้าตั้งไว้ จะเปิดด้วย key เลย ไม่ต้องค้นชื่อผ่าน Drive
+
+_clients = {}                                     # แหล่ง credentials -> gspread client
+_clients_lock = threading.Lock()
+
+def _authorize(credentials_path=None):
+    import gspread
+    from google.oauth2.service_account import Credentials
+
+    scopes = ["https://www.googleapis.com/auth/spreadsheets", "https://www.googleapis.com/auth/drive"]
+    try:
+        with span('sheets_auth'):
+            if os.getenv('GOOGLE_CREDENTIALS_JSON') and not credentials_path:
+                creds_dict = json.loads(os.getenv('GOOGLE_CREDENTIALS_JSON'))
+                creds = Credentials.from_service_account_info(creds_dict, scopes=scopes)
+            else:
+                creds = Credentials.from_service_account_file(credentials_path or DEFAULT_CREDENTIALS_PATH, scopes=scopes)
+            return gspread.authorize(creds)
+    except Exception as e:
+        raise StorageError(f"Auth Error: {str(e)}")
+
+def get_google_client(credentials_path=None):
+    """
+    gspread client ตัวเดียวต่อแหล่ง credentials (auth ครั้งเดียวทั้งโปรเซส)
+    อ่านจาก GOOGLE_CREDENTIALS_JSON ก่อน ถ้าไม่มีใช้ไฟล์ในเครื่อง
+    token ต่ออายุเองอัตโนมัติเมื่อหมดอายุ (google-auth refresh ตอนเรียก API)
+    """
+    key = credentials_path or ('env' if os.getenv('GOOGLE_CREDENTIALS_JSON') else DEFAULT_CREDENTIALS_PATH)
+    client = _clients.get(key)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(key)
+            if client is None:
+                client = _clients[key] = _authorize(credentials_path)
+    return client
+
+class GoogleSheetsStorage(Storage):
+    def __init__(self, credentials_path=None, spreadsheet_name=SPREADSHEET_NAME, spreadsheet_id=None):
+        self.credentials_path = credentials_path
+        self.spreadsheet_name = spreadsheet_name
+        self.spreadsheet_id = spreadsheet_id or (SPREADSHEET_ID if spreadsheet_name == SPREADSHEET_NAME else None)
+        self._spreadsheet = None
+        self._worksheets = {}             # title -> worksheet handle
+        self._handles_lock = threading.Lock()
+        self._summary_index = {}          # (Month, Type, Category) -> เลขแถวในชีท Summary
+        self._summary_lock = threading.Lock()
+
+    def spreadsheet(self):
+        """ เปิดไฟล์ครั้งแรกครั้งเดียว (ค้นชื่อครั้งแรก แล้วจำ key ไว้) """
+        if self._spreadsheet is not None:
+            return self._spreadsheet
+        with self._handles_lock:
+            if self._spreadsheet is None:
+                client = get_google_client(self.credentials_path)
+                try:
+                    with span('sheets_open'):
+                        if self.spreadsheet_id:
+                            self._spreadsheet = client.open_by_key(self.spreadsheet_id)
+                        else:
+                            self._spreadsheet = client.open(self.spreadsheet_name)
+                            self.spreadsheet_id = self._spreadsheet.id
+                except Exception:
+                    raise StorageError(f"หาไฟล์ '{self.spreadsheet_name}' ไม่เจอ")
+        return self._spreadsheet
+
+    def worksheet(self, title=None):
+        """ title=None คือชีทแรก (ผลหวย) handle ถูกแคชไว้ ไม่ต้องถาม API ซ้ำ """
+        sheet = self._worksheets.get(title)
+        if sheet is not None:
+            return sheet
+        spreadsheet = self.spreadsheet()
+        with self._handles_lock:
+            if title not in self._worksheets:
+                try:
+                    with span('sheets_worksheet'):
+                        self._worksheets[title] = spreadsheet.sheet1 if title is None else spreadsheet.worksheet(title)
+                except Exception:
+                    raise StorageError(f"ไม่พบ Tab '{title or 'sheet1'}'")
+            return self._worksheets[title]
+
+    # --- ผลหวย ---
+    def _get_all_records(self, title=None):
+        sheet = self.worksheet(title)
+        with span('sheets_get_all_records', tab=title or 'draws'):
+            return sheet.get_all_records()
+
+    def read_draws(self):
+        return pd.DataFrame(self._get_all_records())
+
+    def latest_draw_date(self):
+        # ชีทเรียงใหม่ -> เก่า แถวที่ 2 คืองวดล่าสุด
+        sheet = self.worksheet()
+        header = sheet.row_values(1)
+        if 'date' not in header: return None
+        value = sheet.cell(2, header.index('date') + 1).value
+        return pd.to_datetime(value) if value else None
+
+    def write_draws(self, df):
+        sheet = self.worksheet()
+        sheet.clear()
+        sheet.update(range_name='A1', values=[df.columns.tolist()] + df.values.tolist())
+
+    def append_draws(self, df):
+        # แทรกไว้บนสุด (ต่อจาก header) ให้ชีทยังเรียงใหม่ -> เก่า
+        sheet = self.worksheet()
+        header = sheet.row_values(1)
+        rows = df.reindex(columns=header).fillna('-').values.tolist() if header else df.values.tolist()
+        sheet.insert_rows(rows, row=2)
+
+    def data_version(self):
+        # lastUpdateTime ถาม Drive API ทุกครั้ง (ได้ค่าล่าสุดเสมอ)
+        return self.spreadsheet().get_lastUpdateTime()
+
+    # --- บัญชี ---
+    def append_transactions(self, rows):
+        sheet = self.worksheet('Accounting')
+        with span('sheets_write', tab='Accounting'):
+            sheet.append_rows(rows)
+
+    def read_summary(self):
+        return self._get_all_records('Summary')
+
+    def _load_summary_index(self, sheet):
+        index = {}
+        with span('sheets_get_all_records', tab='Summary'):
+            records = sheet.get_all_records()
+        for i, row in enumerate(records):
+            index[(str(row['Month']), row['Type'], row['Category'])] = i + 2
+        return index
+
+    @staticmethod
+    def _first_row_of(update_response):
+        """ เลขแถวแรกจากผล append_rows (เช่น 'Summary!A12:D13' -> 12) """
+        try:
+            rng = update_response['updates']['updatedRange'].split('!')[-1]
+            return int(re.search(r'\d+', rng).group())
+        except Exception:
+            return None
+
+    def add_to_summary(self, changes, sheet=None):
+        """
+        อ่านเฉพาะแถวที่เกี่ยวข้องด้วย batch_get ครั้งเดียว แล้ว batch_update ครั้งเดียว
+        แถวที่ยังไม่มีจะ append_rows รวดเดียว (หาแถวจาก index ที่แคชไว้ ไม่ต้องสแกนทั้งชีท)
+        """
+        sheet = sheet or self.worksheet('Summary')
+        with self._summary_lock, span('sheets_write', tab='Summary'):
+            try:
+                self._apply_summary_changes(sheet, changes)
+            except Exception:
+                self._summary_index = {}
+                raise
+
+    def _apply_summary_changes(self, sheet, changes):
+        if not self._summary_index:
+            self._summary_index = self._load_summary_index(sheet)
+
+        def read_rows(keys):
+            if not keys: return []
+            ranges = [f"A{self._summary_index[k]}:D{self._summary_index[k]}" for k in keys]
+            return [r[0] if r else [] for r in sheet.batch_get(ranges)]
+
+        def add_to_rows(keys, rows):
+            updates = [{'range': f"D{self._summary_index[k]}", 'values': [[_to_float(r[3] if len(r) > 3 else 0) + changes[k]]]}
+                       for r, k in zip(rows, keys)]
+            if updates:
+                sheet.batch_update(updates)
+
+        known = [k for k in changes if k in self._summary_index]
+        rows = read_rows(known)
+        # แถวเลื่อน (มีคนแก้ชีทเอง) -> สร้าง index ใหม่แล้วอ่านใหม่
+        if any(len(r) < 4 or (str(r[0]), r[1], r[2]) != k for r, k in zip(rows, known)):
+            self._summary_index = self._load_summary_index(sheet)
+            known = [k for k in changes if k in self._summary_index]
+            rows = read_rows(known)
+        add_to_rows(known, rows)
+
+        new_keys = [k for k in changes if k not in known]
+        if new_keys:
+            # index แคชไว้ต่อโปรเซส: worker อื่นอาจเพิ่มแถวนี้ไปแล้ว โหลดใหม่ก่อน append ไม่งั้นได้แถวซ้ำ
+            self._summary_index = self._load_summary_index(sheet)
+            added = [k for k in new_keys if k in self._summary_index]
+            add_to_rows(added, read_rows(added))
+            new_keys = [k for k in new_keys if k not in self._summary_index]
+        if new_keys:
+            res = sheet.append_rows([[m, t, c, float(changes[(m, t, c)])] for m, t, c in new_keys])
+            first = self._first_row_of(res)
+            if first:
+                for offset, k in enumerate(new_keys):
+                    self._summary_index[k] = first + offset
+            else:
+                self._summary_index = {}   # ไม่รู้ตำแหน่งแถว ให้โหลดใหม่ครั้งหน้า
+
+# --- SQLite ---
+class SQLiteStorage(Storage):
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS draws (
+            date TEXT PRIMARY KEY,
+            first_prize TEXT,
+            last_two_digits TEXT,
+            prize_pre_3digit TEXT,
+            prize_suf_3digit TEXT
+        );
+        CREATE TABLE IF NOT EXISTS accounting (
+            timestamp TEXT, type TEXT, category TEXT, amount REAL, note TEXT, tx_id TEXT PRIMARY KEY
+        );
+        CREATE TABLE IF NOT EXISTS summary (
+            month TEXT, type TEXT, category TEXT, amount REAL NOT NULL DEFAULT 0,
+            PRIMARY KEY (month, type, category)
+        );
+        CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+    """
+
+    def __init__(self, path=SQLITE_PATH):
+        self.path = path
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        if path != ':memory:' and os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.conn().executescript(self.SCHEMA)
+
+    def conn(self):
+        # 1 connection ต่อ thread (sqlite3 ห้ามใช้ connection ข้าม thread)
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            if self.path != ':memory:':
+                conn.execute('PRAGMA journal_mode=WAL')
+            self._local.conn = conn
+        return conn
+
+    def _bump_version(self, conn):
+        conn.execute("INSERT INTO meta(key, value) VALUES('draws_version', '1') "
+                     "ON CONFLICT(key) DO UPDATE SET value = CAST(value AS INTEGER) + 1")
+
+    @staticmethod
+    def _draw_rows(df):
+        df = df.reindex(columns=DRAW_COLUMNS).copy()
+        df['date'] = pd.to_datetime(df['date']).dt.strftime('%Y-%m-%d')
+        return [tuple(str(v) for v in row) for row in df.fillna('-').values.tolist()]
+
+    # --- ผลหวย ---
+    def read_draws(self):
+        return pd.read_sql_query(f"SELECT {', '.join(DRAW_COLUMNS)} FROM draws ORDER BY date DESC", self.conn())
+
+    def latest_draw_date(self):
+        row = self.conn().execute("SELECT MAX(date) FROM draws").fetchone()
+        return pd.to_datetime(row[0]) if row and row[0] else None
+
+    def write_draws(self, df):
+        with self._lock, self.conn() as conn:
+            conn.execute("DELETE FROM draws")
+            conn.executemany("INSERT OR REPLACE INTO draws VALUES (?, ?, ?, ?, ?)", self._draw_rows(df))
+            self._bump_version(conn)
+
+    def append_draws(self, df):
+        with self._lock, self.conn() as conn:
+            conn.executemany("INSERT OR REPLACE INTO draws VALUES (?, ?, ?, ?, ?)", self._draw_rows(df))
+            self._bump_version(conn)
+
+    def data_version(self):
+        row = self.conn().execute("SELECT value FROM meta WHERE key = 'draws_version'").fetchone()
+        return row[0] if row else None
+
+    # --- บัญชี ---
+    def append_transactions(self, rows):
+        with self._lock, self.conn() as conn:
+            conn.executemany("INSERT INTO accounting VALUES (?, ?, ?, ?, ?, ?)", [tuple(r) for r in rows])
+
+    def read_summary(self):
+        cur = self.conn().execute("SELECT month, type, category, amount FROM summary ORDER BY rowid")
+        return [dict(zip(SUMMARY_COLUMNS, row)) for row in cur.fetchall()]
+
+    def add_to_summary(self, changes):
+        with self._lock, self.conn() as conn:
+            conn.executemany(
+                "INSERT INTO summary(month, type, category, amount) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(month, type, category) DO UPDATE SET amount = amount + excluded.amount",
+                [(m, t, c, float(a)) for (m, t, c), a in changes.items()]
+            )
+
+# --- Mirror ---
+class MirrorStorage(Storage):
+    """ อ่านจาก primary (เร็ว) เขียนลง primary แล้วตามด้วย mirrors (เช่น Google Sheets) """
+    def __init__(self, primary, mirrors):
+        self.primary = primary
+        self.mirrors = list(mirrors)
+
+    def _write(self, method, *args):
+        result = getattr(self.primary, method)(*args)
+        for m in self.mirrors:
+            try:
+                getattr(m, method)(*args)
+            except Exception as e:
+                print(f"⚠️ Mirror {type(m).__name__}.{method} failed: {e}")
+        return result
+
+    def read_draws(self): return self.primary.read_draws()
+    def latest_draw_date(self): return self.primary.latest_draw_date()
+    def read_summary(self): return self.primary.read_summary()
+    def data_version(self): return self.primary.data_version()
+    def write_draws(self, df): return self._write('write_draws', df)
+    def append_draws(self, df): return self._write('append_draws', df)
+    def append_transactions(self, rows): return self._write('append_transactions', rows)
+    def add_to_summary(self, changes): return self._write('add_to_summary', changes)
+
+_storage = None
+_storage_lock = threading.Lock()
+
+def create_storage(backend=None, credentials_path=None):
+    backend = (backend or os.getenv('STORAGE_BACKEND', 'sheets')).lower()
+    if backend == 'sqlite':
+        return SQLiteStorage()
+    if backend in ('sqlite+sheets', 'mirror'):
+        return MirrorStorage(SQLiteStorage(), [GoogleSheetsStorage(credentials_path)])
+    if backend == 'sheets':
+        return GoogleSheetsStorage(credentials_path)
+    raise StorageError(f"Unknown STORAGE_BACKEND: {backend}")
+
+def get_storage():
+    """ storage ตัวเดียวทั้งโปรเซส ตาม STORAGE_BACKEND """
+    global _storage
+    if _storage is None:
+        with _storage_lock:
+            if _storage is None:
+                _storage = create_storage()
+    return _storage
+
+def set_storage(storage):
+    """ เปลี่ยน storage (เช่นตอน benchmark / รัน offline) """
+    global _storage
+    with _storage_lock:
+        _storage = storage
@@ -0,0 +1,61 @@
+# services/webhook_queue.py
+"""
+คิวงานเบื้องหลังสำหรับ webhook ของ LINE
+webhook ตรวจ signature แล้วโยนงานเข้าคิว ตอบ 200 ทันที ส่วน worker ค่อยประมวลผลแล้วตอบกลับ
+"""
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+class EventDispatcher:
+    def __init__(self, max_workers=4):
+        self.pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='line-worker')
+        self.lock = threading.Lock()
+        self.stats = {
+            'queued': 0, 'in_progress': 0, 'processed': 0, 'failed': 0,
+            'wait_total': 0.0, 'latency_total': 0.0, 'latency_max': 0.0, 'latency_last': 0.0,
+        }
+
+    def submit(self, fn, *args):
+        """ ส่งงานเข้าคิว (เวลาเริ่มนับตั้งแต่ตอนรับ webhook) """
+        received_at = time.monotonic()
+        with self.lock:
+            self.stats['queued'] += 1
+        return self.pool.submit(self._run, received_at, fn, *args)
+
+    def _run(self, received_at, fn, *args):
+        started = time.monotonic()
+        with self.lock:
+            self.stats['queued'] -= 1
+            self.stats['in_progress'] += 1
+            self.stats['wait_total'] += started - received_at
+        ok = False
+        try:
+            fn(*args, received_at=received_at)
+            ok = True
+        except Exception as e:
+            print(f"Worker Error: {e}")
+        finally:
+            latency = time.monotonic() - received_at
+            with self.lock:
+                self.stats['in_progress'] -= 1
+                self.stats['processed' if ok else 'failed'] += 1
+                self.stats['latency_total'] += latency
+                self.stats['latency_max'] = max(self.stats['latency_max'], latency)
+                self.stats['latency_last'] = latency
+
+    def snapshot(self):
+        """ สถิติคิว: ความยาวคิว, งานที่ทำอยู่, latency เฉลี่ย/สูงสุด (วินาที) """
+        with self.lock:
+            s = dict(self.stats)
+        done = s['processed'] + s['failed']
+        return {
+            'queue_depth': s['queued'],
+            'in_progress': s['in_progress'],
+            'processed': s['processed'],
+            'failed': s['failed'],
+            'avg_wait': s['wait_total'] / done if done else 0.0,
+            'avg_latency': s['latency_total'] / done if done else 0.0,
+            'max_latency': s['latency_max'],
+            'last_latency': s['latency_last'],
+        }
@@ -0,0 +1,66 @@
+from concurrent.futures import Future
+import numpy as np
+import pytest
+import src.draw_significance as sig
+
+class InlinePool:
+    """ แทน ProcessPoolExecutor: รันในโปรเซสเดียว แต่จดว่าแบ่งงานไปกี่ชิ้น """
+    created = []
+
+    def __init__(self, max_workers=None):
+        self.max_workers = max_workers
+        self.submitted = 0
+        InlinePool.created.append(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def submit(self, fn, *args):
+        self.submitted += 1
+        future = Future()
+        future.set_result(fn(*args))
+        return future
+
+@pytest.fixture
+def four_cpus(monkeypatch):
+    InlinePool.created = []
+    monkeypatch.setattr(sig.os, 'cpu_count', lambda: 4)
+    monkeypatch.setattr(sig, 'ProcessPoolExecutor', InlinePool)
+
+def draws(n=600, seed=1):
+    rng = np.random.default_rng(seed)
+    return rng.integers(0, 100, n), rng.integers(0, 7, n)
+
+def test_split_uses_every_cpu_when_workers_is_none(four_cpus):
+    jobs = sig._split(10000, None, seed=0)
+    assert len(jobs) == 4
+    assert sum(size for size, _ in jobs) == 10000
+
+def test_split_never_makes_more_jobs_than_batches(four_cpus):
+    assert len(sig._split(sig.BATCH, None, seed=0)) == 1
+
+def test_top_counts_runs_over_the_pool(four_cpus):
+    values, _ = draws()
+    result = sig.top_counts_test(values, 100, n_sim=4000, workers=None)
+    assert [(p.max_workers, p.submitted) for p in InlinePool.created] == [(4, 4)]
+    assert result['simulations'] == 4000
+
+def test_permutation_runs_over_the_pool(four_cpus):
+    values, weekdays = draws()
+    result = sig.permutation_test(values, weekdays, 7, 100, n_perm=4000, workers=None)
+    assert [(p.max_workers, p.submitted) for p in InlinePool.created] == [(4, 4)]
+    assert result['permutations'] == 4000
+
+def test_single_worker_stays_in_process(four_cpus):
+    values, _ = draws()
+    sig.top_counts_test(values, 100, n_sim=4000, workers=1)
+    assert InlinePool.created == []
+
+def test_real_process_pool_matches_requested_simulations():
+    values, weekdays = draws()
+    result = sig.permutation_test(values, weekdays, 7, 100, n_perm=2000, workers=2)
+    assert result['permutations'] == 2000
+    assert 0 < result['p_value'] <= 1